@@ -1,39 +1,52 @@
 import os
 from dotenv import load_dotenv
 import json
-from langchain_openai import OpenAIEmbeddings, OpenAI
-from langchain.vectorstores import FAISS
-from langchain.document_loaders import PyPDFLoader
-from langchain.chains.question_answering import load_qa_chain
-from langchain.chains import RetrievalQA
-from openai import OpenAI as OpenAIClient
-from swarm import Swarm, Agent
+from typing import TYPE_CHECKING
+from resilience import ResilientClient, LLM_CALL_TIMEOUT
+from rate_limiter import get_shared_limiter
+from concurrency import get_concurrency_limiter
+from tracing import span, traced, instrument_swarm
+from metrics import start_metrics_server
+
+# LangChain, FAISS, openai and swarm are imported where they are used, so
+# importing this module (for its workflow helpers) loads none of them
+if TYPE_CHECKING:
+    from swarm import Swarm, Agent
 
 # Load environment variables
 load_dotenv()
 
 PDF_PATH = os.getenv("PDF_PATH", "Knowledge_Base/medication_list_edited_unstructured.pdf")
-
-# Set OpenAI API key in environment
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
-
-# Initialize OpenAI client
-api = OpenAIClient(api_key=OPENAI_API_KEY)
-
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 SWARM_API_KEY = os.getenv("SWARM_API_KEY")
-if not SWARM_API_KEY:
-    raise ValueError("Missing SWARM_API_KEY in environment variables")
 
 def setup_pdf_qa_system(pdf_path: str):
     """Sets up a QA system by processing a PDF document."""
+    from langchain_openai import OpenAIEmbeddings, OpenAI
+    from langchain.vectorstores import FAISS
+    from langchain.document_loaders import PyPDFLoader
+    from langchain.chains.question_answering import load_qa_chain
+    from langchain.chains import RetrievalQA
+    from rate_limiter_langchain import RateLimitCallbackHandler, RateLimitedEmbeddings
+    from cassette import get_http_client
+
     print("Loading medication list...")
-    embeddings = OpenAIEmbeddings()
-    loader = PyPDFLoader(pdf_path)
-    documents = loader.load()
+    # Embedding and completion requests draw from the shared RPM/TPM budget
+    limiter = get_shared_limiter()
+    embeddings = RateLimitedEmbeddings(
+        OpenAIEmbeddings(timeout=LLM_CALL_TIMEOUT, http_client=get_http_client()),
+        limiter,
+        concurrency=get_concurrency_limiter("embeddings"),
+    )
+    with span("rag.load", "retrieval") as s:
+        loader = PyPDFLoader(pdf_path)
+        documents = loader.load()
+        s.set(documents=len(documents))
     print("Creating vector store...")
-    vectorstore = FAISS.from_documents(documents, embeddings)
+    with span("rag.index", "retrieval", documents=len(documents)):
+        vectorstore = FAISS.from_documents(documents, embeddings)
     print("Initializing OpenAI model...")
-    llm = OpenAI()
+    llm = OpenAI(callbacks=[RateLimitCallbackHandler(limiter)], timeout=LLM_CALL_TIMEOUT, http_client=get_http_client())
     print("Creating QA chain...")
     combine_documents_chain = load_qa_chain(llm, chain_type="stuff")
     retrieval_chain = RetrievalQA(
@@ -42,7 +55,8 @@ def setup_pdf_qa_system(pdf_path: str):
     )
     
     def answer_query(query: str) -> str:
-        return retrieval_chain.run(query)
+        with span("retrieval", "retrieval", query_chars=len(query)):
+            return retrieval_chain.run(query)
 
     return answer_query
 
@@ -126,13 +140,14 @@ def handoff_to_prescription_agent(client, medication_agent, treatment_output, me
     response = client.run(agent=medication_agent, messages=medication_messages)
     return response.messages[-1]["content"]
 
+@traced("orchestrator_workflow", "workflow")
 def orchestrator_workflow(
-    client: Swarm,
-    history_taking_agent: Agent,
-    medical_history_maker_agent: Agent,
-    assessment_agent: Agent,
-    treatment_agent: Agent,
-    medication_agent: Agent,
+    client: "Swarm",
+    history_taking_agent: "Agent",
+    medical_history_maker_agent: "Agent",
+    assessment_agent: "Agent",
+    treatment_agent: "Agent",
+    medication_agent: "Agent",
     medication_agent_query_function: callable
 ) -> None:
     try:
@@ -172,8 +187,27 @@ def orchestrator_workflow(
         raise
 
 if __name__ == "__main__":
-    # Set up Swarm client
-    client = Swarm(api)
+    from openai import OpenAI as OpenAIClient
+    from swarm import Swarm, Agent
+    from cassette import get_http_client
+
+    if not SWARM_API_KEY:
+        raise ValueError("Missing SWARM_API_KEY in environment variables")
+
+    # Set OpenAI API key in environment
+    os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
+
+    # Initialize OpenAI client (retries are handled by ResilientClient)
+    api = OpenAIClient(api_key=OPENAI_API_KEY, max_retries=0, timeout=LLM_CALL_TIMEOUT, http_client=get_http_client())
+
+    start_metrics_server()
+
+    # Set up Swarm client with deadlines, retries and circuit breaking
+    client = ResilientClient(
+        instrument_swarm(Swarm(api)),
+        rate_limiter=get_shared_limiter(),
+        concurrency=get_concurrency_limiter("llm")
+    )
 
     # Load medication list QA system
     try:
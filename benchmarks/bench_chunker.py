@@ -0,0 +1,84 @@
+"""
+Chunking throughput benchmark: TokenChunker vs RecursiveCharacterTextSplitter.
+
+The PDF's page text is extracted once, repeated --scale times to make a
+larger corpus, and split by both chunkers. Throughput is reported in MB of
+input text per second, along with chunk counts and token sizes so the two
+can be compared on what the embeddings API actually charges. A chunk is
+"over" when it exceeds the token budget.
+
+Usage:
+    python benchmarks/bench_chunker.py [PDF] [--scale N] [--chunk-tokens N] [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from rate_limiter import count_tokens, _get_encoding
+from token_chunker import TokenChunker, EMBEDDING_MODEL, text_segments
+from pdf_extractor_mupdf import PDFExtractor
+
+DEFAULT_PDF = "Knowledge_Base/medication_list_edited_unstructured.pdf"
+
+
+def _measure(name: str, split, pages, megabytes: float, chunk_tokens: int) -> dict:
+    started = time.perf_counter()
+    chunks = [chunk for page in pages for chunk in split(page)]
+    elapsed = time.perf_counter() - started
+    tokens = count_tokens(chunks, EMBEDDING_MODEL) if chunks else []
+    return {
+        "chunker": name,
+        "seconds": round(elapsed, 3),
+        "mb_per_s": round(megabytes / elapsed, 2) if elapsed else None,
+        "chunks": len(chunks),
+        "mean_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+        "max_tokens": max(tokens, default=0),
+        "over_budget": sum(1 for count in tokens if count > chunk_tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", default=DEFAULT_PDF)
+    parser.add_argument("--scale", type=int, default=20, help="repeat the document's text N times")
+    parser.add_argument("--chunk-tokens", type=int, default=512)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    extractor = PDFExtractor(args.pdf)
+    pages = list(extractor.extract_text_by_page().values()) * args.scale
+    megabytes = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+
+    # Same nominal size for the character splitter: ~4 characters per token
+    recursive = RecursiveCharacterTextSplitter(chunk_size=args.chunk_tokens * 4, chunk_overlap=args.chunk_tokens // 2)
+    chunker = TokenChunker(chunk_tokens=args.chunk_tokens, overlap_tokens=args.chunk_tokens // 8)
+
+    results = [
+        _measure("recursive_character", recursive.split_text, pages, megabytes, args.chunk_tokens),
+        _measure("token", chunker.split_text, pages, megabytes, args.chunk_tokens),
+        # Whole corpus in one call: one batched token count per pass
+        _measure("token_batched", lambda corpus: [chunk for chunk, _ in chunker.chunk_segments(
+            segment for page in corpus for segment in text_segments(page))], [pages], megabytes, args.chunk_tokens),
+    ]
+
+    tokenizer = "tiktoken" if _get_encoding(EMBEDDING_MODEL) is not None else "chars/4 fallback"
+    print(f"PDF: {args.pdf} x{args.scale} ({megabytes:.2f} MB of text, tokenizer: {tokenizer})")
+    print(f"{'chunker':<20} {'MB/s':>7} {'chunks':>7} {'mean tok':>9} {'max tok':>8} {'over':>5}")
+    for r in results:
+        print(f"{r['chunker']:<20} {r['mb_per_s']:>7} {r['chunks']:>7} {r['mean_tokens']:>9} "
+              f"{r['max_tokens']:>8} {r['over_budget']:>5}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"pdf": args.pdf, "scale": args.scale, "megabytes": megabytes,
+                       "tokenizer": tokenizer, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
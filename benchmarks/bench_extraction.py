@@ -0,0 +1,220 @@
+"""
+Extraction benchmark: pypdf (PDFSwarmExtractor) vs PyMuPDF (PDFExtractor).
+
+Runs both backends over the repo's own corpus (Knowledge_Base/,
+prescriptions/, treatment_plan.pdf) and over a synthetic corpus where
+each file is concatenated N times. Every (backend, scale, workers) cell
+runs in a fresh process that fans files out over a process pool, and
+reports pages/s, chunks/s (chunked with the same splitter settings as
+PDFSwarmExtractor) and peak RSS of the run including its workers, next
+to the RSS after imports.
+Text agreement between the backends is measured per file on the
+unscaled corpus as the overlap of their word multisets (1.0 = same words).
+
+The report is JSON with a schema version, environment and git commit, so
+runs can be compared across versions.
+
+Usage:
+    python benchmarks/bench_extraction.py [--scales 1 10] [--workers 1 2 4] [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing as mp
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPORT_SCHEMA_VERSION = 1
+CORPUS_PATTERNS = ("Knowledge_Base/**/*.pdf", "prescriptions/**/*.pdf", "treatment_plan.pdf")
+BACKENDS = ("pypdf", "pymupdf")
+
+
+def _rss_mb(who=resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def _splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    # Same settings as PDFSwarmExtractor
+    return RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
+
+
+def extract_pages(backend: str, pdf_path: str):
+    """Return the page texts of a PDF using the given backend."""
+    if backend == "pypdf":
+        from pdf_extractor import iter_pdf_pages
+        return list(iter_pdf_pages(pdf_path))
+    from pdf_extractor_mupdf import PDFExtractor
+    extractor = PDFExtractor(pdf_path)
+    try:
+        return list(extractor.extract_text_by_page().values())
+    finally:
+        extractor.close()
+
+
+def _run_file(backend: str, pdf_path: str):
+    pages = extract_pages(backend, pdf_path)
+    splitter = _splitter()
+    chunks = sum(len(splitter.split_text(page)) for page in pages)
+    return len(pages), chunks, sum(len(page) for page in pages)
+
+
+def _run_cell(backend: str, files, workers: int, queue):
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    # Import everything up front so neither the timing nor forked workers pay for it
+    import pdf_extractor  # noqa: F401
+    import pdf_extractor_mupdf  # noqa: F401
+    _splitter()
+    baseline = _rss_mb()
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_run_file(backend, path) for path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run_file, [backend] * len(files), files))
+    elapsed = time.perf_counter() - started
+    pages = sum(r[0] for r in results)
+    chunks = sum(r[1] for r in results)
+    queue.put({
+        "seconds": round(elapsed, 3),
+        "files": len(files),
+        "pages": pages,
+        "chunks": chunks,
+        "chars": sum(r[2] for r in results),
+        "pages_per_s": round(pages / elapsed, 1),
+        "chunks_per_s": round(chunks / elapsed, 1),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(max(_rss_mb(), _rss_mb(resource.RUSAGE_CHILDREN)), 1),
+    })
+
+
+def measure(backend: str, files, workers: int) -> dict:
+    """Run one benchmark cell in a fresh process so peak RSS is its own."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_cell, args=(backend, files, workers, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return {"backend": backend, "workers": workers, **result}
+
+
+def text_agreement(text_a: str, text_b: str) -> float:
+    """Overlap of the two texts' word multisets, from 0 to 1."""
+    words_a, words_b = Counter(text_a.split()), Counter(text_b.split())
+    total = sum(words_a.values()) + sum(words_b.values())
+    if not total:
+        return 1.0
+    return 2 * sum((words_a & words_b).values()) / total
+
+
+def corpus_files(root: str):
+    files = []
+    for pattern in CORPUS_PATTERNS:
+        files.extend(sorted(glob.glob(os.path.join(root, pattern), recursive=True)))
+    return files
+
+
+def scaled_corpus(files, copies: int, directory: str):
+    """Write one PDF per corpus file, each holding N copies of it."""
+    import fitz
+
+    scaled = []
+    for index, path in enumerate(files):
+        source = fitz.open(path)
+        target = fitz.open()
+        for _ in range(copies):
+            target.insert_pdf(source)
+        scaled_path = os.path.join(directory, f"x{copies}_{index:03d}.pdf")
+        target.save(scaled_path)
+        scaled.append(scaled_path)
+    return scaled
+
+
+def _environment(root: str) -> dict:
+    import fitz
+    import pypdf
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pypdf": pypdf.__version__,
+        "pymupdf": fitz.VersionBind,
+        "git_commit": commit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="corpus copies per run")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to sweep")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--json", help="report path (default: benchmarks/results/extraction_<time>.json)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    files = corpus_files(args.root)
+    print(f"Corpus: {len(files)} PDFs")
+
+    agreement = {}
+    if set(args.backends) == set(BACKENDS):
+        for path in files:
+            texts = {backend: "\n".join(extract_pages(backend, path)) for backend in BACKENDS}
+            agreement[os.path.relpath(path, args.root)] = round(text_agreement(*texts.values()), 4)
+        scores = list(agreement.values())
+        print(f"Text agreement: mean {sum(scores) / len(scores):.3f}, min {min(scores):.3f}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for scale in args.scales:
+            run_files = files if scale == 1 else scaled_corpus(files, scale, scratch)
+            for backend in args.backends:
+                for workers in args.workers:
+                    result = {"scale": scale, **measure(backend, run_files, workers)}
+                    results.append(result)
+                    print(f"scale {scale:>3} {backend:<8} workers {workers:>2}: "
+                          f"{result['pages_per_s']:>8} pages/s {result['chunks_per_s']:>8} chunks/s "
+                          f"{result['peak_rss_mb']:>7} MB peak")
+
+    report = {
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": _environment(args.root),
+        "corpus": {"patterns": list(CORPUS_PATTERNS), "files": len(files)},
+        "results": results,
+        "text_agreement": {
+            "mean": round(sum(agreement.values()) / len(agreement), 4) if agreement else None,
+            "min": min(agreement.values(), default=None),
+            "per_file": agreement,
+        },
+    }
+    output = args.json or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"extraction_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Import-time benchmark for the app's entry modules.
+
+Imports each module in a fresh interpreter under ``python -X importtime``
+and reports, per module, the median cumulative import time of the module
+itself and of the whole process (interpreter start-up included), the
+packages that cost the most, and which heavy dependencies (reportlab,
+openai, swarm, LangChain, FAISS, httpx...) were loaded. Importing
+swarm_med, agents or prescription_pdf should load none of them: they are
+deferred until a workflow runs or a PDF is drawn.
+
+Each module gets one untimed warm-up import (so bytecode is cached) and
+then --repeat timed ones. With --max-ms the run exits non-zero when any
+module's median exceeds the budget, or when --no-heavy is given and a
+module loaded a heavy dependency, so it can gate CI. cassette is an
+httpx transport, so httpx is expected there and does not fail the run.
+
+Usage:
+    python benchmarks/bench_import_time.py [--modules swarm_med agents prescription_pdf]
+        [--repeat 5] [--top 10] [--max-ms 300] [--no-heavy] [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import environment
+
+REPORT_SCHEMA_VERSION = 1
+DEFAULT_MODULES = ("prescription_pdf", "swarm_med", "agents", "resilience", "rate_limiter", "cassette")
+HEAVY_PACKAGES = ("reportlab", "openai", "swarm", "langchain", "langchain_core", "langchain_openai",
+                  "faiss", "httpx", "tiktoken", "fitz", "pdfplumber")
+# Heavy dependencies a module exists to wrap: reported, but not a --no-heavy failure
+EXPECTED_HEAVY = {"cassette": ("httpx",)}
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse ``-X importtime`` output
+
+    Returns:
+        list: One dict per imported module with name, depth, self_us and
+        cumulative_us, in the order the interpreter reported them
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the "self [us] | cumulative | imported package" header
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append({
+            "name": stripped,
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+        })
+    return entries
+
+
+def import_once(module: str) -> dict:
+    """Import a module in a fresh interpreter and return its parsed import times."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        error = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        return {"error": (error or ["exit code %d" % proc.returncode])[-1]}
+    entries = parse_importtime(proc.stderr)
+    target = next((e for e in entries if e["name"] == module and e["depth"] == 0), None)
+    loaded = {e["name"].split(".")[0] for e in entries}
+    return {
+        "wall_s": wall,
+        "module_us": target["cumulative_us"] if target else 0,
+        "total_us": sum(e["cumulative_us"] for e in entries if e["depth"] == 0),
+        "entries": entries,
+        "heavy_loaded": sorted(loaded.intersection(HEAVY_PACKAGES)),
+    }
+
+
+def measure(module: str, repeat: int, top: int) -> dict:
+    import_once(module)  # warm-up: compile and cache bytecode
+    runs = [import_once(module) for _ in range(repeat)]
+    if "error" in runs[0]:
+        return {"module": module, "error": runs[0]["error"]}
+
+    # Packages by their top-level cumulative time in the median run
+    median_run = sorted(runs, key=lambda run: run["module_us"])[len(runs) // 2]
+    packages = {}
+    for entry in median_run["entries"]:
+        if "." not in entry["name"] and entry["name"] != module:
+            packages[entry["name"]] = max(packages.get(entry["name"], 0), entry["cumulative_us"])
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "repeat": repeat,
+        "module_ms": round(statistics.median(run["module_us"] for run in runs) / 1000, 2),
+        "total_import_ms": round(statistics.median(run["total_us"] for run in runs) / 1000, 2),
+        "process_wall_ms": round(statistics.median(run["wall_s"] for run in runs) * 1000, 2),
+        "modules_imported": len(median_run["entries"]),
+        "heavy_loaded": median_run["heavy_loaded"],
+        "heaviest": [{"package": name, "cumulative_ms": round(us / 1000, 2)} for name, us in heaviest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(DEFAULT_MODULES))
+    parser.add_argument("--repeat", type=int, default=5, help="timed imports per module")
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages listed per module")
+    parser.add_argument("--max-ms", type=float, help="fail when a module's median import time exceeds this")
+    parser.add_argument("--no-heavy", action="store_true", help="fail when a module loads a heavy dependency it does not wrap")
+    parser.add_argument("--json", help="report path (default: benchmarks/results/import_time_<time>.json)")
+    args = parser.parse_args()
+
+    results, failures = [], []
+    for module in args.modules:
+        result = measure(module, args.repeat, args.top)
+        results.append(result)
+        if "error" in result:
+            print(f"{module:<18} failed: {result['error']}")
+            failures.append(f"{module}: {result['error']}")
+            continue
+        heaviest = ", ".join(f"{p['package']} {p['cumulative_ms']}" for p in result["heaviest"][:3])
+        print(f"{module:<18} {result['module_ms']:>8} ms  (process {result['total_import_ms']} ms, "
+              f"{result['modules_imported']} modules)  heavy: {', '.join(result['heavy_loaded']) or '-'}  "
+              f"top: {heaviest}")
+        if args.max_ms is not None and result["module_ms"] > args.max_ms:
+            failures.append(f"{module}: {result['module_ms']} ms > {args.max_ms} ms")
+        unexpected = [name for name in result["heavy_loaded"] if name not in EXPECTED_HEAVY.get(module, ())]
+        if args.no_heavy and unexpected:
+            failures.append(f"{module}: loads {', '.join(unexpected)}")
+
+    report = {
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "budget": {"max_ms": args.max_ms, "no_heavy": args.no_heavy},
+        "results": results,
+        "failures": failures,
+    }
+    output = args.json or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"import_time_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+    if failures:
+        print("Import-time budget exceeded:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Peak-memory benchmark for PDFSwarmExtractor's eager and streaming paths.
+
+Each mode runs in a fresh process so its peak RSS is not polluted by the
+other. The eager mode reproduces the old behaviour (PyPDFLoader.load() and
+split_documents on the whole page list) and keeps the chunks, as
+process_single_pdf's callers do; the streaming mode consumes
+iter_single_pdf chunk by chunk.
+
+Usage:
+    python benchmarks/bench_pdf_memory.py [PDF] [--scale N] [--json PATH]
+
+--scale N concatenates N copies of the PDF (requires PyMuPDF) to show how
+both modes grow with document size.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_PDF = "Knowledge_Base/medication_list_edited_unstructured.pdf"
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _run_mode(mode: str, pdf_path: str, queue):
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    from langchain_community.document_loaders import PyPDFLoader
+    from pdf_extractor import PDFSwarmExtractor
+
+    extractor = PDFSwarmExtractor(max_workers=1)
+    baseline = _rss_mb()
+    started = time.perf_counter()
+    if mode == "eager":
+        pages = PyPDFLoader(pdf_path).load()
+        chunks = [chunk.page_content for chunk in extractor.text_splitter.split_documents(pages)]
+        count, chars = len(chunks), sum(len(chunk) for chunk in chunks)
+    else:
+        count = chars = 0
+        for chunk in extractor.iter_single_pdf(pdf_path):
+            count += 1
+            chars += len(chunk)
+    elapsed = time.perf_counter() - started
+    queue.put({
+        "mode": mode,
+        "chunks": count,
+        "chars": chars,
+        "seconds": round(elapsed, 3),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(_rss_mb(), 1),
+        "delta_rss_mb": round(_rss_mb() - baseline, 1),
+    })
+
+
+def measure(mode: str, pdf_path: str) -> dict:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_mode, args=(mode, pdf_path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def scaled_copy(pdf_path: str, copies: int) -> str:
+    import fitz
+
+    source = fitz.open(pdf_path)
+    scaled = fitz.open()
+    for _ in range(copies):
+        scaled.insert_pdf(source)
+    path = os.path.join(tempfile.mkdtemp(), f"scaled_x{copies}.pdf")
+    scaled.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", default=DEFAULT_PDF)
+    parser.add_argument("--scale", type=int, default=1, help="concatenate N copies of the PDF")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    pdf_path = scaled_copy(args.pdf, args.scale) if args.scale > 1 else args.pdf
+    print(f"PDF: {pdf_path} ({os.path.getsize(pdf_path) / 1e6:.1f} MB)")
+    results = [measure(mode, pdf_path) for mode in ("eager", "streaming")]
+
+    print(f"{'mode':<10} {'chunks':>7} {'seconds':>8} {'peak RSS MB':>12} {'delta MB':>9}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['chunks']:>7} {r['seconds']:>8} {r['peak_rss_mb']:>12} {r['delta_rss_mb']:>9}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"pdf": pdf_path, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
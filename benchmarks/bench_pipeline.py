@@ -0,0 +1,306 @@
+"""
+End-to-end pipeline benchmark against the offline OpenAI stand-in.
+
+Starts benchmarks/openai_stub.py in its own process (so its CPU is not
+billed to the client) and runs whole consultations through the real
+pipelines at a controlled concurrency:
+
+    swarm_med   swarm_med.medical_workflow, including PDF rendering and archiving
+    agents      agents.orchestrator_workflow with the PDF RAG (embeddings + FAISS)
+    chat        one raw chat completion per stage, to calibrate stub and client overhead
+
+The Streamlit app drives the same ResilientClient/Swarm stages as
+swarm_med behind its UI, so swarm_med stands in for it here.
+
+Every (pipeline, concurrency) cell runs in a fresh process and reports
+consultations/s, LLM calls/s, per-stage latency percentiles measured
+around client.run, ResilientClient counters (retries, hedges, timeouts),
+client CPU seconds and utilisation, and peak RSS. The stub's request and
+injected-failure counters for the cell are included, and so is the full
+stub configuration. Runs are reproducible for a fixed --seed, up to thread
+scheduling.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--pipelines swarm_med agents] [--consultations 20]
+        [--concurrency 1 4 16] [--latency lognormal:-1.5,0.5] [--rate-limit-rate 0.02] [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import threading
+import contextlib
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai_stub import add_config_arguments, config_from_args
+from common import environment, percentiles, serve_stub, stub_counters
+
+REPORT_SCHEMA_VERSION = 1
+PIPELINES = ("swarm_med", "agents", "chat")
+CHAT_STAGES = ("history", "medical_history", "assessment", "treatment", "prescription", "summary", "pdf")
+
+PATIENT_CONVERSATION = """
+Patient: I've been experiencing chest pain and shortness of breath for the past week.
+My father had a heart attack when he was 55, and I'm 52 now.
+I've been feeling tired and have occasional dizziness.
+"""
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageTimer:
+    def __init__(self, client):
+        """
+        Wrap a (Resilient)Swarm client and record the latency of every run() by stage
+
+        The stage is the ``stage`` argument if given, else the agent's name.
+        """
+        self.client = client
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def record(self, stage: str, seconds: float, error: BaseException = None):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+            if error is not None:
+                key = f"{stage}: {type(error).__name__}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def timed(self, stage: str, func):
+        """Wrap a plain callable (e.g. the RAG query) as a timed stage."""
+        def run(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                self.record(stage, time.perf_counter() - started, e)
+                raise
+            self.record(stage, time.perf_counter() - started)
+            return result
+        return run
+
+    def run(self, agent, messages, stage=None, **kwargs):
+        name = stage or getattr(agent, "name", "default")
+        if stage is not None:
+            kwargs["stage"] = stage
+        return self.timed(name, self.client.run)(agent=agent, messages=messages, **kwargs)
+
+
+def _setup_swarm_med(timer_box):
+    import swarm_med
+
+    timer = StageTimer(swarm_med.get_client())
+    swarm_med.set_client(timer)
+    timer_box.append(timer)
+    return lambda: swarm_med.medical_workflow(PATIENT_CONVERSATION)
+
+
+def _setup_agents(timer_box):
+    from functools import partial
+    from openai import OpenAI
+    from swarm import Agent, Swarm
+
+    import agents
+    from resilience import ResilientClient
+    from rate_limiter import get_shared_limiter
+    from concurrency import get_concurrency_limiter
+
+    timer = StageTimer(ResilientClient(
+        Swarm(OpenAI(max_retries=0)),
+        rate_limiter=get_shared_limiter(),
+        concurrency=get_concurrency_limiter("llm"),
+    ))
+    timer_box.append(timer)
+    query = timer.timed("rag_setup", agents.setup_pdf_qa_system)(os.path.join(ROOT, agents.PDF_PATH))
+    # Short instructions: the stub's latency does not depend on prompt size
+    make = partial(Agent, model="gpt-4")
+    history_taking_agent = make(name="History Taking Agent", instructions="Take an OLDCARTS history.")
+    medication_agent = make(name="Medication Agent", instructions="List medications.")
+    # The handoff helpers read these module globals, which agents.py only defines under __main__
+    agents.medical_history_maker_agent = make(name="Medical History Making Agent", instructions="Write an HPI.")
+    agents.assessment_agent = make(name="Assessment Agent", instructions="Assess the patient.")
+    agents.treatment_agent = make(name="Treatment Agent", instructions="Propose treatment.")
+    return lambda: agents.orchestrator_workflow(
+        client=timer,
+        history_taking_agent=history_taking_agent,
+        medical_history_maker_agent=agents.medical_history_maker_agent,
+        assessment_agent=agents.assessment_agent,
+        treatment_agent=agents.treatment_agent,
+        medication_agent=medication_agent,
+        medication_agent_query_function=timer.timed("rag_query", query),
+    )
+
+
+def _setup_chat(timer_box):
+    from openai import OpenAI
+
+    api = OpenAI(max_retries=0)
+
+    class _ChatClient:
+        def run(self, agent, messages, stage=None):
+            return api.chat.completions.create(model="gpt-4o-mini", messages=messages)
+
+    timer = StageTimer(_ChatClient())
+    timer_box.append(timer)
+
+    def consultation():
+        for stage in CHAT_STAGES:
+            timer.run(agent=None, stage=stage, messages=[{"role": "user", "content": PATIENT_CONVERSATION}])
+    return consultation
+
+
+SETUPS = {"swarm_med": _setup_swarm_med, "agents": _setup_agents, "chat": _setup_chat}
+
+
+def _run_cell(pipeline: str, consultations: int, concurrency: int, base_url: str, scratch: str, queue):
+    os.environ.update({
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_BASE": base_url,
+        "OPENAI_API_KEY": "stub",
+        "SWARM_API_KEY": "stub",
+        "PRESCRIPTION_ARCHIVE_DIR": os.path.join(scratch, "prescriptions"),
+        "RATE_LIMIT_DB": os.path.join(scratch, "ratelimit.sqlite3"),
+    })
+    os.chdir(scratch)
+    try:
+        started = time.perf_counter()
+        timer_box = []
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            consultation = SETUPS[pipeline](timer_box)
+        setup_seconds = time.perf_counter() - started
+    except Exception as e:
+        queue.put({"error": f"setup failed: {type(e).__name__}: {e}"})
+        return
+    timer = timer_box[0]
+    baseline_rss = _rss_mb()
+    before = stub_counters(base_url)
+    cpu_before = _cpu_seconds()
+    failures = {}
+
+    def run_one(_):
+        try:
+            consultation()
+        except Exception as e:
+            key = type(e).__name__
+            failures[key] = failures.get(key, 0) + 1
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run_one, range(consultations)))
+    elapsed = time.perf_counter() - started
+    cpu = _cpu_seconds() - cpu_before
+    after = stub_counters(base_url)
+
+    calls = sum(len(samples) for stage, samples in timer.samples.items() if not stage.startswith("rag_"))
+    resilient = getattr(timer.client, "stage_stats", None)
+    queue.put({
+        "setup_seconds": round(setup_seconds, 3),
+        "seconds": round(elapsed, 3),
+        "consultations": consultations,
+        "failed_consultations": sum(failures.values()),
+        "failures": failures,
+        "consultations_per_s": round((consultations - sum(failures.values())) / elapsed, 3),
+        "llm_calls_per_s": round(calls / elapsed, 2),
+        "stages": {stage: percentiles(samples) for stage, samples in sorted(timer.samples.items())},
+        "stage_errors": timer.errors,
+        "resilient_client": resilient() if callable(resilient) else None,
+        "client_cpu_seconds": round(cpu, 3),
+        "client_cpu_utilisation": round(cpu / elapsed, 3),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(_rss_mb(), 1),
+        "stub": {key: after.get(key, 0) - before.get(key, 0) for key in after},
+    })
+
+
+def measure(pipeline: str, consultations: int, concurrency: int, base_url: str) -> dict:
+    """Run one benchmark cell in a fresh process so CPU and peak RSS are its own."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    with tempfile.TemporaryDirectory() as scratch:
+        process = ctx.Process(target=_run_cell, args=(pipeline, consultations, concurrency, base_url, scratch, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+    return {"pipeline": pipeline, "concurrency": concurrency, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=["swarm_med", "agents"])
+    parser.add_argument("--consultations", type=int, default=20, help="consultations per cell")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="concurrent consultations")
+    parser.add_argument("--base-url", help="use an already running stub instead of starting one")
+    parser.add_argument("--json", help="report path (default: benchmarks/results/pipeline_<time>.json)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    stub_process = None
+    base_url = args.base_url
+    if base_url is None:
+        ctx = mp.get_context("spawn")
+        queue = ctx.Queue()
+        stub_process = ctx.Process(target=serve_stub, args=(args, queue), daemon=True)
+        stub_process.start()
+        base_url = queue.get(timeout=30)
+    print(f"Stub: {base_url}")
+
+    results = []
+    try:
+        for pipeline in args.pipelines:
+            for concurrency in args.concurrency:
+                result = measure(pipeline, args.consultations, concurrency, base_url)
+                results.append(result)
+                if "error" in result:
+                    print(f"{pipeline:<10} concurrency {concurrency:>3}: {result['error']}")
+                    continue
+                slowest = max(result["stages"].items(), key=lambda item: item[1].get("p95", 0), default=(None, {}))
+                print(f"{pipeline:<10} concurrency {concurrency:>3}: {result['consultations_per_s']:>7} consult/s "
+                      f"{result['llm_calls_per_s']:>7} calls/s  slowest p95 {slowest[0]} {slowest[1].get('p95')}s  "
+                      f"cpu {result['client_cpu_utilisation']:.0%}  {result['peak_rss_mb']} MB peak  "
+                      f"failed {result['failed_consultations']}")
+    finally:
+        if stub_process is not None:
+            stub_process.terminate()
+
+    report = {
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "stub": config_from_args(args).spec,
+        "results": results,
+    }
+    output = args.json or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"pipeline_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Table extraction benchmark for PDFExtractor's pre-filter and cache.
+
+Runs extract_tables three ways on the same document: without the
+pre-filter (every page goes through find_tables), with the pre-filter,
+and a second pre-filtered run served from the cache. The pre-filter's
+precision and recall are measured against the pages where the unfiltered
+run actually found tables; recall must stay at 1.0 for the pre-filter to
+be safe.
+
+Usage:
+    python benchmarks/bench_tables.py [PDF] [--repeat N] [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+from pdf_extractor_mupdf import PDFExtractor, TableCache, page_may_have_tables
+
+DEFAULT_PDF = "Knowledge_Base/medication_list_edited_unstructured.pdf"
+
+
+def _timed(fn, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", default=DEFAULT_PDF)
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of N runs")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    extractor = PDFExtractor(args.pdf, table_cache=TableCache(cache_dir=None))
+    page_count = len(extractor.doc)
+
+    off_seconds, baseline = _timed(lambda: extractor.extract_tables(prefilter=False, use_cache=False), args.repeat)
+    on_seconds, filtered = _timed(lambda: extractor.extract_tables(prefilter=True, use_cache=False), args.repeat)
+    extractor.extract_tables()  # populate the cache
+    cached_seconds, cached = _timed(lambda: extractor.extract_tables(), args.repeat)
+
+    doc = fitz.open(args.pdf)
+    candidates = {n for n in range(page_count) if page_may_have_tables(doc[n])}
+    actual = set(baseline)
+    true_positives = len(candidates & actual)
+
+    results = {
+        "pdf": args.pdf,
+        "pages": page_count,
+        "pages_with_tables": sorted(actual),
+        "candidate_pages": len(candidates),
+        "precision": round(true_positives / len(candidates), 3) if candidates else 1.0,
+        "recall": round(true_positives / len(actual), 3) if actual else 1.0,
+        "seconds_prefilter_off": off_seconds,
+        "seconds_prefilter_on": on_seconds,
+        "seconds_cached": cached_seconds,
+        "speedup_prefilter": round(off_seconds / on_seconds, 1) if on_seconds else None,
+        "identical_output": baseline == filtered == cached,
+    }
+
+    print(f"PDF: {args.pdf} ({page_count} pages, tables on {sorted(actual)})")
+    print(f"pre-filter off: {off_seconds:.3f}s")
+    print(f"pre-filter on:  {on_seconds:.3f}s ({results['speedup_prefilter']}x), "
+          f"{len(candidates)} candidate pages, precision {results['precision']}, recall {results['recall']}")
+    print(f"cached:         {cached_seconds:.4f}s")
+    print(f"identical output: {results['identical_output']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
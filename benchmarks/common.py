@@ -0,0 +1,57 @@
+"""
+Helpers shared by the benchmark scripts: latency percentiles, the
+environment block of a report, and running or polling the OpenAI stub.
+"""
+import os
+import json
+import platform
+import subprocess
+import urllib.request
+
+from openai_stub import StubServer, config_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(samples) -> dict:
+    """Count, mean and p50/p95/p99 of a list of seconds (nearest rank)."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(pick(0.5), 4),
+        "p95": round(pick(0.95), 4),
+        "p99": round(pick(0.99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def environment() -> dict:
+    """Python, platform, CPU count and git commit, for report headers."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def serve_stub(args, queue):
+    """Process entry point: serve the stub configured by ``args`` and report its URL on ``queue``."""
+    server = StubServer(config_from_args(args), "127.0.0.1", 0)
+    queue.put(server.base_url)
+    server.serve_forever()
+
+
+def stub_counters(base_url: str) -> dict:
+    """Fetch the stub's request counters."""
+    with urllib.request.urlopen(f"{base_url}/stats", timeout=10) as response:
+        return json.load(response)["counters"]
@@ -0,0 +1,479 @@
+"""
+Offline OpenAI-compatible stand-in server for load tests.
+
+Serves the endpoints the pipelines use (chat completions, including
+streaming and tool calls, legacy completions for LangChain's OpenAI LLM,
+and embeddings) with synthetic responses. Latency, token throughput and
+failures are injected from seeded distributions, so a run against the
+stub is reproducible and costs no API quota.
+
+Point a client at it with
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub
+
+Distributions are written NAME:ARGS, e.g. fixed:0.2, uniform:0.1,0.5,
+normal:0.3,0.05, lognormal:-1.5,0.5 or exp:0.25 (seconds or tokens).
+
+Canned responses (--responses FILE) are a JSON list of rules, tried in
+order against the text of the request's messages:
+    [{"match": "prescription", "content": "Rx: ..."},
+     {"match": "Orchestrator", "tool_call": {"name": "transfer_to_history_agent", "arguments": {}}}]
+A tool call is only returned when the request offers that tool and the
+last message is not already a tool result.
+
+Trace replays (benchmarks/replay_traces.py) can override both latency and
+completion length for a single request with the X-Stub-Latency (seconds) and
+X-Stub-Output-Tokens headers.
+
+Usage:
+    python benchmarks/openai_stub.py [--port 8765] [--latency lognormal:-1.5,0.5]
+        [--tokens-per-second 80] [--output-tokens normal:250,60]
+        [--rate-limit-rate 0.02] [--error-rate 0.01] [--responses FILE] [--seed 0]
+"""
+import re
+import json
+import math
+import base64
+import struct
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_PORT = 8765
+DEFAULT_EMBEDDING_DIM = 1536
+
+_WORDS = (
+    "patient reports intermittent symptoms with moderate severity assessment suggests "
+    "follow up in two weeks continue current medication monitor blood pressure daily "
+    "advise hydration rest and review laboratory results at next visit"
+).split()
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse NAME:ARGS into a sampler; samples are clamped at zero
+
+    Raises:
+        ValueError: If the distribution name or its arguments are invalid
+    """
+    name, _, raw = spec.partition(":")
+    args = [float(x) for x in raw.split(",") if x.strip()]
+    samplers = {
+        "fixed": (1, lambda rng, a: a[0]),
+        "uniform": (2, lambda rng, a: rng.uniform(a[0], a[1])),
+        "normal": (2, lambda rng, a: rng.gauss(a[0], a[1])),
+        "lognormal": (2, lambda rng, a: rng.lognormvariate(a[0], a[1])),
+        "exp": (1, lambda rng, a: rng.expovariate(1 / a[0]) if a[0] > 0 else 0.0),
+    }
+    if name not in samplers:
+        raise ValueError(f"Unknown distribution {name!r}; use one of {', '.join(samplers)}")
+    arity, sample = samplers[name]
+    if len(args) != arity:
+        raise ValueError(f"{name} takes {arity} argument(s), got {spec!r}")
+    return lambda rng: max(0.0, sample(rng, args))
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _message_text(messages: List[Dict]) -> str:
+    parts = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+class StubConfig:
+    def __init__(
+        self,
+        latency: str = "lognormal:-1.5,0.5",
+        tokens_per_second: float = 80.0,
+        output_tokens: str = "normal:250,60",
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: float = 1.0,
+        embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+        responses: Optional[List[Dict]] = None,
+        seed: int = 0,
+    ):
+        """
+        Behaviour of the stand-in server
+
+        Args:
+            latency (str): Time to first token distribution, seconds
+            tokens_per_second (float): Generation speed after the first token (0 = instant)
+            output_tokens (str): Completion length distribution, tokens
+            rate_limit_rate (float): Fraction of requests answered with 429
+            error_rate (float): Fraction of requests answered with 500
+            retry_after (float): Retry-After seconds sent with 429s
+            embedding_dim (int): Length of embedding vectors
+            responses (List[Dict]): Canned response rules (see module docstring)
+            seed (int): Seed of the random stream shared by all requests
+        """
+        self.latency = parse_distribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = parse_distribution(output_tokens)
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.embedding_dim = embedding_dim
+        self.responses = [
+            dict(rule, pattern=re.compile(rule.get("match", ""), re.IGNORECASE)) for rule in responses or []
+        ]
+        self.spec = {
+            "latency": latency, "tokens_per_second": tokens_per_second, "output_tokens": output_tokens,
+            "rate_limit_rate": rate_limit_rate, "error_rate": error_rate, "seed": seed,
+            "canned_responses": len(self.responses),
+        }
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self, sampler: Callable[[random.Random], float]) -> float:
+        with self._lock:
+            return sampler(self._rng)
+
+    def roll(self) -> Optional[int]:
+        """Return an injected failure status for this request, or None."""
+        with self._lock:
+            x = self._rng.random()
+        if x < self.rate_limit_rate:
+            return 429
+        if x < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+    def canned(self, text: str) -> Optional[Dict]:
+        for rule in self.responses:
+            if rule["pattern"].search(text):
+                return rule
+        return None
+
+
+class StubStats:
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+def _synthetic_text(rng_seed: str, tokens: int) -> str:
+    # Deterministic per request text; ~1 token per short word
+    rng = random.Random(rng_seed)
+    return " ".join(rng.choice(_WORDS) for _ in range(max(1, tokens)))
+
+
+def _embedding(text: str, dim: int) -> List[float]:
+    """Deterministic unit vector derived from the text, so equal texts embed equally."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "OpenAIStub/1"
+    protocol_version = "HTTP/1.1"
+
+    # Set on the server: config (StubConfig) and stats (StubStats)
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    @property
+    def stats(self) -> StubStats:
+        return self.server.stats
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str, kind: str):
+        headers = {"Retry-After": str(self.config.retry_after)} if status == 429 else None
+        self._send_json(status, {"error": {"message": message, "type": kind, "code": kind}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, {"config": self.config.spec, "counters": self.stats.snapshot()})
+        else:
+            self._error(404, f"No route for GET {self.path}", "not_found")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._error(400, "Body is not JSON", "invalid_request_error")
+            return
+
+        routes = {
+            "/chat/completions": self._chat,
+            "/completions": self._completions,
+            "/embeddings": self._embeddings,
+        }
+        route = next((handler for suffix, handler in routes.items() if self.path.rstrip("/").endswith(suffix)), None)
+        if route is None:
+            self._error(404, f"No route for POST {self.path}", "not_found")
+            return
+
+        endpoint = route.__name__.lstrip("_")
+        self.stats.count(f"{endpoint}.requests")
+        failure = self.config.roll()
+        if failure is not None:
+            # Failures arrive fast, like a real gateway rejecting the request
+            time.sleep(self.config.draw(self.config.latency) / 10)
+            self.stats.count(f"{endpoint}.injected_{failure}")
+            if failure == 429:
+                self._error(429, "Rate limit reached (injected)", "rate_limit_exceeded")
+            else:
+                self._error(500, "Internal error (injected)", "server_error")
+            return
+        route(request)
+
+    def _output_tokens(self) -> int:
+        hinted = self.headers.get("X-Stub-Output-Tokens")
+        if hinted is not None:
+            return max(1, int(hinted))
+        return max(1, int(self.config.draw(self.config.output_tokens)))
+
+    def _generation_delay(self, tokens: int) -> float:
+        hinted = self.headers.get("X-Stub-Latency")
+        if hinted is not None:
+            return float(hinted)
+        delay = self.config.draw(self.config.latency)
+        if self.config.tokens_per_second > 0:
+            delay += tokens / self.config.tokens_per_second
+        return delay
+
+    def _chat(self, request: Dict):
+        messages = request.get("messages", [])
+        text = _message_text(messages)
+        prompt_tokens = _estimate_tokens(text)
+        rule = self.config.canned(text)
+        message: Dict = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+
+        tools = {tool.get("function", {}).get("name") for tool in request.get("tools") or []}
+        tool_call = rule.get("tool_call") if rule else None
+        last_role = messages[-1].get("role") if messages else None
+        if tool_call and tool_call.get("name") in tools and last_role != "tool":
+            self.stats.count("chat.tool_calls")
+            message["tool_calls"] = [{
+                "id": f"call_{self.stats.snapshot().get('chat.requests', 0)}",
+                "type": "function",
+                "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call.get("arguments", {}))},
+            }]
+            finish_reason = "tool_calls"
+            completion_tokens = 20
+        else:
+            if rule and rule.get("content") is not None:
+                content = rule["content"]
+                completion_tokens = _estimate_tokens(content)
+            else:
+                completion_tokens = self._output_tokens()
+                content = _synthetic_text(text, completion_tokens)
+            message["content"] = content
+
+        self.stats.count("chat.completion_tokens", completion_tokens)
+        created = int(time.time())
+        model = request.get("model", "stub")
+        if request.get("stream"):
+            self._stream_chat(message, model, created, finish_reason)
+            return
+
+        time.sleep(self._generation_delay(completion_tokens))
+        self._send_json(200, {
+            "id": f"chatcmpl-stub-{created}",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _stream_chat(self, message: Dict, model: str, created: int, finish_reason: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: Dict, finish: Optional[str] = None):
+            chunk = {"id": f"chatcmpl-stub-{created}", "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        time.sleep(self.config.draw(self.config.latency))
+        event({"role": "assistant", "content": ""})
+        if message.get("tool_calls"):
+            event({"tool_calls": [dict(message["tool_calls"][0], index=0)]})
+        else:
+            per_token = 1 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0
+            for i, word in enumerate(message["content"].split(" ")):
+                if per_token:
+                    time.sleep(per_token)
+                event({"content": word if i == 0 else f" {word}"})
+        event({}, finish_reason)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _completions(self, request: Dict):
+        prompts = request.get("prompt", "")
+        prompts = prompts if isinstance(prompts, list) else [prompts]
+        choices, completion_tokens = [], 0
+        for index, prompt in enumerate(prompts):
+            prompt = prompt if isinstance(prompt, str) else json.dumps(prompt)
+            rule = self.config.canned(prompt)
+            if rule and rule.get("content") is not None:
+                content = rule["content"]
+                tokens = _estimate_tokens(content)
+            else:
+                tokens = self._output_tokens()
+                content = _synthetic_text(prompt, tokens)
+            completion_tokens += tokens
+            choices.append({"index": index, "text": content, "finish_reason": "stop", "logprobs": None})
+        prompt_tokens = sum(_estimate_tokens(p if isinstance(p, str) else "") for p in prompts)
+        self.stats.count("completions.completion_tokens", completion_tokens)
+        time.sleep(self._generation_delay(completion_tokens))
+        self._send_json(200, {
+            "id": f"cmpl-stub-{int(time.time())}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": choices,
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _embeddings(self, request: Dict):
+        inputs = request.get("input", [])
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        # Token-id inputs (as LangChain sends them) embed by their repr
+        texts = [item if isinstance(item, str) else json.dumps(item) for item in inputs]
+        dim = int(request.get("dimensions") or self.config.embedding_dim)
+        prompt_tokens = sum(len(item) if isinstance(item, list) else _estimate_tokens(item) for item in inputs)
+        self.stats.count("embeddings.inputs", len(texts))
+        # Embedding latency is dominated by the round trip, not the batch size
+        time.sleep(self.config.draw(self.config.latency))
+        if request.get("encoding_format") == "base64":
+            data = [base64.b64encode(struct.pack(f"<{dim}f", *_embedding(t, dim))).decode("ascii") for t in texts]
+        else:
+            data = [_embedding(t, dim) for t in texts]
+        self._send_json(200, {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(data)],
+            "model": request.get("model", "stub"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        })
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once
+    request_queue_size = 256
+
+    def __init__(self, config: StubConfig, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        """
+        Threaded HTTP server answering OpenAI API requests from a StubConfig
+
+        Args:
+            config (StubConfig): Latency, failure and response settings
+            host (str): Interface to bind
+            port (int): Port to bind (0 picks a free one)
+        """
+        super().__init__((host, port), StubHandler)
+        self.config = config
+        self.stats = StubStats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_in_thread(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> StubServer:
+    """Start a stub server on a daemon thread and return it (call shutdown() to stop)."""
+    server = StubServer(config, host, port)
+    threading.Thread(target=server.serve_forever, name="openai-stub", daemon=True).start()
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_config_arguments(parser)
+    return parser
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Add the StubConfig options to a parser (shared with the benchmark driver)."""
+    parser.add_argument("--latency", default="lognormal:-1.5,0.5", help="time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--output-tokens", default="normal:250,60", help="completion length, tokens")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 500")
+    parser.add_argument("--embedding-dim", type=int, default=DEFAULT_EMBEDDING_DIM)
+    parser.add_argument("--responses", help="JSON file of canned response rules")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args) -> StubConfig:
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+    return StubConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        embedding_dim=args.embedding_dim,
+        responses=responses,
+        seed=args.seed,
+    )
+
+
+def main():
+    args = build_parser().parse_args()
+    server = StubServer(config_from_args(args), args.host, args.port)
+    print(f"OpenAI stub listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Replay recorded consultation traces against the offline OpenAI stand-in.
+
+Consultation traces are written by medical_workflow when
+CONSULTATION_TRACE_LOG is set (see consultation_trace.py). Each one records
+when the consultation arrived and, for every stage, its start offset,
+latency (split into upstream service time and time spent waiting), model,
+prompt and completion token counts and number of LLM turns. Traces hold no
+message text.
+
+The replay starts each consultation at its recorded arrival time divided by
+--speed, so the traffic mix, inter-arrival gaps and bursts are kept. Stages
+run in order with their recorded gaps. LLM stages go through a
+ResilientClient with the shared rate limiter and adaptive concurrency
+limiter, as in production, to benchmarks/openai_stub.py, one chat
+completion per recorded turn. The stub answers each completion after its
+share of the recorded service time (not the whole stage latency: queueing
+happens again in the replay's own limiters) with its share of the
+completion tokens, using the X-Stub-Latency and X-Stub-Output-Tokens
+headers. Traces written before service time was recorded (schema 1) fall
+back to the stage latency. Local stages (PDF rendering) are replayed as
+sleeps.
+
+By default only arrivals are compressed, so --speed 4 offers four times the
+recorded load to a backend that is as fast as the recorded one. With
+--compress-service, stage latencies and gaps are divided by --speed as
+well. The whole recording then plays back faster with the same concurrency
+profile, which is useful for checking how the client behaves.
+
+The report compares observed and recorded stage latencies (p50/p95/p99,
+with the recorded upstream service time alongside),
+consultation durations and arrival lag, and includes peak in-flight
+consultations, throughput, ResilientClient counters and the stub's request
+and failure counters.
+
+Usage:
+    python benchmarks/replay_traces.py TRACE_LOG [--speed 10] [--compress-service] [--limit 500]
+        [--rpm 500] [--tpm 200000] [--rate-limit-rate 0.01] [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing as mp
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai_stub import add_config_arguments, config_from_args
+from common import environment, percentiles, serve_stub, stub_counters
+from consultation_trace import load_traces
+
+REPORT_SCHEMA_VERSION = 1
+
+
+def _synthetic_prompt(tokens: int) -> str:
+    # One short word is about one token for both tiktoken and the stub's estimate
+    return " ".join(["patient"] * max(1, tokens))
+
+
+class TraceStageClient:
+    def __init__(self, api):
+        """
+        Swarm-shaped client that replays one traced LLM stage
+
+        ``run`` sends one chat completion per recorded turn through
+        ``get_chat_completion`` (which ResilientClient rate limits, as it does
+        Swarm's), splitting the stage's service time and completion tokens
+        evenly across them, and tells the stub how long to take and how much
+        to write.
+
+        Args:
+            api (openai.OpenAI): Client pointed at the stub
+        """
+        self.api = api
+
+    def get_chat_completion(self, agent, history, latency: float, completion_tokens: int):
+        return self.api.chat.completions.create(
+            model=agent.model,
+            messages=history,
+            max_tokens=completion_tokens,
+            extra_headers={"X-Stub-Latency": f"{latency:.4f}", "X-Stub-Output-Tokens": str(completion_tokens)},
+        )
+
+    def run(self, agent, messages, record=None, scale: float = 1.0):
+        turns = max(1, record.get("turns") or 1)
+        latency = record.get("service", record["latency"]) * scale / turns
+        completion_tokens = max(1, (record.get("completion_tokens") or 1) // turns)
+        replies = []
+        for _ in range(turns):
+            response = self.get_chat_completion(agent, messages, latency, completion_tokens)
+            replies.append({"role": "assistant", "content": response.choices[0].message.content})
+        return SimpleNamespace(messages=replies)
+
+
+class Replay:
+    def __init__(self, traces, client, speed: float, compress_service: bool):
+        """
+        Drive traced consultations at their (compressed) arrival times
+
+        Args:
+            traces (List[Dict]): Traces sorted by arrival
+            client (ResilientClient): Client wrapping a TraceStageClient
+            speed (float): Time compression of arrivals
+            compress_service (bool): Also divide stage latencies and gaps by speed
+        """
+        self.traces = traces
+        self.client = client
+        self.speed = speed
+        self.scale = 1 / speed if compress_service else 1.0
+        self.observed = {}
+        self.expected = {}
+        self.expected_service = {}
+        self.durations = []
+        self.expected_durations = []
+        self.lag = []
+        self.errors = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _sample(self, table: dict, stage: str, seconds: float):
+        with self._lock:
+            table.setdefault(stage, []).append(seconds)
+
+    def _consultation(self, trace, scheduled: float):
+        started = time.monotonic()
+        with self._lock:
+            self.lag.append(started - scheduled)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            for record in trace["stages"]:
+                gap = started + record["offset"] * self.scale - time.monotonic()
+                if gap > 0:
+                    time.sleep(gap)
+                stage_started = time.monotonic()
+                if record["kind"] == "local":
+                    time.sleep(record["latency"] * self.scale)
+                else:
+                    agent = SimpleNamespace(name=record["stage"], model=record.get("model") or "gpt-4o-mini",
+                                            instructions="")
+                    prompt_tokens = record.get("prompt_tokens") or 0
+                    if trace.get("schema_version", 1) >= 2:
+                        # Schema 2 counts the input of every turn; schema 1 counted it once
+                        prompt_tokens //= max(1, record.get("turns") or 1)
+                    messages = [{"role": "user", "content": _synthetic_prompt(prompt_tokens)}]
+                    self.client.run(agent=agent, messages=messages, stage=record["stage"],
+                                    record=record, scale=self.scale)
+                self._sample(self.observed, record["stage"], time.monotonic() - stage_started)
+                self._sample(self.expected, record["stage"], record["latency"] * self.scale)
+                self._sample(self.expected_service, record["stage"],
+                             record.get("service", record["latency"]) * self.scale)
+            with self._lock:
+                self.durations.append(time.monotonic() - started)
+                self.expected_durations.append(trace["duration"] * self.scale)
+        except Exception as e:
+            with self._lock:
+                key = type(e).__name__
+                self.errors[key] = self.errors.get(key, 0) + 1
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def run(self, max_workers: int) -> float:
+        """Replay every trace; returns the wall-clock seconds taken."""
+        first_arrival = self.traces[0]["arrival"]
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for trace in self.traces:
+                scheduled = started + (trace["arrival"] - first_arrival) / self.speed
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._consultation, trace, scheduled)
+        return time.monotonic() - started
+
+    def report(self) -> dict:
+        stages = {}
+        for stage in sorted(self.observed):
+            stages[stage] = {
+                "observed": percentiles(self.observed[stage]),
+                "recorded": percentiles(self.expected[stage]),
+                "recorded_service": percentiles(self.expected_service[stage]),
+            }
+        return {
+            "stages": stages,
+            "consultation_seconds": {
+                "observed": percentiles(self.durations),
+                "recorded": percentiles(self.expected_durations),
+            },
+            "arrival_lag_seconds": percentiles(self.lag),
+            "peak_in_flight": self.peak_in_flight,
+            "errors": self.errors,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", help="consultation trace log (JSON Lines)")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression of arrivals")
+    parser.add_argument("--compress-service", action="store_true",
+                        help="also divide stage latencies and gaps by --speed")
+    parser.add_argument("--limit", type=int, help="replay only the first N consultations")
+    parser.add_argument("--rpm", type=float, help="rate limiter RPM (default OPENAI_RPM_LIMIT)")
+    parser.add_argument("--tpm", type=float, help="rate limiter TPM (default OPENAI_TPM_LIMIT)")
+    parser.add_argument("--max-workers", type=int, default=512, help="threads available to consultations")
+    parser.add_argument("--base-url", help="use an already running stub instead of starting one")
+    parser.add_argument("--json", help="report path (default: benchmarks/results/replay_<time>.json)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    traces = [trace for trace in load_traces(args.traces) if trace.get("stages")]
+    if args.limit:
+        traces = traces[:args.limit]
+    if not traces:
+        parser.error(f"No traces with stages in {args.traces}")
+
+    stub_process = None
+    base_url = args.base_url
+    if base_url is None:
+        ctx = mp.get_context("spawn")
+        queue = ctx.Queue()
+        stub_process = ctx.Process(target=serve_stub, args=(args, queue), daemon=True)
+        stub_process.start()
+        base_url = queue.get(timeout=30)
+
+    from openai import OpenAI
+    from resilience import ResilientClient
+    from rate_limiter import SharedRateLimiter, OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT
+    from concurrency import AdaptiveConcurrencyLimiter
+
+    scratch = tempfile.mkdtemp(prefix="replay_traces_")
+    limiter = SharedRateLimiter(rpm=args.rpm or OPENAI_RPM_LIMIT, tpm=args.tpm or OPENAI_TPM_LIMIT,
+                                path=os.path.join(scratch, "ratelimit.sqlite3"))
+    concurrency = AdaptiveConcurrencyLimiter()
+    api = OpenAI(base_url=base_url, api_key="stub", max_retries=0)
+    client = ResilientClient(TraceStageClient(api), rate_limiter=limiter, concurrency=concurrency,
+                             max_workers=args.max_workers)
+
+    recorded_span = traces[-1]["arrival"] - traces[0]["arrival"]
+    print(f"Replaying {len(traces)} consultations recorded over {recorded_span:.0f}s at {args.speed}x "
+          f"({'arrivals and service' if args.compress_service else 'arrivals'} compressed) against {base_url}")
+    replay = Replay(traces, client, args.speed, args.compress_service)
+    before = stub_counters(base_url)
+    cpu_before = time.process_time()
+    try:
+        seconds = replay.run(args.max_workers)
+    finally:
+        after = stub_counters(base_url)
+        if stub_process is not None:
+            stub_process.terminate()
+    cpu = time.process_time() - cpu_before
+
+    result = replay.report()
+    completed = len(replay.durations)
+    result.update({
+        "consultations": len(traces),
+        "completed": completed,
+        "seconds": round(seconds, 3),
+        "consultations_per_s": round(completed / seconds, 3),
+        "offered_consultations_per_s": round(len(traces) / max(recorded_span / args.speed, 1e-9), 3),
+        "client_cpu_seconds": round(cpu, 3),
+        "resilient_client": client.stage_stats(),
+        "concurrency_limiter": concurrency.snapshot(),
+        "stub": {key: after.get(key, 0) - before.get(key, 0) for key in after},
+    })
+
+    for stage, stats in result["stages"].items():
+        observed, recorded, service = stats["observed"], stats["recorded"], stats["recorded_service"]
+        print(f"  {stage:<16} p50 {observed['p50']:>8}s (recorded {recorded['p50']}, service {service['p50']})  "
+              f"p95 {observed['p95']:>8}s (recorded {recorded['p95']}, service {service['p95']})")
+    lag = result["arrival_lag_seconds"]
+    print(f"{completed}/{len(traces)} completed in {seconds:.1f}s, {result['consultations_per_s']} consult/s, "
+          f"peak {replay.peak_in_flight} in flight, arrival lag p95 {lag.get('p95')}s, errors {replay.errors}")
+
+    report = {
+        "schema_version": REPORT_SCHEMA_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "traces": os.path.abspath(args.traces),
+        "speed": args.speed,
+        "compress_service": args.compress_service,
+        "stub": config_from_args(args).spec,
+        "result": result,
+    }
+    output = args.json or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", f"replay_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
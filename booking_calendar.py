@@ -0,0 +1,237 @@
+from bisect import bisect_left, bisect_right
+from datetime import date as Date, datetime
+from math import gcd
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Recurrence names accepted by parse_recurrence, as periods in minutes
+RECURRENCE_PERIODS = {
+    "weekly": MINUTES_PER_WEEK,
+    "biweekly": 2 * MINUTES_PER_WEEK,
+}
+
+
+def to_minutes(date: str, time: str = "00:00") -> int:
+    """
+    Convert a date and HH:MM time to minutes on a single absolute axis
+
+    Raises:
+        ValueError: If the date or time is malformed
+    """
+    day = datetime.strptime(date, "%Y-%m-%d").toordinal()
+    clock = datetime.strptime(time, "%H:%M")
+    return day * MINUTES_PER_DAY + clock.hour * 60 + clock.minute
+
+
+def format_time(minute_of_day: int) -> str:
+    """Format minutes after midnight as HH:MM."""
+    return f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+def format_minutes(minutes: int) -> Tuple[str, str]:
+    """Convert absolute minutes back to (YYYY-MM-DD, HH:MM)."""
+    day, minute = divmod(minutes, MINUTES_PER_DAY)
+    return Date.fromordinal(day).isoformat(), format_time(minute)
+
+
+def parse_recurrence(recurrence: str) -> int:
+    """Return the period in minutes of a named recurrence such as "weekly"."""
+    period = RECURRENCE_PERIODS.get(recurrence.strip().lower())
+    if period is None:
+        raise ValueError(f"Unknown recurrence {recurrence!r}; use one of {', '.join(RECURRENCE_PERIODS)}")
+    return period
+
+
+class Recurrence(NamedTuple):
+    """A booking repeated every ``period`` minutes, ``count`` times (forever if None)."""
+
+    start: int
+    duration: int
+    period: int = MINUTES_PER_WEEK
+    count: Optional[int] = None
+
+    @property
+    def end(self) -> Optional[int]:
+        """End of the last occurrence, or None for an open-ended series."""
+        if self.count is None:
+            return None
+        return self.start + (self.count - 1) * self.period + self.duration
+
+    def last_index_before(self, t: int) -> Optional[int]:
+        """Index of the last occurrence starting before t, or None."""
+        if t <= self.start:
+            return None
+        index = (t - 1 - self.start) // self.period
+        if self.count is not None:
+            index = min(index, self.count - 1)
+        return index
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Whether any occurrence intersects [start, end), in constant time."""
+        # Occurrences are disjoint, so only the latest one starting before
+        # ``end`` can reach into the window.
+        index = self.last_index_before(end)
+        return index is not None and self.start + index * self.period + self.duration > start
+
+    def occurrences(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Lazily yield occurrences intersecting [start, end)."""
+        last = self.last_index_before(end)
+        if last is None:
+            return
+        first = max(0, (start - self.duration - self.start) // self.period + 1)
+        for index in range(first, last + 1):
+            occurrence = self.start + index * self.period
+            yield occurrence, occurrence + self.duration
+
+
+class Booking(NamedTuple):
+    """A one-off or recurring booking of a room; ``start``/``end`` are absolute minutes."""
+
+    id: int
+    room: str
+    start: int
+    end: int
+    class_name: str
+    rule: Optional[Recurrence] = None
+    instructor: Optional[str] = None
+
+    def describe(self) -> str:
+        date, time = format_minutes(self.start)
+        text = f"{date} {time} in {self.room} ({self.end - self.start} min)"
+        if self.instructor:
+            text += f" with {self.instructor}"
+        if self.rule is not None:
+            every = next((name for name, period in RECURRENCE_PERIODS.items() if period == self.rule.period), "recurring")
+            text += f", {every}" + (f" x{self.rule.count}" if self.rule.count else "")
+        return text
+
+
+def rules_overlap(a: Recurrence, b: Recurrence) -> bool:
+    """Whether two series ever overlap; checks one joint period, not the whole horizon."""
+    window_start = max(a.start, b.start)
+    ends = [rule.end for rule in (a, b) if rule.end is not None]
+    window_end = min(ends) if ends else None
+    if window_end is not None and window_end <= window_start:
+        return False
+    # The relative phase of the two series repeats every lcm(period) minutes
+    joint = a.period * b.period // gcd(a.period, b.period)
+    horizon = window_start + joint + a.period + max(a.duration, b.duration)
+    if window_end is not None:
+        horizon = min(horizon, window_end)
+    return any(b.overlaps(start, end) for start, end in a.occurrences(window_start - b.duration, horizon))
+
+
+class RoomCalendar:
+    def __init__(self):
+        """
+        Bookings of one room: disjoint one-off intervals plus recurrence rules
+
+        Because a room's bookings never overlap, one-off intervals are kept
+        sorted by start in parallel arrays and their ends are sorted too, so
+        overlap checks are a single bisection. Recurrence rules are stored as
+        rules and only expanded for the window being queried; each rule
+        answers overlap checks in constant time.
+        """
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._ids: List[int] = []
+        self._rules: List[Tuple[Recurrence, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._rules)
+
+    def conflict(self, start: int, end: int) -> Optional[int]:
+        """Return the id of a booking overlapping [start, end), or None."""
+        i = bisect_left(self._starts, end) - 1
+        if i >= 0 and self._ends[i] > start:
+            return self._ids[i]
+        for rule, booking_id in self._rules:
+            if rule.overlaps(start, end):
+                return booking_id
+        return None
+
+    def rule_conflict(self, rule: Recurrence) -> Optional[int]:
+        """Return the id of a booking overlapping any occurrence of rule, or None."""
+        first = bisect_right(self._ends, rule.start)
+        last = len(self._starts) if rule.end is None else bisect_left(self._starts, rule.end)
+        for i in range(first, last):
+            if rule.overlaps(self._starts[i], self._ends[i]):
+                return self._ids[i]
+        for other, booking_id in self._rules:
+            if rules_overlap(rule, other):
+                return booking_id
+        return None
+
+    def add(self, start: int, end: int, booking_id: int):
+        """Insert a one-off booking; the caller has checked for conflicts."""
+        i = bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._ids.insert(i, booking_id)
+
+    def add_rule(self, rule: Recurrence, booking_id: int):
+        """Insert a recurring booking; the caller has checked for conflicts."""
+        self._rules.append((rule, booking_id))
+
+    def remove(self, booking_id: int, start: int):
+        """Remove a booking by id (start locates one-off bookings)."""
+        i = bisect_left(self._starts, start)
+        if i < len(self._ids) and self._ids[i] == booking_id:
+            del self._starts[i], self._ends[i], self._ids[i]
+            return
+        self._rules = [(rule, rid) for rule, rid in self._rules if rid != booking_id]
+
+    def occurrences(self, start: int, end: int) -> List[Tuple[int, int, int]]:
+        """All bookings intersecting [start, end) as sorted (start, end, id) triples."""
+        first = bisect_right(self._ends, start)
+        last = bisect_left(self._starts, end)
+        found = [(self._starts[i], self._ends[i], self._ids[i]) for i in range(first, last)]
+        for rule, booking_id in self._rules:
+            found.extend((s, e, booking_id) for s, e in rule.occurrences(start, end))
+        found.sort()
+        return found
+
+    def booking_at(self, start: int) -> Optional[int]:
+        """Id of the booking (or occurrence) that starts exactly at start."""
+        for s, _, booking_id in self.occurrences(start, start + 1):
+            if s == start:
+                return booking_id
+        return None
+
+    def free_windows(self, start: int, end: int, min_duration: int = 1) -> List[Tuple[int, int]]:
+        """Gaps of at least min_duration minutes within [start, end)."""
+        windows = []
+        cursor = start
+        for s, e, _ in self.occurrences(start, end):
+            if s - cursor >= min_duration:
+                windows.append((cursor, s))
+            cursor = max(cursor, e)
+        if end - cursor >= min_duration:
+            windows.append((cursor, end))
+        return windows
+
+    def next_available(self, after: int, duration: int, day_open: int, day_close: int,
+                       horizon_days: int = 366) -> Optional[int]:
+        """
+        Earliest start at or after ``after`` where ``duration`` minutes fit within opening hours
+
+        Args:
+            after (int): Absolute minute to search from
+            duration (int): Length of the session in minutes
+            day_open (int): Opening time as minutes after midnight
+            day_close (int): Closing time as minutes after midnight
+            horizon_days (int): Days to search before giving up
+
+        Returns:
+            Optional[int]: Absolute start minute, or None within the horizon
+        """
+        day = after // MINUTES_PER_DAY
+        for offset in range(horizon_days):
+            base = (day + offset) * MINUTES_PER_DAY
+            window_start = max(after, base + day_open)
+            windows = self.free_windows(window_start, base + day_close, duration)
+            if windows:
+                return windows[0][0]
+        return None
@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from booking_calendar import Booking, Recurrence, RoomCalendar, format_minutes
+
+BOOKING_DB = os.getenv("BOOKING_DB", "bookings.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id          INTEGER PRIMARY KEY,
+    date        TEXT NOT NULL,
+    room        TEXT NOT NULL,
+    slot        TEXT NOT NULL,
+    start_min   INTEGER NOT NULL,
+    end_min     INTEGER NOT NULL,
+    class_name  TEXT NOT NULL,
+    period      INTEGER,
+    count       INTEGER,
+    created_at  TEXT NOT NULL,
+    instructor  TEXT,
+    UNIQUE (date, room, slot)
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_room_start ON bookings(room, start_min);
+CREATE INDEX IF NOT EXISTS idx_bookings_class ON bookings(class_name);
+"""
+
+# Columns added after the first release, applied to existing databases
+_MIGRATIONS = (
+    ("instructor", "ALTER TABLE bookings ADD COLUMN instructor TEXT"),
+)
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_bookings_instructor ON bookings(instructor, start_min) WHERE instructor IS NOT NULL;
+"""
+
+_COLUMNS = "id, room, start_min, end_min, class_name, period, count, instructor"
+
+# (stored booking, conflicting booking); exactly one of the two is set
+BookingResult = Tuple[Optional[Booking], Optional[Booking]]
+
+
+def _to_booking(row) -> Booking:
+    booking_id, room, start, end, class_name, period, count, instructor = row
+    rule = Recurrence(start, end - start, period, count) if period else None
+    return Booking(booking_id, room, start, end, class_name, rule, instructor)
+
+
+class BookingStore:
+    def __init__(self, path: str = BOOKING_DB):
+        """
+        SQLite-backed booking calendar shared by several scheduler processes
+
+        The database runs in WAL mode so readers never block the writer.
+        Every batch of bookings is checked for room and instructor conflicts
+        and inserted inside one ``BEGIN IMMEDIATE`` transaction, which makes
+        check-then-book atomic across processes; only the rooms and
+        instructors involved are read, so the write lock is held briefly.
+        UNIQUE(date, room, slot) backs this up in the schema.
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._migrate(self._connect())
+
+    def _migrate(self, conn: sqlite3.Connection):
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}
+        for column, statement in _MIGRATIONS:
+            if column not in columns:
+                try:
+                    conn.execute(statement)
+                except sqlite3.OperationalError:
+                    # Another process migrated concurrently
+                    pass
+        conn.executescript(_INDEXES)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self) -> Tuple[int, int]:
+        """
+        Token that changes whenever the calendar may have changed
+
+        PRAGMA data_version moves when another connection commits; writes
+        through this store are counted separately. Comparing tokens costs one
+        pragma, so readers can validate their cache on every call.
+        """
+        data_version = self._connect().execute("PRAGMA data_version").fetchone()[0]
+        return data_version, self._writes
+
+    def _wrote(self):
+        with self._writes_lock:
+            self._writes += 1
+
+    def load_all(self) -> List[Booking]:
+        """Return every booking, for rebuilding an in-memory cache."""
+        rows = self._connect().execute(f"SELECT {_COLUMNS} FROM bookings ORDER BY room, start_min")
+        return [_to_booking(row) for row in rows]
+
+    def _calendar(self, conn, column: str, value: str, start: int, end: Optional[int],
+                  known: Dict[int, Booking]) -> RoomCalendar:
+        """Load the bookings of a room or instructor that could overlap [start, end) into a calendar."""
+        calendar = RoomCalendar()
+        if end is None:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM bookings WHERE {column} = ? AND (period IS NOT NULL OR end_min > ?)",
+                (value, start),
+            )
+        else:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM bookings WHERE {column} = ? "
+                "AND (period IS NOT NULL OR (start_min < ? AND end_min > ?))",
+                (value, end, start),
+            )
+        for row in rows:
+            booking = _to_booking(row)
+            known[booking.id] = booking
+            if booking.rule is None:
+                calendar.add(booking.start, booking.end, booking.id)
+            else:
+                calendar.add_rule(booking.rule, booking.id)
+        return calendar
+
+    def _book(self, conn, booking: Booking, known: Dict[int, Booking]) -> BookingResult:
+        rule = booking.rule
+        end = booking.end if rule is None else rule.end
+        # Bookings made earlier in this batch are already in the table
+        # (same transaction), so these queries see them too.
+        owners = [("room", booking.room)]
+        if booking.instructor:
+            owners.append(("instructor", booking.instructor))
+        for column, value in owners:
+            calendar = self._calendar(conn, column, value, booking.start, end, known)
+            conflict_id = calendar.conflict(booking.start, booking.end) if rule is None else calendar.rule_conflict(rule)
+            if conflict_id is not None:
+                return None, known[conflict_id]
+
+        date, slot = format_minutes(booking.start)
+        cursor = conn.execute(
+            "INSERT INTO bookings (date, room, slot, start_min, end_min, class_name, period, count, created_at, "
+            "instructor) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (date, booking.room, slot, booking.start, booking.end, booking.class_name,
+             rule.period if rule else None, rule.count if rule else None, datetime.now().isoformat(),
+             booking.instructor),
+        )
+        return booking._replace(id=cursor.lastrowid), None
+
+    def book_many(self, bookings: List[Booking], atomic: bool = False) -> List[BookingResult]:
+        """
+        Book several classes in a single transaction
+
+        Later bookings in the batch are checked against earlier ones as well
+        as against everything already stored.
+
+        Args:
+            bookings (List[Booking]): Bookings to store (their ids are ignored)
+            atomic (bool): Store nothing if any booking conflicts
+
+        Returns:
+            List[BookingResult]: Per booking, the stored booking or the one it
+            conflicts with; after an atomic rollback no booking is stored and
+            only the conflicting entries are set
+        """
+        if not bookings:
+            return []
+        conn = self._connect()
+        known: Dict[int, Booking] = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            results = [self._book(conn, booking, known) for booking in bookings]
+            if atomic and any(conflict is not None for _, conflict in results):
+                conn.execute("ROLLBACK")
+                return [(None, conflict) for _, conflict in results]
+            conn.execute("COMMIT")
+        except BaseException:
+            # Also covers IntegrityError from UNIQUE(date, room, slot)
+            conn.execute("ROLLBACK")
+            raise
+        self._wrote()
+        return results
+
+    def book(self, booking: Booking) -> BookingResult:
+        """Book one class; returns (stored booking, None) or (None, conflicting booking)."""
+        return self.book_many([booking])[0]
+
+    def cancel(self, booking_id: int) -> bool:
+        """Delete a booking (a whole series if recurring); False if it did not exist."""
+        conn = self._connect()
+        deleted = conn.execute("DELETE FROM bookings WHERE id = ?", (booking_id,)).rowcount
+        self._wrote()
+        return bool(deleted)
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,304 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from tracing import current_span
+from metrics import CACHE_REQUESTS
+
+LLM_CASSETTE = os.getenv("LLM_CASSETTE")
+# off | record | replay | auto (replay what matches, record the rest)
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "auto")
+# strict | fuzzy
+LLM_CASSETTE_MATCH = os.getenv("LLM_CASSETTE_MATCH", "strict")
+
+CASSETTE_MODES = ("off", "record", "replay", "auto")
+MATCH_MODES = ("strict", "fuzzy")
+RECORDED_ENDPOINTS = ("/chat/completions", "/completions", "/embeddings")
+
+# Request fields that do not change what the model is asked
+_FUZZY_IGNORED_FIELDS = {"stream", "stream_options", "temperature", "top_p", "seed", "user", "n",
+                         "max_tokens", "timeout", "parallel_tool_calls"}
+_VOLATILE = [
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"), "<uuid>"),
+    (re.compile(r"\d+"), "<n>"),
+    (re.compile(r"\s+"), " "),
+]
+
+_cassettes: Dict[str, "Cassette"] = {}
+_cassettes_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+
+
+def _endpoint(path: str) -> Optional[str]:
+    for endpoint in RECORDED_ENDPOINTS:
+        if path.endswith(endpoint):
+            return endpoint
+    return None
+
+
+def _digest(data) -> str:
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _normalize(value):
+    """Lower-case strings, collapse whitespace and mask numbers/ids, recursively."""
+    if isinstance(value, str):
+        text = value.lower().strip()
+        for pattern, replacement in _VOLATILE:
+            text = pattern.sub(replacement, text)
+        return text
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if key != "tool_call_id"}
+    return value
+
+
+def request_keys(endpoint: str, body: Dict) -> Tuple[str, str]:
+    """
+    Matching keys for a request body
+
+    Returns:
+        Tuple[str, str]: (strict, fuzzy) keys. The strict key covers the whole
+        canonical body; the fuzzy key keeps only the model, messages/prompt/input
+        and tool names, normalized so ids, numbers and whitespace do not matter.
+    """
+    strict = _digest([endpoint, body])
+    fuzzy_body = {key: value for key, value in body.items() if key not in _FUZZY_IGNORED_FIELDS}
+    if "tools" in fuzzy_body:
+        fuzzy_body["tools"] = sorted(tool.get("function", {}).get("name", "") for tool in fuzzy_body["tools"])
+    return strict, _digest([endpoint, _normalize(fuzzy_body)])
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "auto", match: str = "strict"):
+        """
+        Recorded OpenAI interactions, one JSON line per request/response pair
+
+        Files ending in .gz are gzip-compressed. Each line holds the strict and
+        fuzzy request keys, the endpoint and model, the request body and the
+        response status, content type and body. Only successful responses are
+        recorded, so replays do not reproduce retries.
+
+        Replay serves recordings for a key in the order they were recorded,
+        repeating the last one once they run out. Fuzzy matching tries the
+        strict key, then the fuzzy key, then the next unused recording for the
+        same endpoint and model, so a pipeline whose prompts changed slightly
+        still replays in sequence.
+
+        Args:
+            path (str): Cassette file
+            mode (str): record (start a new file), replay (never hit the network)
+                or auto (replay what matches, record the rest)
+            match (str): strict or fuzzy request matching
+        """
+        if mode not in CASSETTE_MODES or mode == "off":
+            raise ValueError(f"Unknown cassette mode {mode!r}; use record, replay or auto")
+        if match not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode {match!r}; use strict or fuzzy")
+        self.path = path
+        self.mode = mode
+        self.match = match
+        self.entries: List[Dict] = []
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._by_strict: Dict[str, List[int]] = {}
+        self._by_fuzzy: Dict[str, List[int]] = {}
+        self._by_model: Dict[Tuple[str, str], List[int]] = {}
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        self._used = set()
+        self._lock = threading.Lock()
+
+        if mode == "record":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            with self._open("w"):
+                pass
+        elif os.path.exists(path):
+            with self._open("r") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette not found: {path}")
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _index(self, entry: Dict):
+        index = len(self.entries)
+        self.entries.append(entry)
+        self._by_strict.setdefault(entry["key"], []).append(index)
+        self._by_fuzzy.setdefault(entry["fuzzy"], []).append(index)
+        self._by_model.setdefault((entry["endpoint"], entry.get("model") or ""), []).append(index)
+
+    def _next(self, kind: str, key: str, candidates: List[int]) -> int:
+        cursor = self._cursors.get((kind, key), 0)
+        self._cursors[(kind, key)] = cursor + 1
+        return candidates[min(cursor, len(candidates) - 1)]
+
+    def lookup(self, endpoint: str, body: Dict) -> Optional[Dict]:
+        """Return the recording to serve for a request, or None."""
+        strict, fuzzy = request_keys(endpoint, body)
+        with self._lock:
+            index = None
+            if strict in self._by_strict:
+                index = self._next("strict", strict, self._by_strict[strict])
+            elif self.match == "fuzzy" and fuzzy in self._by_fuzzy:
+                index = self._next("fuzzy", fuzzy, self._by_fuzzy[fuzzy])
+            elif self.match == "fuzzy":
+                unused = [i for i in self._by_model.get((endpoint, body.get("model") or ""), ()) if i not in self._used]
+                index = unused[0] if unused else None
+            if index is None:
+                self.misses += 1
+                return None
+            self._used.add(index)
+            self.hits += 1
+            return self.entries[index]
+
+    def record(self, endpoint: str, body: Dict, status: int, content_type: str, content: bytes):
+        """Append one interaction to the file and the in-memory index."""
+        strict, fuzzy = request_keys(endpoint, body)
+        text = content.decode("utf-8")
+        entry = {
+            "key": strict,
+            "fuzzy": fuzzy,
+            "endpoint": endpoint,
+            "model": body.get("model"),
+            "request": body,
+            "status": status,
+            "content_type": content_type,
+        }
+        if content_type.startswith("application/json"):
+            entry["json"] = json.loads(text)
+        else:
+            entry["text"] = text
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            with self._open("a") as f:
+                f.write(line + "\n")
+            self._index(entry)
+            self._used.add(len(self.entries) - 1)
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+class CassetteTransport(httpx.BaseTransport):
+    def __init__(self, cassette: Cassette, transport: Optional[httpx.BaseTransport] = None):
+        """
+        httpx transport that records or replays OpenAI API calls
+
+        Chat completions (streamed or not, tool calls included), legacy
+        completions and embeddings go through the cassette; any other request
+        is passed to the wrapped transport. Streamed responses are buffered
+        when recorded and replayed as one SSE body. A replay miss is answered
+        with an OpenAI-style 404 so the client raises a non-retryable error
+        naming the request.
+
+        Args:
+            cassette (Cassette): Recordings to serve and extend
+            transport (httpx.BaseTransport): Network transport (default httpx.HTTPTransport)
+        """
+        self.cassette = cassette
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = _endpoint(request.url.path)
+        if endpoint is None or request.method != "POST":
+            return self.transport.handle_request(request)
+        body = json.loads(request.read() or b"{}")
+
+        if self.cassette.mode != "record":
+            entry = self.cassette.lookup(endpoint, body)
+            current_span().set(cassette="hit" if entry is not None else "miss")
+            CACHE_REQUESTS.inc(cache="cassette", result="hit" if entry is not None else "miss")
+            if entry is not None:
+                if "json" in entry:
+                    content = json.dumps(entry["json"]).encode("utf-8")
+                else:
+                    content = entry["text"].encode("utf-8")
+                return httpx.Response(
+                    entry["status"], headers={"content-type": entry["content_type"]},
+                    content=content, request=request,
+                )
+            if self.cassette.mode == "replay":
+                message = f"Cassette miss: no recording in {self.cassette.path} for " \
+                          f"{endpoint} (model {body.get('model')}, {self.cassette.match} matching)"
+                return httpx.Response(
+                    404, json={"error": {"message": message, "type": "cassette_miss", "code": None}},
+                    request=request,
+                )
+
+        response = self.transport.handle_request(request)
+        content = response.read()
+        content_type = response.headers.get("content-type", "application/json")
+        if response.status_code < 400:
+            self.cassette.record(endpoint, body, response.status_code, content_type, content)
+        # content is already decoded, so drop the encoding headers that described the wire format
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(
+            response.status_code, headers=headers, content=content,
+            request=request, extensions=response.extensions,
+        )
+
+    def close(self):
+        self.transport.close()
+
+
+def get_cassette(path: Optional[str] = None, mode: Optional[str] = None,
+                 match: Optional[str] = None) -> Optional[Cassette]:
+    """
+    Return the process-wide cassette for a path (default LLM_CASSETTE), or None when off
+
+    Args:
+        path (str): Cassette file; defaults to LLM_CASSETTE
+        mode (str): Defaults to LLM_CASSETTE_MODE
+        match (str): Defaults to LLM_CASSETTE_MATCH
+    """
+    path = path or LLM_CASSETTE
+    mode = mode or LLM_CASSETTE_MODE
+    if not path or mode == "off":
+        return None
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path, mode, match or LLM_CASSETTE_MATCH)
+        return _cassettes[path]
+
+
+def get_http_client() -> Optional[httpx.Client]:
+    """
+    httpx client for OpenAI/LangChain clients, recording or replaying through
+    the configured cassette
+
+    Returns None when no cassette is configured, which leaves the clients on
+    their default transport: pass it as ``http_client=get_http_client()``.
+    """
+    global _http_client
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    with _cassettes_lock:
+        if _http_client is None:
+            # Same limits and timeout the openai client would use by default
+            transport = httpx.HTTPTransport(
+                limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+            )
+            _http_client = httpx.Client(
+                transport=CassetteTransport(cassette, transport),
+                timeout=httpx.Timeout(600.0, connect=5.0),
+                follow_redirects=True,
+            )
+        return _http_client
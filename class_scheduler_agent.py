@@ -1,104 +1,581 @@
-from typing import List, Dict
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple, Union
 from datetime import datetime, timedelta
 from langchain.agents import Tool, AgentExecutor, create_react_agent
 from langchain_openai import OpenAI
 from langchain.prompts import PromptTemplate
-from langchain.tools import tool
 from dotenv import load_dotenv
 import os
+from rate_limiter_langchain import RateLimitCallbackHandler
+from booking_store import BOOKING_DB, BookingResult, BookingStore
+from scheduler_commands import CommandFastPath
+from timetable_solver import MAX_SEARCH_STEPS, Candidate, ClassRequest, TimetableSolver, parse_request
+from booking_calendar import (
+    MINUTES_PER_DAY, Booking, Recurrence, RoomCalendar, format_minutes, format_time, parse_recurrence, to_minutes,
+)
 
 # Load environment variables
 load_dotenv()
 
+SLOT_MINUTES = 60
+
+# Tool replies for arguments the model got wrong; tools return text rather than raise
+_INVALID_DATE = "Invalid date. Use YYYY-MM-DD"
+_INVALID_DURATION = "Invalid duration. Give a whole number of minutes"
+
 class ClassScheduler:
-    def __init__(self):
-        self.schedule: Dict[str, List[Dict]] = {}
+    def __init__(self, store: Optional[BookingStore] = None):
+        """
+        Class calendar, optionally persisted in a shared BookingStore
+
+        Each room has a RoomCalendar holding one-off bookings of any duration
+        and recurrence rules that are expanded only for the dates queried.
+        Hourly ``time_slots`` queries go through a derived cache of date ->
+        room -> bitmask (bit i set when ``time_slots[i]`` overlaps a booking),
+        so availability lookups stay single bit operations. A reverse index
+        maps class names to their bookings, and each instructor has a
+        RoomCalendar of their classes so nobody is booked twice at once.
+
+        With a store, these structures are a read cache of the database:
+        bookings and cancellations go through the store's transactions, and
+        every public call first compares the store's version token and
+        reloads if another scheduler has written since.
+
+        Args:
+            store (BookingStore): Shared persistent calendar (in-memory only if None)
+        """
         self.rooms: List[str] = ["Room A", "Room B", "Room C"]
         self.time_slots = [
             "09:00", "10:00", "11:00", "12:00", "13:00", 
             "14:00", "15:00", "16:00", "17:00"
         ]
+        self._slot_minutes = [to_minutes("2000-01-01", slot) % MINUTES_PER_DAY for slot in self.time_slots]
+        self.day_open = self._slot_minutes[0]
+        self.day_close = self._slot_minutes[-1] + SLOT_MINUTES
+        self._room_set = set(self.rooms)
+        # room -> seats; rooms without an entry are unconstrained
+        self.room_capacity: Dict[str, int] = {}
+        self._all_slots = (1 << len(self.time_slots)) - 1
+        self.calendars: Dict[str, RoomCalendar] = {}
+        self._bookings: Dict[int, Booking] = {}
+        self._next_id = 1
+        # date -> room -> bitmask of booked slots, filled lazily
+        self._masks: Dict[str, Dict[str, int]] = {}
+        # class name -> booking ids
+        self._by_class: Dict[str, Set[int]] = {}
+        self._instructors: Dict[str, RoomCalendar] = {}
+        self.store = store
+        self._version = None
+        self._sync()
+
+    def _sync(self):
+        """Reload the cache if the store changed since it was built."""
+        if self.store is None:
+            return
+        version = self.store.version()
+        if version == self._version:
+            return
+        self.calendars.clear()
+        self._bookings.clear()
+        self._masks.clear()
+        self._by_class.clear()
+        self._instructors.clear()
+        for booking in self.store.load_all():
+            self.add_room(booking.room)
+            self._insert(booking)
+        self._version = version
+
+    def _wrote(self, before):
+        """After writing through the store, keep the cache only if nobody else wrote meanwhile."""
+        version = self.store.version()
+        if before is not None and version == (before[0], before[1] + 1):
+            self._version = version
+            return True
+        self._version = None
+        return False
+
+    @property
+    def schedule(self) -> Dict[str, List[Dict]]:
+        """Bookings as date -> list of dicts; recurring ones are listed under their first date."""
+        self._sync()
+        schedule: Dict[str, List[Dict]] = {}
+        for booking in self._bookings.values():
+            date, time = format_minutes(booking.start)
+            entry = {
+                'room': booking.room,
+                'time': time,
+                'class_name': booking.class_name,
+                'duration': booking.end - booking.start
+            }
+            if booking.instructor:
+                entry['instructor'] = booking.instructor
+            if booking.rule is not None:
+                entry['recurrence'] = booking.describe()
+            schedule.setdefault(date, []).append(entry)
+        return schedule
+
+    def add_room(self, room: str, capacity: Optional[int] = None):
+        """Add a room to the calendar, optionally with its number of seats."""
+        if room not in self._room_set:
+            self.rooms.append(room)
+            self._room_set.add(room)
+        if capacity is not None:
+            self.room_capacity[room] = int(capacity)
+
+    def slots_from_mask(self, mask: int) -> List[str]:
+        """Return the time slots whose bits are set in mask, in order."""
+        slots = []
+        while mask:
+            low = mask & -mask
+            slots.append(self.time_slots[low.bit_length() - 1])
+            mask ^= low
+        return slots
+
+    def _booked_mask(self, date: str, room: str) -> int:
+        masks = self._masks.setdefault(date, {})
+        mask = masks.get(room)
+        if mask is None:
+            mask = 0
+            calendar = self.calendars.get(room)
+            if calendar:
+                day = to_minutes(date)
+                for start, end, _ in calendar.occurrences(day + self.day_open, day + self.day_close):
+                    for i, slot_start in enumerate(self._slot_minutes):
+                        if start < day + slot_start + SLOT_MINUTES and end > day + slot_start:
+                            mask |= 1 << i
+            masks[room] = mask
+        return mask
+
+    def free_mask(self, date: str, room: str) -> int:
+        """Return the bitmask of free slots for a room on a date."""
+        self._sync()
+        return self._all_slots & ~self._booked_mask(date, room)
+
+    def availability_matrix(self, dates: List[str], rooms: Optional[List[str]] = None) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Free time slots for every combination of dates and rooms
+
+        Args:
+            dates (List[str]): Dates (YYYY-MM-DD)
+            rooms (List[str]): Rooms to include (all rooms by default)
+
+        Returns:
+            Dict[str, Dict[str, List[str]]]: date -> room -> free time slots
+        """
+        rooms = rooms or self.rooms
+        return {
+            date: {room: self.slots_from_mask(self.free_mask(date, room)) for room in rooms}
+            for date in dates
+        }
+
+    def _invalidate(self, booking: Booking):
+        if booking.rule is None:
+            first = booking.start // MINUTES_PER_DAY
+            for day in range(first, (booking.end - 1) // MINUTES_PER_DAY + 1):
+                self._masks.get(format_minutes(day * MINUTES_PER_DAY)[0], {}).pop(booking.room, None)
+        else:
+            for masks in self._masks.values():
+                masks.pop(booking.room, None)
+
+    def _owner_calendars(self, booking: Booking) -> List[RoomCalendar]:
+        calendars = [self.calendars.setdefault(booking.room, RoomCalendar())]
+        if booking.instructor:
+            calendars.append(self._instructors.setdefault(booking.instructor, RoomCalendar()))
+        return calendars
+
+    def _insert(self, booking: Booking):
+        for calendar in self._owner_calendars(booking):
+            if booking.rule is None:
+                calendar.add(booking.start, booking.end, booking.id)
+            else:
+                calendar.add_rule(booking.rule, booking.id)
+        self._bookings[booking.id] = booking
+        self._by_class.setdefault(booking.class_name, set()).add(booking.id)
+        self._next_id = max(self._next_id, booking.id + 1)
+        self._invalidate(booking)
+
+    def _remove(self, booking: Booking):
+        for calendar in self._owner_calendars(booking):
+            calendar.remove(booking.id, booking.start)
+        del self._bookings[booking.id]
+        ids = self._by_class[booking.class_name]
+        ids.discard(booking.id)
+        if not ids:
+            del self._by_class[booking.class_name]
+        self._invalidate(booking)
+
+    def _conflict(self, room: str, start: int, end: int, rule: Optional[Recurrence],
+                  instructor: Optional[str] = None) -> Optional[Booking]:
+        """Return a booking of the room (or the instructor) that overlaps, or None."""
+        calendars = [self.calendars.get(room)]
+        if instructor:
+            calendars.append(self._instructors.get(instructor))
+        for calendar in calendars:
+            if calendar is None:
+                continue
+            booking_id = calendar.conflict(start, end) if rule is None else calendar.rule_conflict(rule)
+            if booking_id is not None:
+                return self._bookings[booking_id]
+        return None
+
+    def _book(self, bookings: List[Booking], atomic: bool = False) -> List[BookingResult]:
+        """
+        Store bookings (through the store when there is one) and update the cache
+
+        Returns:
+            List[BookingResult]: Per booking, the stored booking or the one it conflicts with
+        """
+        if self.store is None:
+            results = []
+            for booking in bookings:
+                conflict = self._conflict(booking.room, booking.start, booking.end, booking.rule, booking.instructor)
+                if conflict is None:
+                    booking = booking._replace(id=self._next_id)
+                    self._insert(booking)
+                    results.append((booking, None))
+                else:
+                    results.append((None, conflict))
+            if atomic and any(conflict is not None for _, conflict in results):
+                for booking, _ in results:
+                    if booking is not None:
+                        self._remove(booking)
+                return [(None, conflict) for _, conflict in results]
+            return results
+
+        # The store re-checks inside its transaction, in case another
+        # scheduler booked the room since our cache was loaded
+        before = self._version
+        results = self.store.book_many(bookings, atomic=atomic)
+        if not self._wrote(before):
+            self._sync()
+        else:
+            for booking, _ in results:
+                if booking is not None:
+                    self._insert(booking)
+        return results
+
+    def _parse_booking(self, date: str, room: str, time: str, duration, recurrence: Optional[str],
+                       occurrences) -> Tuple[int, int, Optional[Recurrence]]:
+        """Validate booking arguments, raising ValueError with a user-facing message."""
+        if room not in self._room_set:
+            raise ValueError(f"Invalid room. Available rooms are: {', '.join(self.rooms)}")
+        try:
+            start = to_minutes(date, time)
+        except ValueError:
+            raise ValueError("Invalid date or time. Use YYYY-MM-DD and HH:MM")
+        duration = int(duration)
+        minute = start % MINUTES_PER_DAY
+        if duration <= 0 or minute < self.day_open or minute + duration > self.day_close:
+            opening = f"{format_time(self.day_open)}-{format_time(self.day_close)}"
+            raise ValueError(f"Invalid time slot. Classes must fit within opening hours ({opening})")
+        rule = None
+        if recurrence:
+            period = parse_recurrence(recurrence)
+            count = int(occurrences) if occurrences else None
+            if count is not None and count < 1:
+                raise ValueError("occurrences must be at least 1")
+            rule = Recurrence(start, duration, period, count)
+        return start, start + duration, rule
 
-    @tool
     def list_available_rooms(self, date: str) -> str:
         """Lists all available rooms for a given date."""
-        if date not in self.schedule:
-            return f"All rooms ({', '.join(self.rooms)}) are available for {date}"
-        
-        booked_rooms = set(class_info['room'] for class_info in self.schedule[date])
-        available_rooms = set(self.rooms) - booked_rooms
+        self._sync()
+        try:
+            available_rooms = [room for room in self.rooms if not self._booked_mask(date, room)]
+        except ValueError:
+            return _INVALID_DATE
         
+        if len(available_rooms) == len(self.rooms):
+            return f"All rooms ({', '.join(self.rooms)}) are available for {date}"
         if not available_rooms:
             return f"No rooms available for {date}"
         return f"Available rooms for {date}: {', '.join(available_rooms)}"
 
-    @tool
-    def list_available_times(self, date: str, room: str) -> str:
-        """Lists all available time slots for a given date and room."""
-        if room not in self.rooms:
+    def list_available_times(self, date: str, room: str, duration: int = SLOT_MINUTES) -> str:
+        """Lists all available start times for a given date and room, for sessions of duration minutes."""
+        self._sync()
+        if room not in self._room_set:
             return f"Invalid room. Available rooms are: {', '.join(self.rooms)}"
         
-        if date not in self.schedule:
-            return f"All time slots are available for {room} on {date}: {', '.join(self.time_slots)}"
-        
-        booked_times = set(
-            class_info['time'] 
-            for class_info in self.schedule[date] 
-            if class_info['room'] == room
-        )
-        available_times = set(self.time_slots) - booked_times
+        try:
+            duration = int(duration)
+        except ValueError:
+            return _INVALID_DURATION
+        try:
+            if duration == SLOT_MINUTES:
+                available_times = self.slots_from_mask(self.free_mask(date, room))
+                if len(available_times) == len(self.time_slots):
+                    return f"All time slots are available for {room} on {date}: {', '.join(self.time_slots)}"
+            else:
+                day = to_minutes(date)
+                calendar = self.calendars.get(room, RoomCalendar())
+                available_times = [
+                    slot for slot, minute in zip(self.time_slots, self._slot_minutes)
+                    if minute + duration <= self.day_close
+                    and calendar.conflict(day + minute, day + minute + duration) is None
+                ]
+        except ValueError:
+            return _INVALID_DATE
         
         if not available_times:
             return f"No available time slots for {room} on {date}"
-        return f"Available times for {room} on {date}: {', '.join(sorted(available_times))}"
+        return f"Available times for {room} on {date}: {', '.join(available_times)}"
+
+    def free_windows(self, date: str, room: str, min_duration: int = 1) -> str:
+        """Lists the free windows of a room on a date, within opening hours."""
+        self._sync()
+        if room not in self._room_set:
+            return f"Invalid room. Available rooms are: {', '.join(self.rooms)}"
+        try:
+            min_duration = int(min_duration)
+        except ValueError:
+            return _INVALID_DURATION
+        try:
+            day = to_minutes(date)
+        except ValueError:
+            return _INVALID_DATE
+        calendar = self.calendars.get(room, RoomCalendar())
+        windows = calendar.free_windows(day + self.day_open, day + self.day_close, min_duration)
+        if not windows:
+            return f"No free windows for {room} on {date}"
+        spans = [f"{format_minutes(start)[1]}-{format_minutes(end)[1]}" for start, end in windows]
+        return f"Free windows for {room} on {date}: {', '.join(spans)}"
+
+    def next_available(self, room: str, date: str, time: str = "00:00", duration: int = SLOT_MINUTES) -> str:
+        """Finds the first time at or after date/time when room is free for duration minutes."""
+        self._sync()
+        if room not in self._room_set:
+            return f"Invalid room. Available rooms are: {', '.join(self.rooms)}"
+        try:
+            duration = int(duration)
+        except ValueError:
+            return _INVALID_DURATION
+        try:
+            earliest = to_minutes(date, time)
+        except ValueError:
+            return "Invalid date or time. Use YYYY-MM-DD and HH:MM"
+        calendar = self.calendars.get(room, RoomCalendar())
+        start = calendar.next_available(earliest, duration, self.day_open, self.day_close)
+        if start is None:
+            return f"{room} has no free {duration}-minute window within a year of {date}"
+        next_date, next_time = format_minutes(start)
+        return f"{room} is next available for {duration} minutes on {next_date} at {next_time}"
 
-    @tool
-    def schedule_class(self, date: str, room: str, time: str, class_name: str) -> str:
+    def schedule_class(self, date: str, room: str, time: str, class_name: str, duration: int = SLOT_MINUTES,
+                       recurrence: Optional[str] = None, occurrences: Optional[int] = None,
+                       instructor: Optional[str] = None) -> str:
         """
         Schedule a class for a specific date, room, and time.
-        Format: date should be YYYY-MM-DD, time should be HH:MM
+        Format: date should be YYYY-MM-DD, time should be HH:MM.
+        Optionally give a duration in minutes, a recurrence ("weekly" or
+        "biweekly") with a number of occurrences (open-ended if omitted) and
+        an instructor, who cannot teach two classes at once.
         """
-        # Validate inputs
-        if room not in self.rooms:
-            return f"Invalid room. Available rooms are: {', '.join(self.rooms)}"
-        if time not in self.time_slots:
-            return f"Invalid time slot. Available slots are: {', '.join(self.time_slots)}"
-        
-        # Initialize date in schedule if not exists
-        if date not in self.schedule:
-            self.schedule[date] = []
+        try:
+            start, end, rule = self._parse_booking(date, room, time, duration, recurrence, occurrences)
+        except ValueError as e:
+            return str(e)
         
         # Check if slot is already booked
-        for class_info in self.schedule[date]:
-            if class_info['room'] == room and class_info['time'] == time:
-                return f"This slot is already booked for {class_info['class_name']}"
-        
-        # Schedule the class
-        self.schedule[date].append({
-            'room': room,
-            'time': time,
-            'class_name': class_name
-        })
+        self._sync()
+        instructor = instructor or None
+        booking = Booking(0, room, start, end, class_name, rule, instructor)
+        conflict = self._conflict(room, start, end, rule, instructor)
+        if conflict is None:
+            # Schedule the class
+            booking, conflict = self._book([booking])[0]
+        if conflict is not None:
+            return _conflict_message(room, instructor, conflict)
         
+        if rule is not None:
+            return f"Successfully scheduled {class_name} in {room}: {booking.describe()}"
         return f"Successfully scheduled {class_name} in {room} at {time} on {date}"
 
-    @tool
+    def _candidates(self, request: ClassRequest, capacity: Dict[str, int], earliest: int,
+                    latest: int) -> List[Candidate]:
+        """Placements of a request that satisfy its static constraints, best first."""
+        rooms = list(request.rooms) or self.rooms
+        unknown = [room for room in rooms if room not in self._room_set]
+        if unknown:
+            raise ValueError(f"{request.class_name}: unknown room {unknown[0]}")
+        rooms = [room for room in rooms if capacity.get(room, request.size) >= request.size]
+        period = parse_recurrence(request.recurrence) if request.recurrence else None
+        times = list(dict.fromkeys(request.preferred_times + tuple(self.time_slots)))
+        preferred = len(request.preferred_times)
+
+        try:
+            days = [to_minutes(date) for date in request.dates]
+            minutes = [to_minutes("2000-01-01", time) % MINUTES_PER_DAY for time in times]
+        except ValueError:
+            raise ValueError(f"{request.class_name}: invalid date or time; use YYYY-MM-DD and HH:MM")
+
+        ranked = []
+        for rank, minute in enumerate(minutes):
+            if minute < earliest or minute + request.duration > latest:
+                continue
+            for day_rank, day in enumerate(days):
+                start = day + minute
+                end = start + request.duration
+                rule = Recurrence(start, request.duration, period, request.occurrences) if period else None
+                for room_rank, room in enumerate(rooms):
+                    if self._conflict(room, start, end, rule, request.instructor) is None:
+                        # Preferred times first (in the order given), then earliest
+                        key = (min(rank, preferred), day_rank, minute, room_rank)
+                        ranked.append((key, Candidate(room, start, end, rule)))
+        ranked.sort(key=lambda item: item[0])
+        return [candidate for _, candidate in ranked]
+
+    def schedule_many(self, requests: List[Union[Dict, ClassRequest]], constraints: Optional[Dict] = None) -> str:
+        """
+        Place a batch of classes in one pass, then book them in one transaction
+
+        Each request names a class and the dates it may go on, and can add
+        a duration, instructor, size (students), allowed rooms, preferred
+        times and a recurrence (see timetable_solver.parse_request). Rooms
+        too small for a class are skipped, an instructor never teaches two
+        classes at once, and preferred times are tried first.
+
+        Args:
+            requests: Request dicts or ClassRequests
+            constraints (Dict): Optional batch settings: ``room_capacity``
+                (room -> seats, merged over ``self.room_capacity``),
+                ``earliest``/``latest`` (HH:MM bounds within opening hours),
+                ``max_steps`` (search budget) and ``atomic`` (book nothing
+                unless every class is placed)
+
+        Returns:
+            str: One line per scheduled class, then the classes that could not be placed
+        """
+        constraints = constraints or {}
+        self._sync()
+        try:
+            parsed = [r if isinstance(r, ClassRequest) else parse_request(r) for r in requests]
+            capacity = {**self.room_capacity, **{room: int(seats) for room, seats in
+                                                 constraints.get("room_capacity", {}).items()}}
+            earliest = max(self.day_open, to_minutes("2000-01-01", constraints.get("earliest", "00:00")) % MINUTES_PER_DAY)
+            latest = min(self.day_close, to_minutes("2000-01-01", constraints.get("latest", "23:59")) % MINUTES_PER_DAY)
+            candidates = [self._candidates(request, capacity, earliest, latest) for request in parsed]
+        except (ValueError, TypeError, AttributeError) as e:
+            return f"Invalid batch: {e}"
+        if not parsed:
+            return "No classes to schedule"
+
+        solver = TimetableSolver([r.instructor for r in parsed], candidates,
+                                 int(constraints.get("max_steps", MAX_SEARCH_STEPS)))
+        placements = solver.solve()
+        atomic = bool(constraints.get("atomic", False))
+        if atomic and any(p is None for p in placements):
+            placed = []
+        else:
+            placed = [i for i, p in enumerate(placements) if p is not None]
+        bookings = [
+            Booking(0, placements[i].room, placements[i].start, placements[i].end, parsed[i].class_name,
+                    placements[i].rule, parsed[i].instructor)
+            for i in placed
+        ]
+        results = dict(zip(placed, self._book(bookings, atomic=atomic)))
+
+        lines = [f"Scheduled {sum(1 for b, _ in results.values() if b is not None)} of {len(parsed)} classes"]
+        failed = []
+        for i, request in enumerate(parsed):
+            booking, conflict = results.get(i, (None, None))
+            if booking is not None:
+                lines.append(f"- {request.class_name}: {booking.describe()}")
+            elif conflict is not None:
+                failed.append(f"- {request.class_name}: {_conflict_message(placements[i].room, request.instructor, conflict)}")
+            elif not candidates[i]:
+                failed.append(f"- {request.class_name}: no room and time satisfy its constraints")
+            elif placements[i] is None:
+                failed.append(f"- {request.class_name}: no placement left once the other classes were placed")
+            else:
+                failed.append(f"- {request.class_name}: not booked because the batch is atomic")
+        if failed:
+            lines.append("Not scheduled:")
+            lines.extend(failed)
+        return "\n".join(lines)
+
+    def cancel_class(self, date: str, room: str, time: str) -> str:
+        """Cancel the class starting in a room at a given date and time (a whole series if recurring)."""
+        self._sync()
+        calendar = self.calendars.get(room)
+        try:
+            booking_id = calendar.booking_at(to_minutes(date, time)) if calendar else None
+        except ValueError:
+            booking_id = None
+        if booking_id is None:
+            return f"No class is scheduled in {room} at {time} on {date}"
+        
+        booking = self._bookings[booking_id]
+        if self.store is not None:
+            before = self._version
+            self.store.cancel(booking.id)
+            if not self._wrote(before):
+                self._sync()
+                return f"Cancelled {booking.class_name}: {booking.describe()}"
+        self._remove(booking)
+        return f"Cancelled {booking.class_name}: {booking.describe()}"
+
+    def find_class(self, class_name: str) -> str:
+        """List every booking of a class."""
+        self._sync()
+        bookings = sorted((self._bookings[i] for i in self._by_class.get(class_name, ())), key=lambda b: b.start)
+        if not bookings:
+            return f"No bookings found for {class_name}"
+        lines = [f"- {booking.describe()}" for booking in bookings]
+        return f"Bookings for {class_name}:\n" + "\n".join(lines)
+
     def view_schedule(self, date: str) -> str:
         """View all scheduled classes for a given date."""
-        if date not in self.schedule or not self.schedule[date]:
+        self._sync()
+        try:
+            day = to_minutes(date)
+        except ValueError:
+            return _INVALID_DATE
+        booked = sorted(
+            (start, room, self._bookings[booking_id])
+            for room, calendar in self.calendars.items()
+            for start, _, booking_id in calendar.occurrences(day, day + MINUTES_PER_DAY)
+        )
+        if not booked:
             return f"No classes scheduled for {date}"
         
         schedule_str = f"Schedule for {date}:\n"
-        sorted_classes = sorted(self.schedule[date], key=lambda x: x['time'])
         
-        for class_info in sorted_classes:
-            schedule_str += f"- {class_info['time']}: {class_info['class_name']} in {class_info['room']}\n"
+        for start, room, booking in booked:
+            schedule_str += f"- {format_minutes(start)[1]}: {booking.class_name} in {room}\n"
         
         return schedule_str
 
-def create_scheduler_agent():
+def _conflict_message(room: str, instructor: Optional[str], conflict: Booking) -> str:
+    """Explain a conflict; a booking in another room can only clash through the instructor."""
+    if conflict.room != room:
+        return f"{instructor} is already teaching {conflict.class_name} at that time"
+    return f"This slot is already booked for {conflict.class_name}"
+
+def _split_args(func):
+    """Adapt a multi-argument method to a tool that receives one comma-separated string."""
+    def run(tool_input: str) -> str:
+        return func(*[part.strip() for part in tool_input.split(",")])
+    return run
+
+def _json_batch(func):
+    """Adapt schedule_many to a tool that receives JSON: a list of requests or {"requests", "constraints"}."""
+    def run(tool_input: str) -> str:
+        try:
+            payload = json.loads(tool_input)
+        except json.JSONDecodeError as e:
+            return f"Input must be JSON: {e}"
+        if isinstance(payload, list):
+            return func(payload)
+        if isinstance(payload, dict) and isinstance(payload.get("requests"), list):
+            return func(payload["requests"], payload.get("constraints"))
+        return 'Input must be a JSON list of requests or {"requests": [...], "constraints": {...}}'
+    return run
+
+def create_scheduler_agent(scheduler: Optional[ClassScheduler] = None):
     # Initialize scheduler and tools
-    scheduler = ClassScheduler()
+    scheduler = scheduler or ClassScheduler(BookingStore(BOOKING_DB))
     
     tools = [
         Tool(
@@ -108,13 +585,43 @@ def create_scheduler_agent():
         ),
         Tool(
             name="list_available_times",
-            func=scheduler.list_available_times,
-            description="Lists all available time slots for a given date and room"
+            func=_split_args(scheduler.list_available_times),
+            description="Lists available start times for a given date and room (input: date, room[, duration minutes])"
         ),
         Tool(
             name="schedule_class",
-            func=scheduler.schedule_class,
-            description="Schedule a class for a specific date, room, and time"
+            func=_split_args(scheduler.schedule_class),
+            description="Schedule a class for a specific date, room, and time "
+                        "(input: date, room, HH:MM, class name[, duration minutes[, weekly|biweekly[, occurrences[, instructor]]]])"
+        ),
+        Tool(
+            name="schedule_many",
+            func=_json_batch(scheduler.schedule_many),
+            description="Schedule many classes in one call; prefer this over repeated schedule_class calls. "
+                        'Input JSON: {"requests": [{"class_name", "dates": [YYYY-MM-DD, ...], "duration", '
+                        '"instructor", "size", "rooms", "preferred_times": [HH:MM, ...], "recurrence", '
+                        '"occurrences"}], "constraints": {"room_capacity": {room: seats}, "earliest", '
+                        '"latest", "atomic"}}; only class_name and dates are required'
+        ),
+        Tool(
+            name="free_windows",
+            func=_split_args(scheduler.free_windows),
+            description="Lists free windows of a room on a date (input: date, room[, minimum minutes])"
+        ),
+        Tool(
+            name="next_available",
+            func=_split_args(scheduler.next_available),
+            description="Finds when a room is next free (input: room, date[, HH:MM[, duration minutes]])"
+        ),
+        Tool(
+            name="cancel_class",
+            func=_split_args(scheduler.cancel_class),
+            description="Cancel the class in a room at a date and time (input: date, room, HH:MM)"
+        ),
+        Tool(
+            name="find_class",
+            func=scheduler.find_class,
+            description="List every booking of a class by name"
         ),
         Tool(
             name="view_schedule",
@@ -140,8 +647,8 @@ def create_scheduler_agent():
         Tool Names: {tool_names}"""
     )
 
-    # Initialize LLM
-    llm = OpenAI(temperature=0)
+    # Initialize LLM (completions draw from the shared RPM/TPM budget)
+    llm = OpenAI(temperature=0, callbacks=[RateLimitCallbackHandler()])
 
     # Create agent
     agent = create_react_agent(llm, tools, prompt)
@@ -150,11 +657,13 @@ def create_scheduler_agent():
     return agent_executor
 
 def main():
+    scheduler = ClassScheduler(BookingStore(BOOKING_DB))
+    # Canonical commands are answered directly; the LLM agent is only
+    # created for the first input the grammar does not recognize
+    fast_path = CommandFastPath(scheduler)
+    agent = None
     if not os.getenv("OPENAI_API_KEY"):
-        print("Please set your OPENAI_API_KEY in the .env file")
-        return
-        
-    agent = create_scheduler_agent()
+        print("OPENAI_API_KEY is not set: only the standard commands below will work")
     
     # Example usage
     print("Class Scheduling Agent initialized!")
@@ -169,14 +678,28 @@ def main():
             if user_input.lower() == 'quit':
                 break
             
+            started = time.perf_counter()
+            output = fast_path.handle(user_input)
+            if output is not None:
+                print("\nResponse:", output)
+                print(f"(answered directly in {(time.perf_counter() - started) * 1000:.1f} ms)")
+                continue
+            
+            if not os.getenv("OPENAI_API_KEY"):
+                print("Please set your OPENAI_API_KEY in the .env file to ask free-form questions")
+                continue
+            if agent is None:
+                agent = create_scheduler_agent(scheduler)
             response = agent.invoke({"input": user_input})
             print("\nResponse:", response["output"])
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\nExiting...")
             break
         except Exception as e:
             print(f"An error occurred: {str(e)}")
+    
+    print(fast_path.report())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+LLM_CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", "4"))
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "32"))
+
+OVERLOAD_STATUS_CODES = {429, 503, 504}
+
+
+def is_overload(error: BaseException) -> bool:
+    """
+    Decide whether an error means the upstream is saturated
+
+    Args:
+        error (BaseException): Exception raised by an upstream call
+
+    Returns:
+        bool: True for timeouts and 429/503/504 responses
+    """
+    if isinstance(error, TimeoutError):
+        return True
+    if type(error).__name__ in {"RateLimitError", "APITimeoutError"}:
+        return True
+    return getattr(error, "status_code", None) in OVERLOAD_STATUS_CODES
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        name: str = "llm",
+        initial: int = LLM_CONCURRENCY_INITIAL,
+        min_limit: int = 1,
+        max_limit: int = LLM_CONCURRENCY_MAX,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+    ):
+        """
+        AIMD limit on in-flight upstream calls
+
+        The limit grows by one per limit's worth of healthy completions while
+        callers are actually using it, and is multiplied by ``backoff`` on
+        429s, timeouts, or when smoothed latency exceeds ``latency_tolerance``
+        times the best latency seen recently. At most one decrease is applied
+        per round trip so a burst of errors does not collapse the limit.
+
+        Latency is tracked per key (the caller passes its stage), so a shift
+        in the mix of short and long calls is not mistaken for the upstream
+        slowing down.
+
+        Args:
+            name (str): Name reported in snapshots and metrics
+            initial (int): Starting limit
+            min_limit (int): Lower bound on the limit
+            max_limit (int): Upper bound on the limit
+            backoff (float): Multiplicative decrease factor
+            latency_tolerance (float): Allowed ratio of smoothed to baseline latency
+            smoothing (float): EWMA weight of the newest latency sample
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        # key -> [smoothed, baseline] latency in seconds
+        self.latency: Dict[str, List[float]] = {}
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a free slot under the current limit
+
+        Args:
+            timeout (float): Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            float: Start time of the call, to be passed back to ``release``
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No {self.name} concurrency slot available within {timeout:.1f}s")
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, error: Optional[BaseException] = None, key: str = "default"):
+        """
+        Free a slot and adapt the limit from the call's outcome
+
+        Args:
+            started (float): Value returned by ``acquire``
+            error (BaseException): Exception raised by the call, if any
+            key (str): Kind of call (e.g. the stage), compared only with its own latency baseline
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+
+            if error is not None and is_overload(error):
+                self._decrease(now, key)
+            elif error is None:
+                smoothed, baseline = self._observe_latency(key, latency)
+                if smoothed > self.latency_tolerance * baseline:
+                    self._decrease(now, key)
+                elif in_flight >= self.limit / 2:
+                    # Only grow while callers are actually pressing on the limit
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+            self._condition.notify_all()
+
+    def cancel(self, started: float):
+        """Free a slot that was acquired but never used, leaving the limit as it is."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def cap(self, max_limit: int):
+        """Lower the upper bound (e.g. to the size of the pool running the calls)."""
+        with self._condition:
+            self.max_limit = max(self.min_limit, min(self.max_limit, max_limit))
+            self.limit = min(self.limit, float(self.max_limit))
+
+    def _observe_latency(self, key: str, latency: float):
+        state = self.latency.get(key)
+        if state is None:
+            state = self.latency[key] = [latency, latency]
+            return state
+        state[0] += self.smoothing * (latency - state[0])
+        # The baseline tracks the best recent latency and drifts up slowly so a
+        # lasting change in the upstream eventually becomes the new normal.
+        state[1] = min(latency, state[1] * 1.01)
+        return state
+
+    def _decrease(self, now: float, key: str):
+        state = self.latency.get(key)
+        if now - self._last_decrease < (state[0] if state else 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        for state in self.latency.values():
+            # Forget the inflated samples so recovery starts from a clean slate
+            state[0] = state[1]
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """Context manager that holds one slot for the duration of a call."""
+        started = self.acquire(timeout)
+        try:
+            yield
+        except BaseException as e:
+            self.release(started, e)
+            raise
+        self.release(started)
+
+    def snapshot(self) -> Dict:
+        """Return the current limit, in-flight count and per-key latency estimates."""
+        with self._condition:
+            return {
+                "name": self.name,
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency": {key: {"smoothed": smoothed, "baseline": baseline}
+                            for key, (smoothed, baseline) in self.latency.items()},
+            }
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(name: str = "llm") -> AdaptiveConcurrencyLimiter:
+    """Return the process-wide limiter with the given name, creating it on first use."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveConcurrencyLimiter(name=name)
+        return _limiters[name]
+
+
+def concurrency_snapshot() -> List[Dict]:
+    """Return snapshots of every process-wide limiter, for metrics export."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.snapshot() for limiter in limiters]
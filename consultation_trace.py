@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from rate_limiter import count_tokens
+
+# JSON Lines file of anonymized consultation traces; unset to disable
+CONSULTATION_TRACE_LOG = os.getenv("CONSULTATION_TRACE_LOG")
+
+TRACE_SCHEMA_VERSION = 2
+
+_current: ContextVar[Optional["ConsultationTrace"]] = ContextVar("consultation_trace", default=None)
+_write_lock = threading.Lock()
+
+
+def _message_texts(messages) -> List[str]:
+    texts = []
+    for message in messages or []:
+        texts.append(str(message.get("content") or ""))
+        for call in message.get("tool_calls") or []:
+            texts.append(str(call.get("function", {}).get("arguments") or ""))
+    return texts
+
+
+class ConsultationTrace:
+    def __init__(self):
+        """
+        Shape and timing of one consultation, with no clinical content
+
+        Only sizes, token counts, models, stage names and timings are kept;
+        message text never leaves the process and the id is random, so a
+        trace cannot be tied back to a patient or a prescription.
+        """
+        self.id = uuid.uuid4().hex[:16]
+        self.arrival = time.time()
+        self.outcome = "ok"
+        self.stages: List[Dict] = []
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _add(self, record: Dict):
+        with self._lock:
+            self.stages.append(record)
+
+    def record_call(self, stage: str, agent, messages, response, started: float, error: BaseException = None,
+                    attempt=None):
+        """
+        Record one LLM stage (a ResilientClient.run call, retries included)
+
+        ``latency`` is the whole stage as the workflow saw it. ``service`` is
+        the upstream time of the completions that produced the response, and
+        ``wait`` is the rest: rate-limit and concurrency queueing, backoff
+        sleeps and failed attempts. Replays ask the backend for ``service``
+        only, because they queue through their own limiters.
+
+        Args:
+            stage (str): Stage name
+            agent: Swarm agent that was run (for its model and instructions)
+            messages (List[Dict]): Input messages
+            response: Swarm response, or None if the call failed
+            started (float): time.monotonic() when the call started
+            error (BaseException): Final error of a failed call
+            attempt: The successful attempt's completion timings and usage,
+                as collected by ResilientClient
+        """
+        latency = time.monotonic() - started
+        model = getattr(agent, "model", "gpt-4o-mini")
+        instructions = getattr(agent, "instructions", "")
+        inputs = [instructions if isinstance(instructions, str) else ""] + _message_texts(messages)
+        # Swarm returns only the messages it added: assistant turns and tool results
+        replies = [m for m in getattr(response, "messages", None) or [] if m.get("role") == "assistant"]
+        outputs = _message_texts(replies)
+        turns = attempt.completions if attempt is not None and attempt.completions else len(replies)
+        service = attempt.service if attempt is not None else latency
+        if attempt is not None and attempt.prompt_tokens is not None:
+            prompt_tokens, completion_tokens = attempt.prompt_tokens, attempt.completion_tokens
+        else:
+            # No usage reported: every turn resends at least the stage input
+            prompt_tokens = sum(count_tokens(inputs, model)) * max(1, turns)
+            completion_tokens = sum(count_tokens(outputs, model)) if outputs else 0
+        self._add({
+            "stage": stage,
+            "kind": "llm",
+            "offset": round(started - self._started, 4),
+            "latency": round(latency, 4),
+            "service": round(service, 4),
+            "wait": round(max(0.0, latency - service), 4),
+            "model": model,
+            "input_chars": sum(len(text) for text in inputs),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "turns": turns,
+            "error": type(error).__name__ if error is not None else None,
+        })
+
+    @contextmanager
+    def local_stage(self, stage: str, input_chars: int = 0):
+        """Time a stage that runs in-process (e.g. PDF rendering)."""
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._add({
+                "stage": stage,
+                "kind": "local",
+                "offset": round(started - self._started, 4),
+                "latency": round(time.monotonic() - started, 4),
+                "input_chars": input_chars,
+                "error": type(error).__name__ if error is not None else None,
+            })
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = sorted(self.stages, key=lambda record: record["offset"])
+        return {
+            "schema_version": TRACE_SCHEMA_VERSION,
+            "id": self.id,
+            "arrival": round(self.arrival, 3),
+            "duration": round(time.monotonic() - self._started, 4),
+            "outcome": self.outcome,
+            "stages": stages,
+        }
+
+
+def current_trace() -> Optional[ConsultationTrace]:
+    """The trace of the consultation running in this context, if tracing is on."""
+    return _current.get()
+
+
+@contextmanager
+def local_stage(stage: str, input_chars: int = 0):
+    """Time an in-process stage into the current trace; does nothing when tracing is off."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.local_stage(stage, input_chars):
+        yield
+
+
+@contextmanager
+def consultation_trace(path: Optional[str] = None) -> Iterator[Optional[ConsultationTrace]]:
+    """
+    Trace the consultation run inside the block and append it to the log
+
+    ResilientClient.run records each LLM stage into the active trace. Yields
+    None (and records nothing) when no log is configured.
+
+    Args:
+        path (str): Trace log; defaults to CONSULTATION_TRACE_LOG
+    """
+    path = path or CONSULTATION_TRACE_LOG
+    if not path:
+        yield None
+        return
+    trace = ConsultationTrace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.outcome = "error"
+        raise
+    finally:
+        _current.reset(token)
+        append_trace(path, trace.to_dict())
+
+
+def traced_consultation(func):
+    """Decorator running each call of a workflow function inside consultation_trace()."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with consultation_trace():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def append_trace(path: str, record: Dict):
+    """Append one trace as a JSON line (one write per line, so concurrent workers do not interleave)."""
+    line = json.dumps(record, separators=(",", ":")) + "\n"
+    with _write_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def load_traces(path: str) -> List[Dict]:
+    """
+    Read a trace log
+
+    Returns:
+        List[Dict]: Traces sorted by arrival time
+    """
+    traces = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                traces.append(json.loads(line))
+    return sorted(traces, key=lambda trace: trace["arrival"])
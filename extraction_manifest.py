@@ -0,0 +1,135 @@
+import os
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple
+
+MANIFEST_FILENAME = ".pdf_manifest.sqlite3"
+
+# Bump when the extraction logic changes so every file is re-parsed once
+MANIFEST_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path         TEXT PRIMARY KEY,
+    size         INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    config       TEXT NOT NULL,
+    chunks       TEXT NOT NULL,
+    updated_at   TEXT NOT NULL
+);
+"""
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    content_hash: str
+    config: str
+
+
+def manifest_key(path: str) -> str:
+    """
+    Normalize a file path for use as a manifest key
+
+    "./pdfs/a.pdf" and "pdfs/a.pdf" name the same file; keying rows by the
+    absolute path keeps one sync from pruning another's entries.
+    """
+    return os.path.abspath(path)
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunker_config(text_splitter) -> str:
+    """
+    Describe a text splitter's settings as a stable string
+
+    Chunks extracted under a different configuration are treated as stale.
+
+    Args:
+        text_splitter: LangChain text splitter (or any object with similar settings)
+
+    Returns:
+        str: JSON description of the splitter class and its sizes
+    """
+    settings = {
+        "version": MANIFEST_VERSION,
+        "splitter": type(text_splitter).__name__,
+    }
+    for name in ("_chunk_size", "_chunk_overlap", "chunk_size", "chunk_overlap", "_separators"):
+        value = getattr(text_splitter, name, None)
+        if isinstance(value, (int, float, str, list, tuple)):
+            settings[name.lstrip("_")] = value
+    return json.dumps(settings, sort_keys=True)
+
+
+class ExtractionManifest:
+    def __init__(self, path: str):
+        """
+        Persistent record of which PDFs were extracted, and their chunks
+
+        Args:
+            path (str): SQLite file holding the manifest
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def entries(self) -> Dict[str, ManifestEntry]:
+        """Return the stat/hash/config of every known file, without loading chunks."""
+        rows = self.conn.execute("SELECT path, size, mtime_ns, content_hash, config FROM files")
+        return {row[0]: ManifestEntry(*row[1:]) for row in rows}
+
+    def get_chunks(self, paths: Iterable[str]) -> Dict[str, List[str]]:
+        """Load stored chunks for the given paths."""
+        paths = list(paths)
+        chunks = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT path, chunks FROM files WHERE path IN ({placeholders})", batch
+            )
+            chunks.update((path, json.loads(data)) for path, data in rows)
+        return chunks
+
+    def upsert(self, path: str, size: int, mtime_ns: int, content_hash: str, config: str, chunks: List[str]):
+        """Record a freshly extracted file."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(path, size, mtime_ns, content_hash, config, chunks, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, content_hash, config, json.dumps(chunks),
+                 datetime.now().isoformat()),
+            )
+
+    def touch(self, path: str, size: int, mtime_ns: int):
+        """Update the stat of a file whose content turned out to be unchanged."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path)
+            )
+
+    def remove(self, paths: Iterable[str]):
+        """Forget files that no longer exist."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in paths])
+
+    def close(self):
+        """Close the manifest database"""
+        self.conn.close()
@@ -0,0 +1,372 @@
+import os
+import sys
+import time
+import atexit
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Serve /metrics on this port when an entry point starts (unset: no endpoint)
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Write the metrics here at exit, for batch runs that end before a scrape
+# (node_exporter textfile collector format)
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+LabelValues = Tuple[str, ...]
+# (name, type, help, [(labels, value[, sample name suffix])])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        """Monotonic count, one series per label combination."""
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> Iterable[Family]:
+        with self._lock:
+            samples = [(self._labels(key), value) for key, value in self._values.items()]
+        yield self.name + "_total", self.type, self.help, samples
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        """Value that goes up and down, one series per label combination."""
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def collect(self) -> Iterable[Family]:
+        with self._lock:
+            samples = [(self._labels(key), value) for key, value in self._values.items()]
+        yield self.name, self.type, self.help, samples
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Observations counted into fixed upper-bound buckets
+
+        Exported cumulatively with ``_sum`` and ``_count``, so quantiles are
+        computed on the Prometheus side with histogram_quantile().
+        """
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent in its block."""
+        return _Timer(self, labels)
+
+    def collect(self) -> Iterable[Family]:
+        with self._lock:
+            series = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        samples = []
+        for key, counts, total in series:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((dict(labels, le=_format_value(bound)), cumulative, "_bucket"))
+            samples.append((labels, total, "_sum"))
+            samples.append((labels, cumulative, "_count"))
+        yield self.name, self.type, self.help, samples
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Process-wide set of metrics rendered in the Prometheus text format
+
+        Metrics are registered when created through counter(), gauge() or
+        histogram(); collectors are callables evaluated at scrape time for
+        values that are cheaper to read than to track (RSS, limiter state).
+        """
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        families = [family for metric in metrics for family in metric.collect()]
+        for collector in collectors:
+            families.extend(collector())
+        lines = []
+        for name, type_, help, samples in families:
+            lines.append(f"# HELP {name} {_escape(help)}")
+            lines.append(f"# TYPE {name} {type_}")
+            for sample in samples:
+                labels, value = sample[0], sample[1]
+                suffix = sample[2] if len(sample) > 2 else ""
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# The pipeline's metrics, shared by every module that reports them
+LLM_STAGE_SECONDS = REGISTRY.histogram(
+    "agenticmd_llm_stage_seconds", "ResilientClient.run latency per stage, retries included",
+    ("stage", "outcome"),
+)
+LLM_EVENTS = REGISTRY.counter(
+    "agenticmd_llm_events", "ResilientClient events per stage (calls, retries, hedges, timeouts, failures)",
+    ("stage", "event"),
+)
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "agenticmd_llm_queue_depth", "LLM calls waiting for rate limit capacity or a concurrency slot",
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "agenticmd_llm_tokens", "Tokens per request by direction (in, out) and source (swarm, langchain, embeddings)",
+    ("direction", "source"), buckets=TOKEN_BUCKETS,
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "agenticmd_cache_requests", "Cache lookups by cache and result (hit, miss)", ("cache", "result"),
+)
+PDF_RENDER_SECONDS = REGISTRY.histogram(
+    "agenticmd_pdf_render_seconds", "Prescription PDF render time",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PDF_FILES = REGISTRY.counter(
+    "agenticmd_pdf_files", "PDFs seen by batch extraction by result (parsed, unchanged, failed, pruned)",
+    ("result",),
+)
+
+
+def _cache_hit_ratio() -> Iterable[Family]:
+    totals: Dict[str, List[float]] = {}
+    for labels, value in next(iter(CACHE_REQUESTS.collect()))[3]:
+        hits_and_total = totals.setdefault(labels["cache"], [0, 0])
+        hits_and_total[1] += value
+        if labels["result"] == "hit":
+            hits_and_total[0] += value
+    samples = [({"cache": cache}, hits / total) for cache, (hits, total) in totals.items() if total]
+    yield "agenticmd_cache_hit_ratio", "gauge", "Hits over lookups since start, per cache", samples
+
+
+def _concurrency() -> Iterable[Family]:
+    from concurrency import concurrency_snapshot
+
+    snapshots = concurrency_snapshot()
+    yield ("agenticmd_concurrency_in_flight", "gauge", "In-flight upstream calls per adaptive limiter",
+           [({"limiter": s["name"]}, s["in_flight"]) for s in snapshots])
+    yield ("agenticmd_concurrency_limit", "gauge", "Current adaptive concurrency limit",
+           [({"limiter": s["name"]}, s["limit"]) for s in snapshots])
+
+
+def _process() -> Iterable[Family]:
+    if sys.platform == "win32":
+        # No getrusage on Windows; CPU time is still available
+        yield ("process_cpu_seconds_total", "counter", "User and system CPU time", [({}, time.process_time())])
+        return
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    rss = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    yield "process_resident_memory_bytes", "gauge", "Resident set size", [({}, rss if rss is not None else peak)]
+    yield "process_peak_resident_memory_bytes", "gauge", "Peak resident set size", [({}, peak)]
+    yield ("process_cpu_seconds_total", "counter", "User and system CPU time",
+           [({}, usage.ru_utime + usage.ru_stime)])
+
+
+REGISTRY.register_collector(_cache_hit_ratio)
+REGISTRY.register_collector(_concurrency)
+REGISTRY.register_collector(_process)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve the registry at /metrics from a daemon thread
+
+    Called by the entry points; safe to call repeatedly (the Streamlit app
+    reruns its script), only the first call starts a server. Also arranges
+    for METRICS_TEXTFILE to be written at exit.
+
+    Args:
+        port (int): Port to listen on; defaults to METRICS_PORT (no server if unset)
+        host (str): Interface to bind
+
+    Returns:
+        Optional[ThreadingHTTPServer]: The running server, or None if disabled
+    """
+    global _server
+    with _server_lock:
+        if METRICS_TEXTFILE:
+            atexit.unregister(write_textfile)
+            atexit.register(write_textfile)
+        if _server is not None:
+            return _server
+        if port is None:
+            if not METRICS_PORT:
+                return None
+            port = int(METRICS_PORT)
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        print(f"Metrics: http://{host}:{_server.server_address[1]}/metrics")
+        return _server
+
+
+def write_textfile(path: Optional[str] = None):
+    """Write the registry to a file atomically (defaults to METRICS_TEXTFILE)."""
+    path = path or METRICS_TEXTFILE
+    if not path:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
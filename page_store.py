@@ -0,0 +1,197 @@
+import os
+import json
+import mmap
+import struct
+import uuid
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+PAGE_STORE_DIR = os.getenv("PAGE_STORE_DIR", "page_store")
+
+CATALOG_FILENAME = "catalog.jsonl"
+INDEX_MAGIC = b"AMDPIDX1"
+
+# Offsets are little-endian uint64: entry n is where page n starts, and the
+# final entry is the blob length, so page n spans [offset[n], offset[n + 1])
+_OFFSET = struct.Struct("<Q")
+_HEADER = struct.Struct("<8sQ")
+
+
+class _MappedDocument:
+    def __init__(self, blob_path: str, index_path: str):
+        with open(index_path, "rb") as f:
+            self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.page_count = _HEADER.unpack_from(self.index, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"Not a page index: {index_path}")
+        self.blob = None
+        if os.path.getsize(blob_path):
+            # mmap cannot map an empty file; a document of blank pages has no blob
+            with open(blob_path, "rb") as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def offset(self, n: int) -> int:
+        return _OFFSET.unpack_from(self.index, _HEADER.size + _OFFSET.size * n)[0]
+
+    def view(self, start: int, stop: int) -> memoryview:
+        if self.blob is None:
+            return memoryview(b"")
+        return memoryview(self.blob)[self.offset(start):self.offset(stop)]
+
+    def close(self):
+        for mapped in (self.index, self.blob):
+            if mapped is None:
+                continue
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a view; the map is freed with it
+                pass
+
+
+class PageStore:
+    def __init__(self, root: str = PAGE_STORE_DIR):
+        """
+        Persistent, memory-mapped store of extracted page text
+
+        Each document is one concatenated UTF-8 blob of its pages plus a
+        fixed-width offset index, so any page or page range is read straight
+        from the page cache without parsing the rest of the document. An
+        append-only catalog maps document names to their files.
+
+        Args:
+            root (str): Directory holding the blobs, indexes and catalog
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.catalog_path = os.path.join(root, CATALOG_FILENAME)
+        self._catalog: Dict[str, Dict] = {}
+        self._catalog_size = 0
+        self._mapped: Dict[str, _MappedDocument] = {}
+        self._lock = threading.Lock()
+
+    def _refresh_catalog(self):
+        # Other processes may have appended documents since the last read
+        if not os.path.exists(self.catalog_path):
+            return
+        size = os.path.getsize(self.catalog_path)
+        if size == self._catalog_size:
+            return
+        with open(self.catalog_path, "rb") as f:
+            f.seek(self._catalog_size)
+            tail = f.read(size - self._catalog_size)
+        # A writer may be mid-append: stop at the last complete line and
+        # pick up the rest of it on a later refresh
+        complete = tail.rfind(b"\n") + 1
+        for line in tail[:complete].splitlines():
+            entry = json.loads(line)
+            self._catalog[entry["doc"]] = entry
+            stale = self._mapped.pop(entry["doc"], None)
+            if stale is not None:
+                stale.close()
+        self._catalog_size += complete
+
+    def _paths(self, stem: str) -> Tuple[str, str]:
+        return os.path.join(self.root, f"{stem}.pages"), os.path.join(self.root, f"{stem}.index")
+
+    def _document(self, doc: str) -> _MappedDocument:
+        with self._lock:
+            # One stat of the catalog per read picks up documents replaced by other writers
+            self._refresh_catalog()
+            if doc not in self._mapped:
+                if doc not in self._catalog:
+                    raise KeyError(f"Document not in page store: {doc}")
+                self._mapped[doc] = _MappedDocument(*self._paths(self._catalog[doc]["stem"]))
+            return self._mapped[doc]
+
+    def add_document(self, doc: str, pages: Iterable[str]) -> int:
+        """
+        Append a document (or replace an earlier version of it)
+
+        Pages are streamed to disk as they arrive; the document becomes
+        visible to readers only once its files and catalog entry are complete.
+
+        Args:
+            doc (str): Document name, e.g. the PDF path
+            pages (Iterable[str]): Page texts in order
+
+        Returns:
+            int: Number of pages written
+        """
+        # A fresh file name per version, so readers mapping the old one are unaffected
+        version = uuid.uuid4().hex
+        blob_path, index_path = self._paths(version)
+        offsets = [0]
+        with open(blob_path + ".tmp", "wb") as blob:
+            for text in pages:
+                offsets.append(offsets[-1] + blob.write(text.encode("utf-8")))
+        with open(index_path + ".tmp", "wb") as index:
+            index.write(_HEADER.pack(INDEX_MAGIC, len(offsets) - 1))
+            index.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+        os.replace(blob_path + ".tmp", blob_path)
+        os.replace(index_path + ".tmp", index_path)
+
+        entry = {"doc": doc, "stem": version, "pages": len(offsets) - 1, "bytes": offsets[-1]}
+        with self._lock:
+            self._refresh_catalog()
+            previous = self._catalog.get(doc)
+            with open(self.catalog_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._refresh_catalog()
+        if previous is not None:
+            for path in self._paths(previous["stem"]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return entry["pages"]
+
+    def documents(self) -> List[str]:
+        """Return the names of every stored document."""
+        with self._lock:
+            self._refresh_catalog()
+            return list(self._catalog)
+
+    def __contains__(self, doc: str) -> bool:
+        return doc in self.documents()
+
+    def page_count(self, doc: str) -> int:
+        return self._document(doc).page_count
+
+    def get_page(self, doc: str, n: int) -> memoryview:
+        """
+        Return one page as a zero-copy view of its UTF-8 bytes
+
+        Args:
+            doc (str): Document name
+            n (int): Page number (0-based)
+
+        Returns:
+            memoryview: The page's bytes; ``str(view, "utf-8")`` decodes it
+        """
+        return self.get_pages(doc, n, n + 1)
+
+    def get_pages(self, doc: str, start: int, stop: Optional[int] = None) -> memoryview:
+        """Return pages [start, stop) as one zero-copy view of contiguous UTF-8 bytes."""
+        document = self._document(doc)
+        stop = document.page_count if stop is None else stop
+        if not 0 <= start <= stop <= document.page_count:
+            raise IndexError(f"Page range {start}:{stop} out of range for {doc} ({document.page_count} pages)")
+        return document.view(start, stop)
+
+    def get_text(self, doc: str, n: int) -> str:
+        """Return one page decoded to str."""
+        return str(self.get_page(doc, n), "utf-8")
+
+    def iter_pages(self, doc: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        """Yield decoded pages in [start, stop)."""
+        stop = self.page_count(doc) if stop is None else stop
+        for n in range(start, stop):
+            yield self.get_text(doc, n)
+
+    def close(self):
+        """Unmap every open document."""
+        with self._lock:
+            for document in self._mapped.values():
+                document.close()
+            self._mapped.clear()
@@ -1,26 +1,97 @@
 import os
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 from pathlib import Path
+from itertools import islice
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
-from langchain_community.document_loaders import PyPDFLoader
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pypdf import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAI
+from extraction_manifest import ExtractionManifest, MANIFEST_FILENAME, chunker_config, file_hash, manifest_key
+from page_store import PageStore
+from metrics import CACHE_REQUESTS, PDF_FILES, start_metrics_server
 
 # Load environment variables
 load_dotenv()
 
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """
+    Yield the text of each page, parsing pages only as they are requested
+    
+    LangChain's PyPDFLoader.lazy_load still builds the full page list before
+    yielding, so pypdf is driven directly here.
+    """
+    with open(pdf_path, "rb") as f:
+        reader = PdfReader(f)
+        for page in reader.pages:
+            yield page.extract_text()
+            # pypdf caches every object it resolves (content streams, fonts);
+            # dropping the cache after each page keeps memory at one page's worth
+            reader.resolved_objects.clear()
+
+def iter_pdf_chunks(pdf_path: str, text_splitter) -> Iterator[str]:
+    """
+    Stream text chunks from a PDF one page at a time
+    
+    Each page is split as soon as it is read, which yields the same chunks
+    as splitting the loaded page list (pages are split independently either
+    way) while keeping only one page and its chunks in memory.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        text_splitter: Splitter providing ``split_text``
+        
+    Yields:
+        str: Text chunks in document order
+    """
+    for page_text in iter_pdf_pages(pdf_path):
+        yield from text_splitter.split_text(page_text)
+
+def _extract_chunks(pdf_path: str, text_splitter) -> List[str]:
+    """
+    Load and split one PDF into text chunks, raising on failure
+
+    Defined at module level so it can be shipped to process-pool workers
+    without pickling the extractor (and its LLM client).
+    """
+    texts = list(iter_pdf_chunks(pdf_path, text_splitter))
+    print(f"Successfully processed {pdf_path}")
+    return texts
+
+def _process_pdf(pdf_path: str, text_splitter) -> List[str]:
+    """Like _extract_chunks, but reports errors and returns no chunks."""
+    try:
+        return _extract_chunks(pdf_path, text_splitter)
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {str(e)}")
+        return []
+
+def _extract_page_texts(pdf_path: str, text_splitter=None) -> List[str]:
+    """Read every page's text; takes the splitter only to match the worker signature."""
+    return list(iter_pdf_pages(pdf_path))
+
 class PDFSwarmExtractor:
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: int = 4, backend: str = "thread", max_pending: Optional[int] = None,
+                 text_splitter=None):
         """
         Initialize the PDF Swarm Extractor
         
         Args:
             max_workers (int): Maximum number of parallel workers
+            backend (str): "thread" or "process"; pypdf parsing is pure Python,
+                so "process" is the one that scales across cores
+            max_pending (int): Maximum files submitted but not yet consumed
+                (defaults to twice max_workers)
+            text_splitter: Object with ``split_text``, e.g. token_chunker.TokenChunker
+                (defaults to a 2000-character RecursiveCharacterTextSplitter)
         """
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend: {backend}")
         self.max_workers = max_workers
+        self.backend = backend
+        self.max_pending = max_pending or max_workers * 2
         self.llm = OpenAI(temperature=0)
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.text_splitter = text_splitter or RecursiveCharacterTextSplitter(
             chunk_size=2000,
             chunk_overlap=200
         )
@@ -35,51 +106,181 @@ class PDFSwarmExtractor:
         Returns:
             List[str]: List of extracted text chunks
         """
-        try:
-            loader = PyPDFLoader(pdf_path)
-            pages = loader.load()
+        return _process_pdf(pdf_path, self.text_splitter)
+
+    def iter_single_pdf(self, pdf_path: str) -> Iterator[str]:
+        """
+        Stream text chunks from a single PDF without materializing all pages
+        
+        Args:
+            pdf_path (str): Path to the PDF file
             
-            # Split the document into chunks
-            chunks = self.text_splitter.split_documents(pages)
+        Yields:
+            str: Text chunks in document order
+        """
+        return iter_pdf_chunks(pdf_path, self.text_splitter)
+
+    def _create_executor(self):
+        if self.backend == "process":
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _iter_completed(self, pdf_files: Iterator[str], worker) -> Iterator[Tuple[str, Future]]:
+        """
+        Run ``worker`` over files with at most ``max_pending`` outstanding,
+        yielding (path, future) pairs in completion order.
+        """
+        executor = self._create_executor()
+        try:
+            pending = {executor.submit(worker, pdf, self.text_splitter): pdf
+                       for pdf in islice(pdf_files, self.max_pending)}
             
-            # Extract raw text from chunks
-            texts = [chunk.page_content for chunk in chunks]
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_path = pending.pop(future)
+                    
+                    # Top up before yielding so workers stay busy while the caller works
+                    next_pdf = next(pdf_files, None)
+                    if next_pdf is not None:
+                        pending[executor.submit(worker, next_pdf, self.text_splitter)] = next_pdf
+                    
+                    yield pdf_path, future
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def iter_pdf_directory(self, directory_path: str) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Process all PDFs in a directory, yielding each file as soon as it is done
+        
+        At most ``max_pending`` files are in flight or waiting to be consumed,
+        so a slow consumer throttles parsing instead of buffering the corpus.
+        
+        Args:
+            directory_path (str): Path to directory containing PDFs
             
-            print(f"Successfully processed {pdf_path}")
-            return texts
-        except Exception as e:
-            print(f"Error processing {pdf_path}: {str(e)}")
-            return []
+        Yields:
+            Tuple[str, List[str]]: PDF path and its extracted text chunks, in completion order
+        """
+        pdf_files = (str(f) for f in Path(directory_path).glob("**/*.pdf"))
+        for pdf_path, future in self._iter_completed(pdf_files, _process_pdf):
+            try:
+                texts = future.result()
+            except Exception as e:
+                print(f"Error processing {pdf_path}: {str(e)}")
+                texts = []
+            yield pdf_path, texts
 
-    def process_pdf_directory(self, directory_path: str) -> dict:
+    def sync_pdf_directory(self, directory_path: str, manifest_path: Optional[str] = None) -> dict:
         """
-        Process all PDFs in a directory using parallel processing
+        Incrementally process a directory against a persistent manifest
+        
+        Only new or modified PDFs are parsed; unchanged files are served from
+        the manifest and files deleted from the directory are pruned from it
+        (entries of other directories sharing the manifest are kept). A file
+        counts as unchanged when its size and mtime match, or, failing that,
+        when its content hash matches. Changing the text splitter invalidates
+        every entry.
         
         Args:
             directory_path (str): Path to directory containing PDFs
+            manifest_path (str): Manifest location (defaults to a file inside the directory)
             
         Returns:
             dict: Dictionary mapping PDF filenames to their extracted text
         """
-        pdf_files = [str(f) for f in Path(directory_path).glob("**/*.pdf")]
-        results = {}
-        
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_pdf = {executor.submit(self.process_single_pdf, pdf): pdf 
-                           for pdf in pdf_files}
+        manifest = ExtractionManifest(manifest_path or os.path.join(directory_path, MANIFEST_FILENAME))
+        config = chunker_config(self.text_splitter)
+        try:
+            known = manifest.entries()
+            unchanged, changed, spelled = [], {}, {}
+            
+            for pdf in Path(directory_path).glob("**/*.pdf"):
+                pdf_path = manifest_key(str(pdf))
+                spelled[pdf_path] = str(pdf)
+                stat = pdf.stat()
+                entry = known.get(pdf_path)
+                if entry is not None and entry.config == config:
+                    if entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                        unchanged.append(pdf_path)
+                        continue
+                    content_hash = file_hash(pdf_path)
+                    if entry.content_hash == content_hash:
+                        manifest.touch(pdf_path, stat.st_size, stat.st_mtime_ns)
+                        unchanged.append(pdf_path)
+                        continue
+                else:
+                    content_hash = file_hash(pdf_path)
+                changed[pdf_path] = (stat.st_size, stat.st_mtime_ns, content_hash)
             
-            for future in future_to_pdf:
-                pdf_path = future_to_pdf[future]
+            # A manifest may be shared across directories: only prune this one's files
+            prefix = os.path.join(manifest_key(directory_path), "")
+            deleted = {path for path in known if path.startswith(prefix)} - set(spelled)
+            if deleted:
+                manifest.remove(deleted)
+            
+            CACHE_REQUESTS.inc(len(unchanged), cache="extraction_manifest", result="hit")
+            CACHE_REQUESTS.inc(len(changed), cache="extraction_manifest", result="miss")
+            PDF_FILES.inc(len(unchanged), result="unchanged")
+            PDF_FILES.inc(len(deleted), result="pruned")
+            # The manifest is keyed by absolute path; results keep the caller's spelling
+            results = {spelled[path]: texts for path, texts in manifest.get_chunks(unchanged).items()}
+            for pdf_path, future in self._iter_completed(iter(changed), _extract_chunks):
                 try:
                     texts = future.result()
-                    results[pdf_path] = texts
                 except Exception as e:
+                    # Not recorded, so the file is retried on the next sync
                     print(f"Error processing {pdf_path}: {str(e)}")
-                    results[pdf_path] = []
+                    PDF_FILES.inc(result="failed")
+                    results[spelled[pdf_path]] = []
+                    continue
+                manifest.upsert(pdf_path, *changed[pdf_path], config=config, chunks=texts)
+                PDF_FILES.inc(result="parsed")
+                results[spelled[pdf_path]] = texts
+            
+            print(f"Manifest sync: {len(changed)} parsed, {len(unchanged)} unchanged, {len(deleted)} pruned")
+            return results
+        finally:
+            manifest.close()
+
+    def store_pdf_directory(self, directory_path: str, page_store: PageStore) -> int:
+        """
+        Extract page text for every PDF in a directory into a page store
+        
+        Consumers can then read individual pages with ``page_store.get_page``
+        instead of re-parsing PDFs or reloading whole result files.
+        
+        Args:
+            directory_path (str): Path to directory containing PDFs
+            page_store (PageStore): Store to append documents to
+            
+        Returns:
+            int: Number of documents stored
+        """
+        pdf_files = (str(f) for f in Path(directory_path).glob("**/*.pdf"))
+        stored = 0
+        for pdf_path, future in self._iter_completed(pdf_files, _extract_page_texts):
+            try:
+                page_store.add_document(pdf_path, future.result())
+                stored += 1
+            except Exception as e:
+                print(f"Error processing {pdf_path}: {str(e)}")
+        return stored
+
+    def process_pdf_directory(self, directory_path: str) -> dict:
+        """
+        Process all PDFs in a directory using parallel processing
         
-        return results
+        Args:
+            directory_path (str): Path to directory containing PDFs
+            
+        Returns:
+            dict: Dictionary mapping PDF filenames to their extracted text
+        """
+        return dict(self.iter_pdf_directory(directory_path))
 
 def main():
+    start_metrics_server()
     # Make sure you have set your OpenAI API key in .env file
     if not os.getenv("OPENAI_API_KEY"):
         print("Please set your OPENAI_API_KEY in the .env file")
@@ -96,8 +297,8 @@ def main():
         print("Please place your PDF files in this directory")
         return
     
-    # Process all PDFs in the directory
-    results = extractor.process_pdf_directory(pdf_directory)
+    # Process new or changed PDFs in the directory; unchanged ones come from the manifest
+    results = extractor.sync_pdf_directory(pdf_directory)
     
     # Print results
     for pdf_path, texts in results.items():
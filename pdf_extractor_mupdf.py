@@ -1,19 +1,324 @@
 import fitz  # PyMuPDF
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 import json
+import hashlib
+from collections import OrderedDict
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from span_store import SpanStore, SpanWriter
+from page_store import PageStore
+from token_chunker import TokenChunker
+from metrics import CACHE_REQUESTS, start_metrics_server
+
+TABLE_CACHE_DIR = os.getenv("TABLE_CACHE_DIR")
+TABLE_CACHE_MAX_ENTRIES = int(os.getenv("TABLE_CACHE_MAX_ENTRIES", "4096"))
+
+def _page_spans(page, textpage=None) -> List[Dict]:
+    """Collect text spans with their formatting from a single page."""
+    blocks = []
+    for block in page.get_text("dict", textpage=textpage)["blocks"]:
+        if "lines" in block:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    blocks.append({
+                        "text": span["text"],
+                        "font": span["font"],
+                        "size": span["size"],
+                        "color": span["color"]
+                    })
+    return blocks
+
+def _page_segments(page, textpage=None) -> List[Tuple[str, bool]]:
+    """
+    Split a page into (text, is_heading) blocks for chunking
+
+    A block is a heading when it is short and every span is bold or set
+    noticeably larger than the page's dominant body size.
+    """
+    blocks = [block for block in page.get_text("dict", textpage=textpage)["blocks"] if "lines" in block]
+    size_chars = {}
+    for block in blocks:
+        for line in block["lines"]:
+            for span in line["spans"]:
+                size = round(span["size"], 1)
+                size_chars[size] = size_chars.get(size, 0) + len(span["text"])
+    body_size = max(size_chars, key=size_chars.get) if size_chars else 0
+
+    segments = []
+    for block in blocks:
+        spans = [span for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+        if not spans:
+            continue
+        text = " ".join(" ".join(span["text"] for span in line["spans"]).strip() for line in block["lines"])
+        is_heading = len(text) < 200 and all(
+            span["flags"] & 16 or span["size"] > body_size * 1.15 for span in spans
+        )
+        segments.append((text, is_heading))
+    return segments
+
+def _count_ruling_edges(page, min_length: float) -> Tuple[int, int]:
+    """Count horizontal and vertical edges in a page's vector drawings."""
+    horizontal = vertical = 0
+    for path in page.get_cdrawings():
+        for item in path["items"]:
+            kind = item[0]
+            if kind == "l":
+                (x0, y0), (x1, y1) = item[1], item[2]
+                if abs(y1 - y0) < 1 and abs(x1 - x0) >= min_length:
+                    horizontal += 1
+                elif abs(x1 - x0) < 1 and abs(y1 - y0) >= min_length:
+                    vertical += 1
+            elif kind in ("re", "qu"):
+                rect = fitz.Rect(item[1]) if kind == "re" else fitz.Quad(item[1]).rect
+                if rect.width >= min_length:
+                    horizontal += 2
+                if rect.height >= min_length:
+                    vertical += 2
+    return horizontal, vertical
+
+def _has_aligned_text(page, min_rows: int) -> bool:
+    """Check for at least two text columns aligned across min_rows lines."""
+    rows_by_column = {}
+    for x0, _, _, _, _, block_no, line_no, _ in page.get_text("words"):
+        rows_by_column.setdefault(round(x0 / 2), set()).add((block_no, line_no))
+    aligned = sum(1 for rows in rows_by_column.values() if len(rows) >= min_rows)
+    return aligned >= 2
+
+def page_may_have_tables(page, table_settings: Optional[Dict] = None) -> bool:
+    """
+    Cheap test for whether ``page.find_tables`` could find anything
+
+    With the default "lines" strategy, find_tables builds cells only from
+    vector ruling lines and rectangles, so a page without at least two
+    horizontal and two vertical edges cannot contain a table. A "text"
+    strategy needs words aligned in columns instead. Explicit line lists
+    always pass.
+
+    Args:
+        page: PyMuPDF page
+        table_settings (Dict): Keyword arguments that will be passed to find_tables
+
+    Returns:
+        bool: False only when the page certainly has no table
+    """
+    settings = table_settings or {}
+    if settings.get("vertical_lines") or settings.get("horizontal_lines"):
+        return True
+    strategies = (settings.get("horizontal_strategy", "lines"), settings.get("vertical_strategy", "lines"))
+    if all(strategy in ("lines", "lines_strict") for strategy in strategies):
+        horizontal, vertical = _count_ruling_edges(page, settings.get("edge_min_length", 3))
+        return horizontal >= 2 and vertical >= 2
+    return _has_aligned_text(page, settings.get("min_words_vertical", 3))
+
+def _page_tables(page, table_settings: Optional[Dict] = None, prefilter: bool = False) -> List[List[List[str]]]:
+    """Extract the tables found on a single page."""
+    if prefilter and not page_may_have_tables(page, table_settings):
+        return []
+    return [table.extract() for table in page.find_tables(**(table_settings or {}))]
+
+class TableCache:
+    def __init__(self, cache_dir: Optional[str] = TABLE_CACHE_DIR,
+                 max_entries: int = TABLE_CACHE_MAX_ENTRIES):
+        """
+        Cache of extracted tables keyed by (document hash, page, settings)
+
+        The in-memory layer keeps the most recently used pages and evicts
+        the oldest past ``max_entries``; evicted pages are reloaded from
+        ``cache_dir`` when one is set.
+
+        Args:
+            cache_dir (str): Directory for a persistent cache; memory only if None
+            max_entries (int): Pages held in memory (0 for no limit)
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, List]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(doc_hash: str, page_num: int, table_settings: Optional[Dict]) -> str:
+        settings = json.dumps(table_settings or {}, sort_keys=True, default=str)
+        return f"{doc_hash}:{page_num}:{settings}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _remember(self, key: str, tables: List):
+        self._memory[key] = tables
+        self._memory.move_to_end(key)
+        if self.max_entries and len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="pdf_tables", result="hit")
+            return self._memory[key]
+        if self.cache_dir and os.path.exists(self._path(key)):
+            with open(self._path(key), encoding="utf-8") as f:
+                tables = json.load(f)
+            self._remember(key, tables)
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="pdf_tables", result="hit")
+            return tables
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="pdf_tables", result="miss")
+        return None
+
+    def put(self, key: str, tables: List):
+        self._remember(key, tables)
+        if self.cache_dir:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(tables, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+
+# Shared by every extractor in the process unless one is passed explicitly
+_default_table_cache = TableCache()
+
+def _write_file(path: str, data: bytes):
+    """Write a file atomically; content-addressed files that already exist are kept."""
+    if os.path.exists(path):
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class _ImageWriter:
+    def __init__(self, doc, output_dir: str, min_size: int = 0, io_workers: int = 4):
+        """
+        Deduplicating image sink shared by the pages it is given
+
+        Images are decoded once per xref per writer and named after their
+        content hash, so a letterhead repeated on every page (or embedded
+        under several xrefs) becomes one file. extract_all with several
+        workers uses one writer per page slice: each slice decodes the image
+        again, but the content-addressed name still leaves one file on disk.
+        File writes run on a small thread pool.
+
+        Args:
+            doc: Open PyMuPDF document
+            output_dir (str): Directory to save images to
+            min_size (int): Skip images narrower or shorter than this many pixels
+            io_workers (int): Threads used for file writes
+        """
+        self.doc = doc
+        self.output_dir = output_dir
+        self.min_size = min_size
+        self._paths_by_xref: Dict[int, Optional[str]] = {}
+        self._written: Set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="image-io")
+        self._futures = []
+
+    def _path_for(self, xref: int, width: int, height: int) -> Optional[str]:
+        if xref not in self._paths_by_xref:
+            path = None
+            if min(width, height) >= self.min_size:
+                base_image = self.doc.extract_image(xref)
+                if base_image:
+                    image_bytes = base_image["image"]
+                    content_hash = hashlib.sha256(image_bytes).hexdigest()[:16]
+                    path = os.path.join(self.output_dir, f"image_{content_hash}.{base_image['ext']}")
+                    if path not in self._written:
+                        self._written.add(path)
+                        self._futures.append(self._executor.submit(_write_file, path, image_bytes))
+            self._paths_by_xref[xref] = path
+        return self._paths_by_xref[xref]
+
+    def page_images(self, page, page_num: int) -> List[Tuple[int, str]]:
+        """Queue a page's images for writing and return its (page, path) pairs."""
+        image_list = []
+        for img in page.get_images(full=True):
+            xref, width, height = img[0], img[2], img[3]
+            path = self._path_for(xref, width, height)
+            if path is not None:
+                image_list.append((page_num, path))
+        return image_list
+
+    def close(self):
+        """Wait for pending writes, re-raising the first failure."""
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown()
+
+def _extract_pages(doc, start: int, stop: int, options: Dict) -> Dict[int, Dict]:
+    """
+    Visit each page in [start, stop) once and collect the requested artifacts
+
+    Plain text and spans share one TextPage, so the page's text layer is
+    parsed a single time no matter how many artifacts are requested.
+    Pages listed in ``options["cached_table_pages"]`` skip table detection.
+    """
+    cached_table_pages = options.get("cached_table_pages", set())
+    image_writer = None
+    if options["images_dir"] is not None:
+        image_writer = _ImageWriter(doc, options["images_dir"], options.get("min_image_size", 0))
+    try:
+        return _collect_pages(doc, start, stop, options, cached_table_pages, image_writer)
+    finally:
+        if image_writer is not None:
+            image_writer.close()
+
+def _collect_pages(doc, start: int, stop: int, options: Dict, cached_table_pages: Set[int],
+                   image_writer: Optional[_ImageWriter]) -> Dict[int, Dict]:
+    pages = {}
+    for page_num in range(start, stop):
+        page = doc[page_num]
+        artifacts = {}
+        if options["text"] or options["formatting"]:
+            textpage = page.get_textpage()
+            if options["text"]:
+                artifacts["text"] = page.get_text("text", textpage=textpage)
+            if options["formatting"]:
+                artifacts["formatting"] = _page_spans(page, textpage)
+        if options["tables"] and page_num not in cached_table_pages:
+            artifacts["tables"] = _page_tables(page, options["table_settings"], options["prefilter"])
+        if image_writer is not None:
+            artifacts["images"] = image_writer.page_images(page, page_num)
+        pages[page_num] = artifacts
+    return pages
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, options: Dict) -> Dict[int, Dict]:
+    """Process-pool entry point: each worker opens its own document."""
+    doc = fitz.open(pdf_path)
+    try:
+        return _extract_pages(doc, start, stop, options)
+    finally:
+        doc.close()
 
 class PDFExtractor:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, table_cache: Optional[TableCache] = None):
         """
         Initialize the PDF extractor with a PDF file path
         
         Args:
             pdf_path (str): Path to the PDF file
+            table_cache (TableCache): Cache for extracted tables (process-wide one by default)
         """
         self.pdf_path = pdf_path
         self.doc = fitz.open(pdf_path)
+        self.table_cache = table_cache or _default_table_cache
+        self._doc_hash = None
+
+    @property
+    def doc_hash(self) -> str:
+        """SHA-256 of the PDF file, computed on first use."""
+        if self._doc_hash is None:
+            digest = hashlib.sha256()
+            with open(self.pdf_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            self._doc_hash = digest.hexdigest()
+        return self._doc_hash
 
     def extract_text_by_page(self) -> Dict[int, str]:
         """
@@ -28,6 +333,43 @@ class PDFExtractor:
             text_by_page[page_num] = page.get_text()
         return text_by_page
 
+    def save_pages(self, page_store: PageStore, doc: Optional[str] = None) -> int:
+        """
+        Append the text of every page to a memory-mapped page store
+        
+        Args:
+            page_store (PageStore): Store to write to
+            doc (str): Document name (defaults to the PDF path)
+            
+        Returns:
+            int: Number of pages stored
+        """
+        pages = (self.doc[page_num].get_text() for page_num in range(len(self.doc)))
+        return page_store.add_document(doc or self.pdf_path, pages)
+
+    def iter_segments(self) -> Iterator[Tuple[str, bool]]:
+        """
+        Yield (text, is_heading) blocks across the document, in reading order
+        
+        Headings are detected from bold or enlarged fonts, giving chunkers the
+        section boundaries that plain-text extraction loses.
+        """
+        for page_num in range(len(self.doc)):
+            yield from _page_segments(self.doc[page_num])
+
+    def chunk(self, chunker: Optional[TokenChunker] = None) -> List[Tuple[str, int]]:
+        """
+        Split the document into token-sized chunks along sentence and section boundaries
+        
+        Args:
+            chunker (TokenChunker): Chunker to use (default sizes if None)
+            
+        Returns:
+            List[Tuple[str, int]]: Chunks with their token counts, ready for
+            token_chunker.iter_embedding_batches
+        """
+        return (chunker or TokenChunker()).chunk_segments(self.iter_segments())
+
     def extract_text_with_formatting(self) -> Dict[int, List[Dict]]:
         """
         Extract text with formatting information (font, size, color)
@@ -37,81 +379,187 @@ class PDFExtractor:
         """
         formatted_text = {}
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            blocks = []
-            for block in page.get_text("dict")["blocks"]:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            blocks.append({
-                                "text": span["text"],
-                                "font": span["font"],
-                                "size": span["size"],
-                                "color": span["color"]
-                            })
-            formatted_text[page_num] = blocks
+            formatted_text[page_num] = _page_spans(self.doc[page_num])
         return formatted_text
 
-    def extract_tables(self) -> Dict[int, List[List[str]]]:
+    def extract_span_store(self) -> SpanStore:
+        """
+        Extract formatted spans into a compact columnar store
+        
+        Holds the same information as extract_text_with_formatting (plus
+        bounding boxes) in a fraction of the memory; ``store.to_dict()``
+        gives the dict view on demand.
+        
+        Returns:
+            SpanStore: Spans of every page
+        """
+        store = SpanStore()
+        for page_num in range(len(self.doc)):
+            store.add_page(page_num, self.doc[page_num])
+        return store
+
+    def export_spans(self, output_path: str, fmt: str = "binary") -> int:
+        """
+        Stream formatted spans to a compact file, one page at a time
+        
+        Only a single page of spans is held in memory; read the file back
+        with span_store.iter_span_file or load_span_file.
+        
+        Args:
+            output_path (str): Path of the span file
+            fmt (str): "binary" or "jsonl"
+            
+        Returns:
+            int: Number of spans written
+        """
+        store = SpanStore()
+        count = 0
+        mode, encoding = ("wb", None) if fmt == "binary" else ("w", "utf-8")
+        with open(output_path, mode, encoding=encoding) as f:
+            writer = SpanWriter(f, fmt)
+            for page_num in range(len(self.doc)):
+                store.clear()
+                store.add_page(page_num, self.doc[page_num])
+                writer.write_page(store, page_num)
+                count += len(store)
+        return count
+
+    def extract_tables(self, prefilter: bool = True, use_cache: bool = True,
+                       table_settings: Optional[Dict] = None) -> Dict[int, List[List[str]]]:
         """
         Extract tables from the PDF
         
+        Args:
+            prefilter (bool): Skip find_tables on pages that cannot contain a table
+            use_cache (bool): Reuse tables cached for this document, page and settings
+            table_settings (Dict): Keyword arguments for page.find_tables
+        
         Returns:
             Dict[int, List[List[str]]]: Dictionary mapping page numbers to lists of tables
         """
         tables_by_page = {}
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            tables = []
-            for table in page.find_tables():
-                tables.append(table.extract())
+            tables = None
+            if use_cache:
+                key = TableCache.key(self.doc_hash, page_num, table_settings)
+                tables = self.table_cache.get(key)
+            if tables is None:
+                tables = _page_tables(self.doc[page_num], table_settings, prefilter)
+                if use_cache:
+                    self.table_cache.put(key, tables)
             if tables:
                 tables_by_page[page_num] = tables
         return tables_by_page
 
-    def extract_images(self, output_dir: str) -> List[Tuple[int, str]]:
+    def extract_images(self, output_dir: str, min_size: int = 0) -> List[Tuple[int, str]]:
         """
         Extract images from the PDF and save them to a directory
         
+        Each distinct image is written once, named after its content hash;
+        an image repeated across pages appears once per page in the result,
+        always with the same path.
+        
         Args:
             output_dir (str): Directory to save extracted images
+            min_size (int): Skip images narrower or shorter than this many pixels
             
         Returns:
             List[Tuple[int, str]]: List of tuples containing page number and image path
         """
         os.makedirs(output_dir, exist_ok=True)
         image_list = []
+        image_writer = _ImageWriter(self.doc, output_dir, min_size)
         
-        for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            image_list.extend(self._extract_images_from_page(page, page_num, output_dir))
+        try:
+            for page_num in range(len(self.doc)):
+                page = self.doc[page_num]
+                image_list.extend(image_writer.page_images(page, page_num))
+        finally:
+            image_writer.close()
             
         return image_list
 
-    def _extract_images_from_page(self, page, page_num: int, output_dir: str) -> List[Tuple[int, str]]:
+    def extract_all(self, text: bool = True, formatting: bool = False, tables: bool = False,
+                    images_dir: Optional[str] = None, workers: Optional[int] = None,
+                    table_settings: Optional[Dict] = None, prefilter: bool = True,
+                    min_image_size: int = 0) -> Dict:
         """
-        Helper method to extract images from a single page
-        """
-        image_list = []
-        image_count = 0
+        Extract several artifacts in a single pass over the pages
+        
+        Each page is loaded once and all requested artifacts are produced
+        together. With more than one worker the page range is split into
+        contiguous slices, each processed by a worker process that opens its
+        own document; results are merged back in page order. Images are
+        deduplicated within each slice, so a repeated image is decoded once
+        per slice rather than once per document.
         
-        for image_index, img in enumerate(page.get_images(full=True)):
-            xref = img[0]
-            base_image = self.doc.extract_image(xref)
+        Args:
+            text (bool): Extract plain text per page
+            formatting (bool): Extract text spans with font, size and color
+            tables (bool): Extract tables
+            images_dir (str): Save images to this directory (skipped if None)
+            workers (int): Worker processes (defaults to the CPU count)
+            table_settings (Dict): Keyword arguments for page.find_tables
+            prefilter (bool): Skip find_tables on pages that cannot contain a table
+            min_image_size (int): Skip images narrower or shorter than this many pixels
             
-            if base_image:
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                image_filename = f"page{page_num + 1}_image{image_count + 1}.{image_ext}"
-                image_path = os.path.join(output_dir, image_filename)
-                
-                with open(image_path, "wb") as image_file:
-                    image_file.write(image_bytes)
-                    
-                image_list.append((page_num, image_path))
-                image_count += 1
-                
-        return image_list
+        Returns:
+            Dict: Requested artifacts keyed "text", "formatting", "tables" and
+            "images", each shaped like the matching single-artifact method
+        """
+        if images_dir is not None:
+            os.makedirs(images_dir, exist_ok=True)
+        page_count = len(self.doc)
+        workers = max(1, min(workers or os.cpu_count() or 1, page_count))
+        
+        cached_tables = {}
+        if tables:
+            for page_num in range(page_count):
+                cached = self.table_cache.get(TableCache.key(self.doc_hash, page_num, table_settings))
+                if cached is not None:
+                    cached_tables[page_num] = cached
+        options = {
+            "text": text,
+            "formatting": formatting,
+            "tables": tables,
+            "table_settings": table_settings,
+            "prefilter": prefilter,
+            "cached_table_pages": set(cached_tables),
+            "images_dir": images_dir,
+            "min_image_size": min_image_size,
+        }
+        
+        if workers == 1:
+            pages = _extract_pages(self.doc, 0, page_count, options)
+        else:
+            # A few slices per worker evens out pages of uneven cost
+            slice_count = min(page_count, workers * 4)
+            bounds = [page_count * i // slice_count for i in range(slice_count + 1)]
+            pages = {}
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_extract_page_range, self.pdf_path, start, stop, options)
+                    for start, stop in zip(bounds, bounds[1:])
+                ]
+                for future in futures:
+                    pages.update(future.result())
+        
+        results = {}
+        if text:
+            results["text"] = {n: pages[n]["text"] for n in range(page_count)}
+        if formatting:
+            results["formatting"] = {n: pages[n]["formatting"] for n in range(page_count)}
+        if tables:
+            for page_num in range(page_count):
+                if page_num in cached_tables:
+                    pages[page_num]["tables"] = cached_tables[page_num]
+                else:
+                    key = TableCache.key(self.doc_hash, page_num, table_settings)
+                    self.table_cache.put(key, pages[page_num]["tables"])
+            results["tables"] = {n: pages[n]["tables"] for n in range(page_count) if pages[n]["tables"]}
+        if images_dir is not None:
+            results["images"] = [image for n in range(page_count) for image in pages[n]["images"]]
+        return results
 
     def save_extracted_text(self, output_path: str, include_formatting: bool = False):
         """
@@ -134,6 +582,7 @@ class PDFExtractor:
         self.doc.close()
 
 def main():
+    start_metrics_server()
     # Example usage
     pdf_path = "example.pdf"  # Replace with your PDF path
     output_dir = "extracted_content"
@@ -148,30 +597,35 @@ def main():
         # Initialize extractor
         extractor = PDFExtractor(pdf_path)
         
-        # Extract and save plain text
+        # Extract everything in one pass over the pages, across all cores
+        images_dir = os.path.join(output_dir, "images")
+        results = extractor.extract_all(text=True, formatting=True, tables=True, images_dir=images_dir)
+        
+        # Save plain text
         text_output = os.path.join(output_dir, "extracted_text.json")
-        extractor.save_extracted_text(text_output)
+        with open(text_output, 'w', encoding='utf-8') as f:
+            json.dump(results["text"], f, ensure_ascii=False, indent=2)
         print(f"Text extracted and saved to: {text_output}")
         
-        # Extract and save formatted text
+        # Save formatted text
         formatted_output = os.path.join(output_dir, "formatted_text.json")
-        extractor.save_extracted_text(formatted_output, include_formatting=True)
+        with open(formatted_output, 'w', encoding='utf-8') as f:
+            json.dump(results["formatting"], f, ensure_ascii=False, indent=2)
         print(f"Formatted text extracted and saved to: {formatted_output}")
         
-        # Extract tables
-        tables = extractor.extract_tables()
+        # Save tables
+        tables = results["tables"]
         if tables:
             tables_output = os.path.join(output_dir, "tables.json")
             with open(tables_output, 'w') as f:
                 json.dump(tables, f, indent=2)
             print(f"Tables extracted and saved to: {tables_output}")
         
-        # Extract images
-        images_dir = os.path.join(output_dir, "images")
-        images = extractor.extract_images(images_dir)
+        # Report images
+        images = results["images"]
         if images:
             print(f"Images extracted to: {images_dir}")
-            print(f"Number of images extracted: {len(images)}")
+            print(f"Number of images extracted: {len(images)} ({len(set(path for _, path in images))} unique)")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import uuid
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+ARCHIVE_DIR = os.getenv("PRESCRIPTION_ARCHIVE_DIR", "prescriptions")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prescriptions (
+    run_id       TEXT PRIMARY KEY,
+    created_at   TEXT NOT NULL,
+    patient_ref  TEXT,
+    medications  TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    size_bytes   INTEGER NOT NULL,
+    path         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_created ON prescriptions(created_at);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_patient ON prescriptions(patient_ref, created_at);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_hash ON prescriptions(content_hash);
+"""
+
+
+def patient_reference(patient_info: str) -> str:
+    """
+    Derive a stable, pseudonymous patient reference from free-text intake
+
+    Args:
+        patient_info (str): Patient conversation or intake text
+
+    Returns:
+        str: Short hex digest that identifies the intake without storing it
+    """
+    normalized = " ".join(patient_info.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+_RX_LINE = re.compile(r"^\s*(?:\d+[.)]|Rx:?)\s*\**([A-Za-z][A-Za-z0-9\-/ ]*?)\**\s*(?:\d|\(|-|:|$)")
+
+
+def extract_medications(prescription_text: str) -> List[str]:
+    """
+    Pull medication names out of an Rx-formatted prescription
+
+    Args:
+        prescription_text (str): Prescription in the Summary Agent's Rx format
+
+    Returns:
+        List[str]: Medication names in order of appearance, without duplicates
+    """
+    medications = []
+    for line in prescription_text.splitlines():
+        match = _RX_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(1).strip()
+        if name and name.lower() not in {"sig", "quantity", "qty", "instructions"} and name not in medications:
+            medications.append(name)
+    return medications
+
+
+class PrescriptionArchive:
+    def __init__(self, root: str = ARCHIVE_DIR, index_path: Optional[str] = None):
+        """
+        Initialize a content-addressed prescription archive
+
+        PDFs are stored once under ``<root>/objects/<hash[:2]>/<hash>.pdf`` and
+        every run is recorded in a SQLite index next to them.
+
+        Args:
+            root (str): Archive root directory
+            index_path (str): Path of the SQLite index (defaults to <root>/index.sqlite3)
+        """
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = index_path or os.path.join(root, "index.sqlite3")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection to the index, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def object_path(self, content_hash: str) -> str:
+        """Return the storage path for a given content hash."""
+        return os.path.join(self.objects_dir, content_hash[:2], f"{content_hash}.pdf")
+
+    def _write_object(self, pdf_bytes: bytes, content_hash: str) -> str:
+        """
+        Atomically write PDF bytes under their content hash
+
+        Identical content is written only once. Concurrent writers of the same
+        object race on ``os.replace`` of identical bytes, which is harmless.
+        """
+        path = self.object_path(content_hash)
+        if os.path.exists(path):
+            return path
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(pdf_bytes)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+    def store(
+        self,
+        pdf_bytes: bytes,
+        run_id: Optional[str] = None,
+        patient_ref: Optional[str] = None,
+        medications: Optional[List[str]] = None,
+    ) -> Dict:
+        """
+        Store a rendered prescription and index it
+
+        Args:
+            pdf_bytes (bytes): Rendered PDF content
+            run_id (str): Workflow run identifier (generated if omitted)
+            patient_ref (str): Pseudonymous patient reference
+            medications (List[str]): Medication names on the prescription
+
+        Returns:
+            Dict: The index record, including the archived ``path``
+        """
+        content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        path = self._write_object(pdf_bytes, content_hash)
+        record = {
+            "run_id": run_id or uuid.uuid4().hex,
+            "created_at": datetime.now().isoformat(timespec="microseconds"),
+            "patient_ref": patient_ref,
+            "medications": list(medications or []),
+            "content_hash": content_hash,
+            "size_bytes": len(pdf_bytes),
+            "path": path,
+        }
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO prescriptions "
+                "(run_id, created_at, patient_ref, medications, content_hash, size_bytes, path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record["run_id"],
+                    record["created_at"],
+                    record["patient_ref"],
+                    json.dumps(record["medications"]),
+                    record["content_hash"],
+                    record["size_bytes"],
+                    record["path"],
+                ),
+            )
+        return record
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        record["medications"] = json.loads(record["medications"])
+        return record
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        """Look up a single run by its identifier."""
+        row = self._connect().execute(
+            "SELECT * FROM prescriptions WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        return self._to_record(row) if row else None
+
+    def find_by_hash(self, content_hash: str) -> List[Dict]:
+        """Return every run that produced the given PDF content."""
+        rows = self._connect().execute(
+            "SELECT * FROM prescriptions WHERE content_hash = ? ORDER BY created_at",
+            (content_hash,),
+        ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def list_for_patient(self, patient_ref: str, limit: int = 50) -> List[Dict]:
+        """List a patient's prescriptions, newest first."""
+        rows = self._connect().execute(
+            "SELECT * FROM prescriptions WHERE patient_ref = ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (patient_ref, limit),
+        ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def list_recent(self, limit: int = 50, since: Optional[str] = None) -> List[Dict]:
+        """
+        List archived prescriptions, newest first
+
+        Args:
+            limit (int): Maximum number of records to return
+            since (str): Optional ISO timestamp lower bound
+
+        Returns:
+            List[Dict]: Index records
+        """
+        if since:
+            rows = self._connect().execute(
+                "SELECT * FROM prescriptions WHERE created_at >= ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (since, limit),
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT * FROM prescriptions ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def close(self):
+        """Close this thread's connection to the index"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
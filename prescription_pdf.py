@@ -0,0 +1,86 @@
+from io import BytesIO
+
+from prescription_archive import PrescriptionArchive, extract_medications, patient_reference
+from tracing import span
+from metrics import PDF_RENDER_SECONDS
+
+# reportlab is imported on the first render rather than with this module: the
+# Streamlit app and swarm_med import it at startup but most reruns never draw a PDF
+
+
+def generate_prescription_pdf(prescription_text, output_path="prescriptions/prescription.pdf"):
+    """Generate a simple prescription PDF with header and raw text."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, HRFlowable
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.colors import black
+
+    # invariant=1 pins the embedded creation date and document ID, so the
+    # same prescription text always renders to the same bytes.
+    doc = SimpleDocTemplate(output_path, pagesize=letter, topMargin=40, leftMargin=40, rightMargin=40, invariant=1)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Header style
+    header_style = ParagraphStyle(
+        'HeaderStyle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        alignment=TA_CENTER,
+        spaceAfter=20
+    )
+
+    # Basic style for content
+    basic_style = ParagraphStyle(
+        'BasicStyle',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceBefore=5,
+        spaceAfter=5
+    )
+
+    # Add header
+    story.append(Paragraph("PRESCRIPTION", header_style))
+
+    # Add horizontal line after header
+    story.append(HRFlowable(width="100%", thickness=1, color=black, spaceBefore=10, spaceAfter=20))
+
+    # Add the raw prescription text
+    story.append(Paragraph(prescription_text, basic_style))
+
+    doc.build(story)
+    return output_path
+
+def render_prescription_pdf(prescription_text):
+    """Render a prescription PDF in memory and return its bytes."""
+    buffer = BytesIO()
+    generate_prescription_pdf(prescription_text, output_path=buffer)
+    return buffer.getvalue()
+
+_archive = None
+
+def get_prescription_archive():
+    """Return the shared prescription archive, creating it on first use."""
+    global _archive
+    if _archive is None:
+        _archive = PrescriptionArchive()
+    return _archive
+
+def archive_prescription_pdf(prescription_text, run_id=None, patient_info=None, archive=None):
+    """Render a prescription and store it in the content-addressed archive.
+
+    Returns the archive record; its ``path`` is safe to hand out because
+    identical prescriptions share one file and distinct ones never collide.
+    """
+    archive = archive or get_prescription_archive()
+    with span("pdf.render", "pdf", chars=len(prescription_text)) as s, PDF_RENDER_SECONDS.time():
+        pdf_bytes = render_prescription_pdf(prescription_text)
+        s.set(bytes=len(pdf_bytes))
+    with span("pdf.archive", "pdf"):
+        return archive.store(
+            pdf_bytes,
+            run_id=run_id,
+            patient_ref=patient_reference(patient_info) if patient_info else None,
+            medications=extract_medications(prescription_text),
+        )
@@ -0,0 +1,239 @@
+import os
+import time
+import random
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Union
+
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+RATE_LIMIT_DB = os.getenv(
+    "RATE_LIMIT_DB", os.path.join(tempfile.gettempdir(), "agenticmd_ratelimit.sqlite3")
+)
+
+# Tokens added per chat message and per reply by the chat format
+_TOKENS_PER_MESSAGE = 4
+_TOKENS_PER_REPLY = 3
+# Completion budget assumed when the caller does not cap max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+_encodings: Dict[str, object] = {}
+_encodings_lock = threading.Lock()
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when capacity could not be acquired before the timeout."""
+
+
+def _get_encoding(model: str):
+    """Return a cached tiktoken encoding for a model, or None if unavailable."""
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                # Imported here so importing the limiter stays cheap
+                import tiktoken
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                # Offline without a cached BPE file: fall back to the heuristic
+                encoding = None
+            _encodings[model] = encoding
+        return _encodings[model]
+
+
+def count_tokens(texts: List[str], model: str = "gpt-4o-mini") -> List[int]:
+    """
+    Count tokens for a batch of texts
+
+    Args:
+        texts (List[str]): Texts to count
+        model (str): Model whose tokenizer is used
+
+    Returns:
+        List[int]: Token count per text (≈ chars / 4 if tiktoken is unavailable)
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return [len(text) // 4 + 1 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+
+def estimate_tokens(
+    messages: Union[str, Iterable[Dict]],
+    model: str = "gpt-4o-mini",
+    max_output_tokens: int = DEFAULT_COMPLETION_TOKENS,
+) -> int:
+    """
+    Estimate the TPM cost of a completion before sending it
+
+    Args:
+        messages: Prompt text or chat messages
+        model (str): Model whose tokenizer is used
+        max_output_tokens (int): Completion budget charged up front
+
+    Returns:
+        int: Estimated prompt plus completion tokens
+    """
+    if isinstance(messages, str):
+        return count_tokens([messages], model)[0] + max_output_tokens
+    messages = list(messages)
+    texts = [str(message.get("content") or "") for message in messages]
+    prompt_tokens = sum(count_tokens(texts, model)) if texts else 0
+    return prompt_tokens + _TOKENS_PER_MESSAGE * len(messages) + _TOKENS_PER_REPLY + max_output_tokens
+
+
+class SharedRateLimiter:
+    def __init__(
+        self,
+        rpm: float = OPENAI_RPM_LIMIT,
+        tpm: float = OPENAI_TPM_LIMIT,
+        path: str = RATE_LIMIT_DB,
+        key: str = "openai",
+        headroom: float = 0.95,
+        burst_seconds: float = 5.0,
+    ):
+        """
+        Token buckets for requests and tokens per minute, shared across processes
+
+        Bucket state lives in a small SQLite database, so every worker and the
+        Streamlit app pointing at the same file draw from one budget. Buckets
+        refill continuously and hold only ``burst_seconds`` worth of quota,
+        which keeps usage smooth instead of front-loading each minute.
+
+        Args:
+            rpm (float): Requests-per-minute limit of the API key
+            tpm (float): Tokens-per-minute limit of the API key
+            path (str): SQLite file holding the shared bucket state
+            key (str): Name of the budget (e.g. one per API key)
+            headroom (float): Fraction of the published limits to target
+            burst_seconds (float): Seconds of quota a bucket can accumulate
+        """
+        self.path = path
+        self.key = key
+        self.request_rate = rpm * headroom / 60.0
+        self.token_rate = tpm * headroom / 60.0
+        self.request_capacity = max(1.0, self.request_rate * burst_seconds)
+        self.token_capacity = max(1.0, self.token_rate * burst_seconds)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _refill(self, conn, name: str, rate: float, capacity: float, now: float) -> float:
+        row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return capacity
+        level, updated = row
+        return min(capacity, level + max(0.0, now - updated) * rate)
+
+    def _store(self, conn, name: str, level: float, now: float):
+        conn.execute(
+            "INSERT INTO buckets (name, level, updated) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET level = excluded.level, updated = excluded.updated",
+            (name, level, now),
+        )
+
+    def acquire(self, tokens: int = 0, requests: int = 1, timeout: Optional[float] = None) -> float:
+        """
+        Block until both budgets can cover a call, then charge them
+
+        Args:
+            tokens (int): Estimated tokens for the call
+            requests (int): Number of requests the call makes
+            timeout (float): Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        # A call larger than the bucket would never fit; let it through once the
+        # bucket is full and charge it in full, so the debt slows later callers.
+        requests_needed = min(float(requests), self.request_capacity)
+        tokens_needed = min(float(tokens), self.token_capacity)
+        request_key, token_key = f"{self.key}:rpm", f"{self.key}:tpm"
+        started = time.monotonic()
+        conn = self._connect()
+
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                request_level = self._refill(conn, request_key, self.request_rate, self.request_capacity, now)
+                token_level = self._refill(conn, token_key, self.token_rate, self.token_capacity, now)
+                if request_level >= requests_needed and token_level >= tokens_needed:
+                    self._store(conn, request_key, request_level - requests, now)
+                    self._store(conn, token_key, token_level - tokens, now)
+                    conn.execute("COMMIT")
+                    return time.monotonic() - started
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            wait_for = max(
+                (requests_needed - request_level) / self.request_rate if self.request_rate else 0.0,
+                (tokens_needed - token_level) / self.token_rate if self.token_rate else 0.0,
+            )
+            if timeout is not None and time.monotonic() - started + wait_for > timeout:
+                raise RateLimitTimeout(f"Rate limit capacity for {self.key} not available within {timeout:.1f}s")
+            # Jitter keeps waiting workers from waking in lockstep
+            time.sleep(min(wait_for, 1.0) * random.uniform(1.0, 1.2))
+
+    def adjust(self, tokens: int, requests: int = 0):
+        """
+        Correct the buckets once the real usage is known
+
+        Args:
+            tokens (int): Actual minus estimated tokens (negative refunds quota)
+            requests (int): Requests to add (negative refunds a request that was never sent)
+        """
+        if not tokens and not requests:
+            return
+        token_key, request_key = f"{self.key}:tpm", f"{self.key}:rpm"
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            level = self._refill(conn, token_key, self.token_rate, self.token_capacity, now)
+            self._store(conn, token_key, min(self.token_capacity, level - tokens), now)
+            if requests:
+                level = self._refill(conn, request_key, self.request_rate, self.request_capacity, now)
+                self._store(conn, request_key, min(self.request_capacity, level - requests), now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_limiter() -> SharedRateLimiter:
+    """Return the process-wide limiter configured from the environment."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = SharedRateLimiter()
+        return _shared_limiter
+
+
+def __getattr__(name):
+    # The LangChain integrations live in rate_limiter_langchain so that
+    # importing the limiter does not pull in langchain_core
+    if name in ("RateLimitCallbackHandler", "RateLimitedEmbeddings"):
+        import rate_limiter_langchain
+        return getattr(rate_limiter_langchain, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
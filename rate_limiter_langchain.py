@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+from concurrency import AdaptiveConcurrencyLimiter
+from metrics import LLM_TOKENS
+from rate_limiter import SharedRateLimiter, DEFAULT_COMPLETION_TOKENS, count_tokens, get_shared_limiter
+
+# LangChain integrations of the shared rate limiter. They live apart from
+# rate_limiter because langchain_core takes most of a second to import, and
+# the Swarm workflows only need the limiter itself.
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that acquires rate-limit capacity before each LLM call."""
+
+    raise_error = True
+
+    def __init__(self, limiter: Optional[SharedRateLimiter] = None, max_output_tokens: int = DEFAULT_COMPLETION_TOKENS):
+        self.limiter = limiter or get_shared_limiter()
+        self.max_output_tokens = max_output_tokens
+
+    def on_llm_start(self, serialized, prompts: List[str], **kwargs):
+        tokens = sum(count_tokens(prompts)) + self.max_output_tokens * len(prompts)
+        self.limiter.acquire(tokens=tokens, requests=len(prompts))
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        texts = [str(message.content) for batch in messages for message in batch]
+        tokens = sum(count_tokens(texts)) + self.max_output_tokens * len(messages)
+        self.limiter.acquire(tokens=tokens, requests=len(messages))
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        if "prompt_tokens" in usage:
+            LLM_TOKENS.observe(usage["prompt_tokens"], direction="in", source="langchain")
+        if "completion_tokens" in usage:
+            LLM_TOKENS.observe(usage["completion_tokens"], direction="out", source="langchain")
+
+
+class RateLimitedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        embeddings,
+        limiter: Optional[SharedRateLimiter] = None,
+        batch_size: int = 256,
+        concurrency: Optional[AdaptiveConcurrencyLimiter] = None,
+    ):
+        """
+        Wrap a LangChain embeddings model so every request is rate limited
+
+        Args:
+            embeddings: Underlying embeddings model (e.g. OpenAIEmbeddings)
+            limiter (SharedRateLimiter): Limiter to draw from (shared one by default)
+            batch_size (int): Texts per embeddings request
+            concurrency (AdaptiveConcurrencyLimiter): Embed batches in parallel
+                under this adaptive limit (sequential if omitted)
+        """
+        self.embeddings = embeddings
+        self.limiter = limiter or get_shared_limiter()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        tokens = sum(count_tokens(batch, "text-embedding-ada-002"))
+        LLM_TOKENS.observe(tokens, direction="in", source="embeddings")
+        self.limiter.acquire(tokens=tokens)
+        if self.concurrency is None:
+            return self.embeddings.embed_documents(batch)
+        with self.concurrency.slot():
+            return self.embeddings.embed_documents(batch)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        if self.concurrency is None or len(batches) < 2:
+            results = map(self._embed_batch, batches)
+        else:
+            # The pool is sized for the maximum; the limiter decides how many run
+            with ThreadPoolExecutor(max_workers=min(len(batches), self.concurrency.max_limit)) as executor:
+                results = list(executor.map(self._embed_batch, batches))
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        tokens = count_tokens([text], "text-embedding-ada-002")[0]
+        LLM_TOKENS.observe(tokens, direction="in", source="embeddings")
+        self.limiter.acquire(tokens=tokens)
+        return self.embeddings.embed_query(text)
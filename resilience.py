@@ -0,0 +1,476 @@
+import os
+import sys
+import time
+import random
+import functools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from rate_limiter import SharedRateLimiter, estimate_tokens
+from concurrency import AdaptiveConcurrencyLimiter
+from consultation_trace import current_trace
+from tracing import span, current_span
+from metrics import LLM_EVENTS, LLM_QUEUE_DEPTH, LLM_STAGE_SECONDS
+
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# The attempt a pool thread is running, read by the per-completion hook
+_current_attempt: ContextVar[Optional["_Attempt"]] = ContextVar("llm_attempt", default=None)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker is open and calls fail fast."""
+
+
+class StageTimeoutError(TimeoutError):
+    """Raised when a stage exhausts its deadline."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether an upstream error is worth retrying
+
+    Args:
+        error (BaseException): Exception raised by the client call
+
+    Returns:
+        bool: True for timeouts, connection errors, 429s and 5xx responses
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # An openai error can only exist once the SDK is loaded, so look it up
+    # instead of importing openai (over half a second) with this module
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(error, (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Keep a sliding window of call latencies
+
+        Args:
+            window (int): Number of recent samples kept
+            min_samples (int): Samples required before percentiles are reported
+        """
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th quantile (0-1) of recent latencies, or None if too few samples."""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        cooldown: float = 30.0,
+    ):
+        """
+        Fail fast while the upstream error rate is high
+
+        The breaker opens when at least ``failure_rate`` of the last ``window``
+        outcomes failed, stays open for ``cooldown`` seconds, then lets one
+        probe call through (half-open) and closes again on success.
+
+        Args:
+            failure_rate (float): Failure fraction that opens the breaker
+            window (int): Number of recent outcomes considered
+            min_calls (int): Outcomes required before the breaker may open
+            cooldown (float): Seconds to stay open before probing
+        """
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, success: bool):
+        """Record the outcome of a call that was allowed through."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if success:
+                    self.state = "closed"
+                    self.outcomes.clear()
+                else:
+                    self.state = "open"
+                    self._opened_at = time.monotonic()
+                return
+
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if (
+                len(self.outcomes) >= self.min_calls
+                and failures / len(self.outcomes) >= self.failure_rate
+            ):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class _Attempt:
+    __slots__ = ("stage", "deadline", "prepaid", "service", "completions", "prompt_tokens", "completion_tokens")
+
+    def __init__(self, stage: str, deadline: float, prepaid: Optional[Tuple[int, Optional[float]]] = None):
+        self.stage = stage
+        self.deadline = deadline
+        # (tokens, slot) already acquired for the first completion (hedges)
+        self.prepaid = prepaid
+        # Upstream time and usage of the attempt's completions, without
+        # rate-limit or concurrency waits (read by consultation traces)
+        self.service = 0.0
+        self.completions = 0
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+
+    def add_usage(self, usage):
+        self.prompt_tokens = (self.prompt_tokens or 0) + (usage.prompt_tokens or 0)
+        self.completion_tokens = (self.completion_tokens or 0) + (usage.completion_tokens or 0)
+
+
+class ResilientClient:
+    def __init__(
+        self,
+        client,
+        stage_timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = LLM_CALL_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        hedge: bool = LLM_HEDGE,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+        breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[SharedRateLimiter] = None,
+        concurrency: Optional[AdaptiveConcurrencyLimiter] = None,
+        max_workers: int = 64,
+    ):
+        """
+        Wrap a Swarm client with deadlines, retries, hedging and circuit breaking
+
+        ``run`` has the same signature as ``Swarm.run`` plus optional ``stage``
+        and ``timeout`` arguments, so it can be dropped in wherever a Swarm
+        client is used.
+
+        Args:
+            client: Swarm client whose ``run`` is wrapped
+            stage_timeouts (Dict[str, float]): Per-stage deadlines in seconds
+            default_timeout (float): Deadline for stages without an explicit one
+            max_retries (int): Retries on retryable errors within the deadline
+            base_delay (float): Initial backoff delay in seconds
+            max_delay (float): Backoff delay cap in seconds
+            hedge (bool): Send a duplicate request when the first one is slow
+            hedge_quantile (float): Latency quantile after which to hedge
+            hedge_min_delay (float): Lower bound on the hedge delay in seconds
+            breaker (CircuitBreaker): Shared circuit breaker (one is created if omitted)
+            rate_limiter (SharedRateLimiter): RPM/TPM budget charged before every completion
+            concurrency (AdaptiveConcurrencyLimiter): Adaptive cap on in-flight completions
+            max_workers (int): Threads available for in-flight calls
+
+        Swarm.run makes one chat completion per turn, tool-call and handoff
+        turns included, so the budgets are charged per completion by wrapping
+        the client's ``get_chat_completion`` (the client instance is modified,
+        as with tracing.instrument_swarm). Each charge is reconciled with the
+        completion's reported usage. Clients without ``get_chat_completion``
+        are charged once per ``run``.
+        """
+        self.client = client
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self.default_timeout = default_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        # Calls that miss their deadline are abandoned rather than cancelled,
+        # so the pool is shared and never waited on.
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        if concurrency is not None:
+            # A slot is only useful to a call that has a thread to run on
+            concurrency.cap(max_workers)
+        self._per_completion = hasattr(client, "get_chat_completion")
+        if self._per_completion:
+            client.get_chat_completion = self._limited(client.get_chat_completion)
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Delegate everything else (e.g. get_chat_completion) to the wrapped client
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _tracker(self, stage: str) -> LatencyTracker:
+        with self._lock:
+            if stage not in self._latency:
+                self._latency[stage] = LatencyTracker()
+                self._stats[stage] = {
+                    "calls": 0, "retries": 0, "hedges": 0, "timeouts": 0, "failures": 0,
+                }
+            return self._latency[stage]
+
+    def _count(self, stage: str, key: str):
+        with self._lock:
+            self._stats[stage][key] += 1
+        LLM_EVENTS.inc(stage=stage, event=key)
+
+    def stage_stats(self) -> Dict[str, Dict]:
+        """
+        Summarize per-stage call counters and latency percentiles
+
+        Returns:
+            Dict[str, Dict]: Stage name to counters plus p50/p95/p99 latency
+        """
+        summary = {}
+        for stage, tracker in list(self._latency.items()):
+            with self._lock:
+                stats = dict(self._stats[stage])
+            for q in (0.5, 0.95, 0.99):
+                stats[f"p{int(q * 100)}"] = tracker.percentile(q)
+            summary[stage] = stats
+        return summary
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _estimate(self, agent, messages) -> int:
+        instructions = getattr(agent, "instructions", "")
+        prompt = [{"content": instructions if isinstance(instructions, str) else ""}] + list(messages)
+        return estimate_tokens(prompt, model=getattr(agent, "model", "gpt-4o-mini"))
+
+    def _acquire(self, agent, messages, timeout: float) -> Tuple[int, Optional[float]]:
+        """Charge the rate limit and take a concurrency slot for one completion."""
+        tokens, slot = 0, None
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            if self.rate_limiter is not None:
+                tokens = self._estimate(agent, messages)
+                with span("rate_limit.wait", "wait", tokens=tokens):
+                    self.rate_limiter.acquire(tokens=tokens, timeout=timeout)
+            if self.concurrency is not None:
+                try:
+                    with span("concurrency.wait", "wait"):
+                        slot = self.concurrency.acquire(timeout=timeout)
+                except BaseException:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.adjust(-tokens, requests=-1)
+                    raise
+        finally:
+            LLM_QUEUE_DEPTH.dec()
+        return tokens, slot
+
+    def _call_limited(self, attempt: "_Attempt", agent, messages, call, *args, **kwargs):
+        """Make one upstream call under the rate and concurrency limits."""
+        if attempt.prepaid is not None:
+            (tokens, slot), attempt.prepaid = attempt.prepaid, None
+        else:
+            tokens, slot = self._acquire(agent, messages, timeout=max(0.0, attempt.deadline - time.monotonic()))
+        called = time.monotonic()
+        try:
+            result = call(*args, **kwargs)
+        except BaseException as e:
+            attempt.service += time.monotonic() - called
+            if slot is not None:
+                self.concurrency.release(slot, e, key=attempt.stage)
+            raise
+        attempt.service += time.monotonic() - called
+        attempt.completions += 1
+        if slot is not None:
+            self.concurrency.release(slot, key=attempt.stage)
+        usage = getattr(result, "usage", None)
+        if usage is not None:
+            attempt.add_usage(usage)
+            if self.rate_limiter is not None:
+                self.rate_limiter.adjust((usage.prompt_tokens or 0) + (usage.completion_tokens or 0) - tokens)
+        return result
+
+    def _limited(self, get_chat_completion):
+        @functools.wraps(get_chat_completion)
+        def limited_completion(agent, history, *args, **kwargs):
+            attempt = _current_attempt.get()
+            if attempt is None:
+                # Called outside run(), e.g. directly on the wrapped client
+                return get_chat_completion(agent, history, *args, **kwargs)
+            return self._call_limited(attempt, agent, history, get_chat_completion, agent, history, *args, **kwargs)
+        return limited_completion
+
+    def _call(self, attempt: "_Attempt", agent, messages, kwargs):
+        try:
+            if self._per_completion:
+                return self.client.run(agent=agent, messages=messages, **kwargs)
+            return self._call_limited(attempt, agent, messages, self.client.run,
+                                      agent=agent, messages=messages, **kwargs)
+        finally:
+            if attempt.prepaid is not None:
+                # The run failed before its first completion: hand back what the hedge took
+                tokens, slot = attempt.prepaid
+                if self.rate_limiter is not None:
+                    self.rate_limiter.adjust(-tokens, requests=-1)
+                if slot is not None:
+                    self.concurrency.cancel(slot)
+
+    def _attempt(self, stage: str, deadline: float, agent, messages, kwargs):
+        """Run one attempt, optionally hedged, bounded by the stage deadline; returns (response, attempt)."""
+        tracker = self._tracker(stage)
+        started, attempts = {}, {}
+
+        def submit(prepaid=None):
+            # The copied context carries the stage span and the attempt into the pool thread
+            context = contextvars.copy_context()
+            attempt = _Attempt(stage, deadline, prepaid)
+            context.run(_current_attempt.set, attempt)
+            future = self._executor.submit(context.run, self._call, attempt, agent, messages, kwargs)
+            started[future] = time.monotonic()
+            attempts[future] = attempt
+            return future
+
+        first = submit()
+        pending = {first}
+        hedge_at = None
+        if self.hedge:
+            hedge_delay = tracker.percentile(self.hedge_quantile)
+            if hedge_delay is not None:
+                hedge_at = started[first] + max(self.hedge_min_delay, hedge_delay)
+
+        error = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                self._count(stage, "timeouts")
+                raise StageTimeoutError(f"{stage} exceeded its deadline")
+            wait_for = deadline - now
+            if hedge_at is not None:
+                wait_for = min(wait_for, max(0.0, hedge_at - now))
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    tracker.record(time.monotonic() - started[future])
+                    return future.result(), attempts[future]
+                error = future.exception()
+
+            if hedge_at is not None and pending and time.monotonic() >= hedge_at:
+                hedge_at = None
+                try:
+                    # Hedges only use spare capacity: waiting for it here would
+                    # stop this thread from noticing the primary finish
+                    prepaid = self._acquire(agent, messages, timeout=0.0)
+                except TimeoutError:
+                    current_span().set(hedge_skipped=True)
+                    continue
+                self._count(stage, "hedges")
+                current_span().set(hedged=True)
+                pending.add(submit(prepaid))
+
+        raise error
+
+    def run(self, agent, messages, stage: Optional[str] = None, timeout: Optional[float] = None, **kwargs):
+        """
+        Run an agent with a deadline, retries and circuit breaking
+
+        Args:
+            agent: Swarm agent to run
+            messages (List[Dict]): Conversation messages
+            stage (str): Stage name used for deadlines and stats (defaults to the agent name)
+            timeout (float): Overrides the stage deadline in seconds
+            **kwargs: Passed through to ``Swarm.run``
+
+        Returns:
+            The Swarm response of the first successful attempt
+        """
+        stage = stage or getattr(agent, "name", "default")
+        budget = timeout or self.stage_timeouts.get(stage, self.default_timeout)
+        deadline = time.monotonic() + budget
+        self._tracker(stage)
+        self._count(stage, "calls")
+
+        with span(stage, "stage", agent=getattr(agent, "name", None)):
+            trace = current_trace()
+            started = time.monotonic()
+            try:
+                response, attempt = self._run_with_retries(stage, deadline, agent, messages, kwargs)
+            except Exception as e:
+                LLM_STAGE_SECONDS.observe(time.monotonic() - started, stage=stage, outcome="error")
+                if trace is not None:
+                    trace.record_call(stage, agent, messages, None, started, e)
+                raise
+            LLM_STAGE_SECONDS.observe(time.monotonic() - started, stage=stage, outcome="ok")
+            if trace is not None:
+                trace.record_call(stage, agent, messages, response, started, attempt=attempt)
+            return response
+
+    def _run_with_retries(self, stage: str, deadline: float, agent, messages, kwargs):
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit open; refusing {stage} call")
+            try:
+                result = self._attempt(stage, deadline, agent, messages, kwargs)
+            except Exception as e:
+                retryable = is_retryable(e)
+                # Non-retryable errors (e.g. a 400) mean the upstream answered
+                self.breaker.record(not retryable)
+                if not retryable or attempt >= self.max_retries:
+                    self._count(stage, "failures")
+                    raise
+                delay = self._backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    self._count(stage, "failures")
+                    raise
+                self._count(stage, "retries")
+                current_span().set(retries=attempt + 1)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record(True)
+            return result
@@ -0,0 +1,162 @@
+import re
+from datetime import date as Date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+# Building blocks of the command grammar; a group name ending in 2 is an
+# alternative spelling of the same argument
+_DATE = r"(?P<date>\d{4}-\d{2}-\d{2}|today|tomorrow)"
+_TIME = r"(?P<time>\d{1,2}(?::\d{2})?\s*(?:am|pm)?)"
+_ROOM = r"(?P<room>.+?)"
+_DURATION = r"(?:\s+for\s+(?P<duration>\d+)\s*(?:minutes|mins?|m))?"
+_POLITE = r"(?:(?:please|can you|could you|i want to|i'd like to)\s+)*"
+_AT_ON = rf"(?:at\s+{_TIME}\s+on\s+{_DATE}|on\s+{_DATE.replace('date>', 'date2>')}\s+at\s+{_TIME.replace('time>', 'time2>')})"
+
+
+def _pattern(body: str) -> Pattern:
+    return re.compile(rf"^\s*{_POLITE}{body}\s*[.?!]*\s*$", re.IGNORECASE)
+
+
+# (command, pattern); the first match wins, so specific forms come first
+GRAMMAR: List[Tuple[str, Pattern]] = [
+    ("schedule_class", _pattern(
+        rf"(?:schedule|book|add)\s+(?:a\s+)?(?P<class_name>.+?)(?:\s+class)?\s+in\s+{_ROOM}\s+{_AT_ON}{_DURATION}"
+        r"(?:\s+(?:with|taught by)\s+(?P<instructor>.+?))?"
+        r"(?:\s*,?\s*(?:repeating\s+)?(?P<recurrence>weekly|biweekly|every week|every other week)"
+        r"(?:\s+for\s+(?P<occurrences>\d+)\s*(?:weeks|times|occurrences|sessions))?)?"
+    )),
+    ("cancel_class", _pattern(
+        rf"(?:cancel|remove|delete)\s+(?:the\s+)?(?:class\s+)?in\s+{_ROOM}\s+{_AT_ON}"
+    )),
+    ("list_available_times", _pattern(
+        rf"(?:(?:what|which)\s+(?:times|slots|time slots)\s+are\s+(?:available|free|open)\s+(?:for|in)"
+        rf"|(?:list\s+|show\s+(?:me\s+)?)?(?:the\s+)?(?:available|free|open)\s+(?:times|slots|time slots)\s+(?:for|in))"
+        rf"\s+{_ROOM}\s+(?:on|for)\s+{_DATE}{_DURATION}"
+    )),
+    ("list_available_rooms", _pattern(
+        rf"(?:(?:what|which)\s+rooms\s+are\s+(?:available|free|open)"
+        rf"|(?:list\s+|show\s+(?:me\s+)?)?(?:the\s+)?(?:available|free|open)\s+rooms)\s+(?:on|for)\s+{_DATE}"
+    )),
+    ("free_windows", _pattern(
+        rf"(?:list\s+|show\s+(?:me\s+)?)?(?:the\s+)?free\s+windows\s+(?:for|in)\s+{_ROOM}\s+(?:on|for)\s+{_DATE}"
+        rf"(?:\s+of\s+at\s+least\s+(?P<min_duration>\d+)\s*(?:minutes|mins?|m))?"
+    )),
+    ("next_available", _pattern(
+        rf"when\s+is\s+{_ROOM}\s+(?:next\s+)?(?:available|free){_DURATION}"
+        rf"(?:\s+(?:after|from|on)\s+{_DATE}(?:\s+at\s+{_TIME})?)?"
+    )),
+    ("view_schedule", _pattern(
+        rf"(?:(?:show|give)\s+(?:me\s+)?|view\s+|what\s+is\s+|what's\s+|display\s+)?(?:the\s+)?schedule\s+(?:for|on)\s+{_DATE}"
+    )),
+    ("find_class", _pattern(
+        r"(?:(?:find|show|list)\s+(?:me\s+)?(?:the\s+)?(?:bookings\s+(?:for|of)\s+(?:the\s+)?)?class\s+(?P<class_name>.+?)"
+        r"|(?:where|when)\s+is\s+(?:the\s+)?(?P<class_name2>.+?)\s+class)"
+    )),
+]
+
+_RECURRENCES = {"weekly": "weekly", "every week": "weekly", "biweekly": "biweekly", "every other week": "biweekly"}
+
+
+def normalize_date(text: str, today: Optional[Date] = None) -> str:
+    """Resolve "today"/"tomorrow"; other dates pass through as YYYY-MM-DD."""
+    today = today or datetime.now().date()
+    text = text.lower()
+    if text == "today":
+        return today.isoformat()
+    if text == "tomorrow":
+        return (today + timedelta(days=1)).isoformat()
+    return text
+
+
+def normalize_time(text: str) -> str:
+    """Turn "9", "9:30", "10am" or "3:15 pm" into HH:MM; ValueError if not a clock time."""
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", text.strip().lower())
+    if not match:
+        raise ValueError(f"Not a time: {text}")
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Not a time: {text}")
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59:
+        raise ValueError(f"Not a time: {text}")
+    return f"{hour:02d}:{minute:02d}"
+
+
+def parse_command(text: str, rooms: List[str]) -> Optional[Tuple[str, Dict[str, str]]]:
+    """
+    Match text against the command grammar
+
+    Args:
+        text (str): User input
+        rooms (List[str]): Known rooms; room names are matched case-insensitively
+            and a command naming an unknown room is left to the agent
+
+    Returns:
+        Optional[Tuple[str, Dict[str, str]]]: ClassScheduler method name and its
+        keyword arguments, or None if the input is not a canonical command
+    """
+    room_names = {room.lower(): room for room in rooms}
+    for command, pattern in GRAMMAR:
+        match = pattern.match(text)
+        if not match:
+            continue
+        groups = {key.rstrip("2"): value.strip() for key, value in match.groupdict().items() if value}
+        args: Dict[str, str] = {}
+        try:
+            for key, value in groups.items():
+                if key == "date":
+                    args["date"] = normalize_date(value)
+                elif key == "time":
+                    args["time"] = normalize_time(value)
+                elif key == "room":
+                    room = room_names.get(value.lower()) or room_names.get(f"room {value.lower()}")
+                    if room is None:
+                        return None
+                    args["room"] = room
+                elif key == "recurrence":
+                    args["recurrence"] = _RECURRENCES[value.lower()]
+                else:
+                    args[key] = value
+        except ValueError:
+            return None
+        if command == "next_available" and "date" not in args:
+            args["date"] = normalize_date("today")
+        return command, args
+    return None
+
+
+class CommandFastPath:
+    def __init__(self, scheduler):
+        """
+        Answer canonical scheduler commands without the LLM
+
+        Inputs matching GRAMMAR call the ClassScheduler method directly;
+        anything else returns None so the caller can hand it to the ReAct
+        agent. Hits and misses are counted for the hit-rate report.
+
+        Args:
+            scheduler (ClassScheduler): Scheduler whose methods serve the commands
+        """
+        self.scheduler = scheduler
+        self.hits = 0
+        self.misses = 0
+
+    def handle(self, text: str) -> Optional[str]:
+        """Return the response for a canonical command, or None to fall back to the agent."""
+        parsed = parse_command(text, self.scheduler.rooms)
+        if parsed is None:
+            self.misses += 1
+            return None
+        command, args = parsed
+        method: Callable[..., str] = getattr(self.scheduler, command)
+        self.hits += 1
+        return method(**args)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        return f"Fast path answered {self.hits} of {total} commands ({self.hit_rate:.0%})"
@@ -0,0 +1,296 @@
+import sys
+import json
+import struct
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+
+SPAN_FILE_MAGIC = b"AMDSPAN1"
+
+# page number, span count, new font count, text byte length
+_PAGE_HEADER = struct.Struct("<IIII")
+_FONT_LENGTH = struct.Struct("<H")
+
+
+def _to_little_endian(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+class SpanStore:
+    def __init__(self):
+        """
+        Struct-of-arrays storage for formatted text spans
+
+        Span text lives in one UTF-8 blob addressed by offsets, font names are
+        interned into a table, and size, color, page and bbox are packed
+        ``array`` columns. Spans must be added page by page, in page order.
+        """
+        self.text = bytearray()
+        self.offsets = array("I", [0])
+        self.fonts: List[str] = []
+        self._font_ids: Dict[str, int] = {}
+        self.font = array("H")
+        self.size = array("f")
+        self.color = array("I")
+        self.page = array("I")
+        self.bbox = array("f")
+        self._page_ranges: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.font)
+
+    def intern_font(self, name: str) -> int:
+        """Return the id of a font name, adding it to the font table if new."""
+        font_id = self._font_ids.get(name)
+        if font_id is None:
+            font_id = self._font_ids[name] = len(self.fonts)
+            self.fonts.append(name)
+        return font_id
+
+    def start_page(self, page_num: int):
+        """Record a page, so it is listed (with no spans) even if none are appended."""
+        self._page_ranges.setdefault(page_num, (len(self), len(self)))
+
+    def append(self, page_num: int, text: str, font: str, size: float, color: int,
+               bbox: Tuple[float, float, float, float]):
+        """Add one span; spans of a page must be appended contiguously."""
+        index = len(self)
+        start, _ = self._page_ranges.get(page_num, (index, index))
+        self._page_ranges[page_num] = (start, index + 1)
+        self.text += text.encode("utf-8")
+        self.offsets.append(len(self.text))
+        self.font.append(self.intern_font(font))
+        self.size.append(size)
+        self.color.append(color)
+        self.page.append(page_num)
+        self.bbox.extend(bbox)
+
+    def add_page(self, page_num: int, page, textpage=None):
+        """
+        Add every span of a PyMuPDF page
+
+        Args:
+            page_num (int): Page number recorded with the spans
+            page: PyMuPDF page
+            textpage: Pre-built TextPage to reuse, if any
+        """
+        self.start_page(page_num)
+        for block in page.get_text("dict", textpage=textpage)["blocks"]:
+            for line in block.get("lines", ()):
+                for span in line["spans"]:
+                    self.append(page_num, span["text"], span["font"], span["size"], span["color"], span["bbox"])
+
+    def page_numbers(self) -> List[int]:
+        return list(self._page_ranges)
+
+    def page_range(self, page_num: int) -> Tuple[int, int]:
+        """Return the [start, stop) span indices of a page."""
+        return self._page_ranges.get(page_num, (0, 0))
+
+    def span_text(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def span(self, index: int, include_bbox: bool = False) -> Dict:
+        """
+        Return one span as a dict, as produced by extract_text_with_formatting
+
+        Args:
+            index (int): Span index
+            include_bbox (bool): Also include the span's bounding box
+
+        Returns:
+            Dict: text, font, size and color (and bbox) of the span
+        """
+        span = {
+            "text": self.span_text(index),
+            "font": self.fonts[self.font[index]],
+            "size": self.size[index],
+            "color": self.color[index],
+        }
+        if include_bbox:
+            span["bbox"] = tuple(self.bbox[4 * index:4 * index + 4])
+        return span
+
+    def page_spans(self, page_num: int, include_bbox: bool = False) -> List[Dict]:
+        start, stop = self.page_range(page_num)
+        return [self.span(index, include_bbox) for index in range(start, stop)]
+
+    def to_dict(self, include_bbox: bool = False) -> Dict[int, List[Dict]]:
+        """Return the dict-per-span view, keyed by page number."""
+        return {page_num: self.page_spans(page_num, include_bbox) for page_num in self._page_ranges}
+
+    def as_numpy(self) -> Dict:
+        """
+        Return zero-copy NumPy views of the numeric columns
+
+        Returns:
+            Dict: offsets, font, size, color, page and bbox (bbox shaped N x 4)
+        """
+        import numpy as np
+
+        columns = {
+            name: np.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode)
+            for name in ("offsets", "font", "size", "color", "page")
+        }
+        columns["bbox"] = np.frombuffer(self.bbox, dtype="f").reshape(-1, 4)
+        return columns
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the blob and columns."""
+        columns = (self.offsets, self.font, self.size, self.color, self.page, self.bbox)
+        return len(self.text) + sum(column.itemsize * len(column) for column in columns)
+
+    def clear(self):
+        """Drop all spans but keep the font table, for page-by-page reuse."""
+        fonts, font_ids = self.fonts, self._font_ids
+        self.__init__()
+        self.fonts, self._font_ids = fonts, font_ids
+
+    def _slice(self, page_num: int):
+        start, stop = self.page_range(page_num)
+        base = self.offsets[start]
+        return (
+            start, stop,
+            bytes(self.text[base:self.offsets[stop]]),
+            array("I", (offset - base for offset in self.offsets[start:stop + 1])),
+        )
+
+
+class SpanWriter:
+    def __init__(self, fp, fmt: str = "binary"):
+        """
+        Stream a SpanStore to a file one page at a time
+
+        The binary format is a magic header followed by one record per page:
+        page number, span count, fonts first seen on that page, and the page's
+        text blob and columns as little-endian arrays. The JSONL format writes
+        the same columns as one JSON object per page.
+
+        Args:
+            fp: File opened in binary mode ("binary") or text mode ("jsonl")
+            fmt (str): "binary" or "jsonl"
+        """
+        if fmt not in ("binary", "jsonl"):
+            raise ValueError(f"Unknown span format: {fmt}")
+        self.fp = fp
+        self.fmt = fmt
+        self._fonts_written = 0
+        if fmt == "binary":
+            fp.write(SPAN_FILE_MAGIC)
+
+    def write_page(self, store: SpanStore, page_num: int):
+        """Write one page of a store (whose font table the writer follows)."""
+        start, stop, text, offsets = store._slice(page_num)
+        new_fonts = store.fonts[self._fonts_written:]
+        self._fonts_written = len(store.fonts)
+
+        if self.fmt == "jsonl":
+            record = {
+                "page": page_num,
+                "fonts": new_fonts,
+                "text": [text[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(stop - start)],
+                "font": store.font[start:stop].tolist(),
+                "size": store.size[start:stop].tolist(),
+                "color": store.color[start:stop].tolist(),
+                "bbox": store.bbox[4 * start:4 * stop].tolist(),
+            }
+            self.fp.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            return
+
+        self.fp.write(_PAGE_HEADER.pack(page_num, stop - start, len(new_fonts), len(text)))
+        for name in new_fonts:
+            encoded = name.encode("utf-8")
+            self.fp.write(_FONT_LENGTH.pack(len(encoded)) + encoded)
+        self.fp.write(_to_little_endian(offsets))
+        self.fp.write(text)
+        for column, width in ((store.font, 1), (store.size, 1), (store.color, 1), (store.bbox, 4)):
+            self.fp.write(_to_little_endian(column[width * start:width * stop]))
+
+
+def _read_binary_pages(fp: BinaryIO, store: SpanStore) -> Iterator[int]:
+    while True:
+        header = fp.read(_PAGE_HEADER.size)
+        if not header:
+            return
+        page_num, count, font_count, text_length = _PAGE_HEADER.unpack(header)
+        for _ in range(font_count):
+            (length,) = _FONT_LENGTH.unpack(fp.read(_FONT_LENGTH.size))
+            store.intern_font(fp.read(length).decode("utf-8"))
+        offsets = _from_little_endian("I", fp.read(4 * (count + 1)))
+        text = fp.read(text_length)
+        font = _from_little_endian("H", fp.read(2 * count))
+        size = _from_little_endian("f", fp.read(4 * count))
+        color = _from_little_endian("I", fp.read(4 * count))
+        bbox = _from_little_endian("f", fp.read(16 * count))
+        store.start_page(page_num)
+        for i in range(count):
+            store.append(
+                page_num, text[offsets[i]:offsets[i + 1]].decode("utf-8"), store.fonts[font[i]],
+                size[i], color[i], bbox[4 * i:4 * i + 4],
+            )
+        yield page_num
+
+
+def _read_jsonl_pages(fp: TextIO, store: SpanStore) -> Iterator[int]:
+    for line in fp:
+        record = json.loads(line)
+        for name in record["fonts"]:
+            store.intern_font(name)
+        bbox = record["bbox"]
+        store.start_page(record["page"])
+        for i, text in enumerate(record["text"]):
+            store.append(
+                record["page"], text, store.fonts[record["font"][i]],
+                record["size"][i], record["color"][i], bbox[4 * i:4 * i + 4],
+            )
+        yield record["page"]
+
+
+def iter_span_file(path: str, store: Optional[SpanStore] = None, clear: bool = True) -> Iterator[Tuple[int, SpanStore]]:
+    """
+    Read a span file written by SpanWriter one page at a time
+
+    Args:
+        path (str): Binary or JSONL span file (detected from its header)
+        store (SpanStore): Store to read into (a new one by default)
+        clear (bool): Empty the store before each page so memory stays flat
+
+    Yields:
+        Tuple[int, SpanStore]: Page number and the store holding that page
+    """
+    store = store if store is not None else SpanStore()
+    with open(path, "rb") as f:
+        binary = f.read(len(SPAN_FILE_MAGIC)) == SPAN_FILE_MAGIC
+    if binary:
+        f = open(path, "rb")
+        f.seek(len(SPAN_FILE_MAGIC))
+        pages = _read_binary_pages(f, store)
+    else:
+        f = open(path, "r", encoding="utf-8")
+        pages = _read_jsonl_pages(f, store)
+    with f:
+        while True:
+            if clear:
+                store.clear()
+            page_num = next(pages, None)
+            if page_num is None:
+                return
+            yield page_num, store
+
+
+def load_span_file(path: str) -> SpanStore:
+    """Read a whole span file into one SpanStore."""
+    store = SpanStore()
+    for _ in iter_span_file(path, store, clear=False):
+        pass
+    return store
@@ -4,25 +4,42 @@ import sys
 from swarm import Agent, Swarm
 from openai import OpenAI
 import tempfile
-from datetime import datetime
+from resilience import ResilientClient, LLM_CALL_TIMEOUT
+from rate_limiter import get_shared_limiter
+from concurrency import get_concurrency_limiter
+from cassette import get_http_client
+from tracing import traced, instrument_swarm
+from metrics import start_metrics_server
 
 # Add the directory containing the original script to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+@st.cache_resource(show_spinner=False)
 def initialize_clients(api_key):
-    """Initialize OpenAI and Swarm clients with API key"""
+    """Initialize OpenAI and Swarm clients with API key
+
+    Cached per API key for the life of the server, so reruns share one
+    ResilientClient: its circuit breaker state, hedge latency history and
+    worker pool persist instead of being rebuilt on every interaction.
+    """
     os.environ['OPENAI_API_KEY'] = api_key
-    api = OpenAI(api_key=api_key)
-    client = Swarm(api)
+    # Retries, deadlines and circuit breaking are handled by ResilientClient
+    # LLM_CASSETTE records or replays these calls (see cassette.py)
+    api = OpenAI(api_key=api_key, max_retries=0, timeout=LLM_CALL_TIMEOUT, http_client=get_http_client())
+    client = ResilientClient(
+        instrument_swarm(Swarm(api)),
+        rate_limiter=get_shared_limiter(),
+        concurrency=get_concurrency_limiter("llm")
+    )
     return api, client
 
 # Add better error handling for imports
 try:
-    from swarm_med import (
-        generate_prescription_pdf,
+    from prescription_pdf import (
+        archive_prescription_pdf,
     )
 except ImportError as e:
-    st.error(f"Failed to import required modules from swarm_med: {e}")
+    st.error(f"Failed to import required modules from prescription_pdf: {e}")
     st.stop()
 
 def agent_workflow_step(agent, context, system_msg, user_msg):
@@ -208,6 +225,9 @@ def handle_history_taking():
         st.rerun()
 
 def main():
+    # Started once per process; the script reruns on every interaction
+    start_metrics_server()
+
     # Configure the page with a medical theme
     st.set_page_config(
         page_title="AgenticMD - AI Medical Assistant",
@@ -491,7 +511,7 @@ def main():
                         st.download_button(
                             label="Download Prescription PDF",
                             data=pdf_file,
-                            file_name=os.path.basename(pdf_path),
+                            file_name=f"prescription_{workflow_results['run_id']}.pdf",
                             mime="application/pdf"
                         )
                     
@@ -610,6 +630,7 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
+@traced("complete_medical_workflow", "workflow")
 def complete_medical_workflow(initial_results):
     """Complete the remaining steps of the medical workflow after history taking"""
     workflow_results = initial_results.copy()
@@ -654,13 +675,14 @@ def complete_medical_workflow(initial_results):
         f"Treatment Plan: {workflow_results['treatment_plan']}\nPrescription: {workflow_results['prescription']}"
     )
     
-    # Generate PDF
-    pdf_path = generate_prescription_pdf(
+    # Generate PDF and file it in the prescription archive
+    record = archive_prescription_pdf(
         prescription_text=formatted_prescription,
-        output_path=f"prescriptions/prescription_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        patient_info=workflow_results['history']
     )
+    workflow_results['run_id'] = record['run_id']
     
-    return workflow_results, pdf_path
+    return workflow_results, record['path']
 
 def verify_agents():
     """Verify that all required agents are properly loaded."""
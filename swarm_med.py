@@ -1,47 +1,52 @@
-from swarm import Agent, Swarm
-from openai import OpenAI
-import os
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from datetime import datetime
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-from reportlab.lib.colors import black
-
-os.environ['OPENAI_API_KEY'] = ''
-api = OpenAI(api_key="")
+import threading
+from resilience import ResilientClient, LLM_CALL_TIMEOUT
+from rate_limiter import get_shared_limiter
+from concurrency import get_concurrency_limiter
+from consultation_trace import traced_consultation, local_stage
+from tracing import traced, instrument_swarm
+from metrics import start_metrics_server
+from prescription_pdf import (
+    generate_prescription_pdf,
+    render_prescription_pdf,
+    get_prescription_archive,
+    archive_prescription_pdf,
+)
 
-client = Swarm(api)
+# Agents and the Swarm client are built on first use, not at import: swarm
+# and openai are only loaded once a workflow actually runs, and importing
+# this module for its PDF helpers or configuration costs nothing
+_AGENT_SPECS = {}
+_agents = None
+_client = None
+_lock = threading.Lock()
 
 
 def transfer_to_orchestrator():
-    return orchestrator_agent
+    return get_agent("orchestrator_agent")
 
 def transfer_to_history_agent():
-    return history_agent
+    return get_agent("history_agent")
 
 def transfer_to_medical_history_agent():
-    return medical_history_agent
+    return get_agent("medical_history_agent")
 
 def transfer_to_assessment_agent():
-    return assessment_agent
+    return get_agent("assessment_agent")
 
 def transfer_to_treatment_agent():
-    return treatment_agent
+    return get_agent("treatment_agent")
 
 def transfer_to_medication_agent():
-    return medication_agent
+    return get_agent("medication_agent")
 
 def transfer_to_prescription_agent():
-    return prescription_agent
+    return get_agent("prescription_agent")
 
 def transfer_to_pdf_agent():
-    return pdf_generation_agent
+    return get_agent("pdf_generation_agent")
 
 # Orchestrator Agent
-orchestrator_agent = Agent(
+_AGENT_SPECS["orchestrator_agent"] = dict(
     name="Orchestrator Agent",
     instructions="Manage the medical workflow, coordinate between agents, "
                  "track context, and ensure smooth transition between stages. "
@@ -59,7 +64,7 @@ orchestrator_agent = Agent(
 )
 
 # History Taking Agent
-history_agent = Agent(
+_AGENT_SPECS["history_agent"] = dict(
     name="History Taking Agent",
     instructions="""
     Relevance:
@@ -108,7 +113,7 @@ history_agent = Agent(
 )
 
 # Medical History Agent
-medical_history_agent = Agent(
+_AGENT_SPECS["medical_history_agent"] = dict(
     name="Medical History Agent",
     instructions="""
     R (Role):
@@ -141,7 +146,7 @@ medical_history_agent = Agent(
 )
 
 # Assessment Agent
-assessment_agent = Agent(
+_AGENT_SPECS["assessment_agent"] = dict(
     name="Assessment Agent",
     instructions="""
     R (Role):
@@ -175,7 +180,7 @@ assessment_agent = Agent(
 )
 
 # Treatment Agent
-treatment_agent = Agent(
+_AGENT_SPECS["treatment_agent"] = dict(
     name="Treatment Agent",
     instructions="""
     R (Role):
@@ -210,7 +215,7 @@ treatment_agent = Agent(
 )
 
 # Medication Management Agent
-medication_agent = Agent(
+_AGENT_SPECS["medication_agent"] = dict(
     name="Medication Management Agent",
     instructions="""
     R (Role):
@@ -248,7 +253,7 @@ medication_agent = Agent(
 )
 
 # Prescription Generation Agent
-prescription_agent = Agent(
+_AGENT_SPECS["prescription_agent"] = dict(
     name="Prescription Agent",
     instructions="""
     R (Role):
@@ -286,7 +291,7 @@ prescription_agent = Agent(
 )
 
 # Add new Summary Agent
-summary_agent = Agent(
+_AGENT_SPECS["summary_agent"] = dict(
     name="Summary Agent",
     instructions="""
     R (Role):
@@ -329,45 +334,8 @@ summary_agent = Agent(
     functions=[transfer_to_orchestrator]
 )
 
-# Update PDF generation function
-def generate_prescription_pdf(prescription_text, output_path="prescriptions/prescription.pdf"):
-    """Generate a simple prescription PDF with header and raw text."""
-    doc = SimpleDocTemplate(output_path, pagesize=letter, topMargin=40, leftMargin=40, rightMargin=40)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Header style
-    header_style = ParagraphStyle(
-        'HeaderStyle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        alignment=TA_CENTER,
-        spaceAfter=20
-    )
-
-    # Basic style for content
-    basic_style = ParagraphStyle(
-        'BasicStyle',
-        parent=styles['Normal'],
-        fontSize=12,
-        spaceBefore=5,
-        spaceAfter=5
-    )
-
-    # Add header
-    story.append(Paragraph("PRESCRIPTION", header_style))
-    
-    # Add horizontal line after header
-    story.append(HRFlowable(width="100%", thickness=1, color=black, spaceBefore=10, spaceAfter=20))
-
-    # Add the raw prescription text
-    story.append(Paragraph(prescription_text, basic_style))
-
-    doc.build(story)
-    return output_path
-
 # PDF Generation Agent
-pdf_generation_agent = Agent(
+_AGENT_SPECS["pdf_generation_agent"] = dict(
     name="PDF Generation Agent",
     instructions="""
     R (Role):
@@ -401,13 +369,72 @@ pdf_generation_agent = Agent(
     5. Complete and accurate information
     """,
     model="gpt-4o-mini",
-    functions=[generate_prescription_pdf]
+    # No PDF tool: medical_workflow files the PDF through archive_prescription_pdf,
+    # and a tool writing to a fixed path would collide across concurrent runs
+    functions=[]
 )
 
-# Swarm Client Initialization
-client = Swarm()
-
+# Per-stage deadlines (seconds) for the workflow's client.run calls
+STAGE_TIMEOUTS = {
+    "history": 60,
+    "medical_history": 60,
+    "assessment": 90,
+    "treatment": 90,
+    "prescription": 90,
+    "summary": 45,
+    "pdf": 45,
+}
+
+def get_agents():
+    """Return the workflow's agents by name, building them on first use."""
+    global _agents
+    with _lock:
+        if _agents is None:
+            from swarm import Agent
+            _agents = {name: Agent(**spec) for name, spec in _AGENT_SPECS.items()}
+        return _agents
+
+def get_agent(name):
+    """Return one workflow agent, e.g. ``get_agent("history_agent")``."""
+    return get_agents()[name]
+
+def get_client():
+    """Return the workflow's Swarm client, creating it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            from openai import OpenAI
+            from swarm import Swarm
+            from cassette import get_http_client
+            # Retries are handled by ResilientClient, so the OpenAI client's own are disabled
+            _client = ResilientClient(
+                instrument_swarm(Swarm(OpenAI(max_retries=0, timeout=LLM_CALL_TIMEOUT, http_client=get_http_client()))),
+                stage_timeouts=STAGE_TIMEOUTS,
+                rate_limiter=get_shared_limiter(),
+                concurrency=get_concurrency_limiter("llm")
+            )
+        return _client
+
+def set_client(client):
+    """Replace the workflow's client (e.g. with a wrapper that times each stage)."""
+    global _client
+    with _lock:
+        _client = client
+
+def __getattr__(name):
+    # Keeps swarm_med.history_agent, swarm_med.client, ... working without
+    # building anything at import time
+    if name in _AGENT_SPECS:
+        return get_agent(name)
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@traced("medical_workflow", "workflow")
+@traced_consultation
 def medical_workflow(patient_conversation):
+    client = get_client()
+    agents = get_agents()
     print("\n🏥 Starting Medical Workflow 🏥")
     print("--------------------------------")
     
@@ -432,7 +459,8 @@ def medical_workflow(patient_conversation):
             print("--------------------------------")
             print("Collecting patient history using OLDCARTS format...")
             response = client.run(
-                agent=history_agent,
+                agent=agents["history_agent"],
+                stage="history",
                 messages=[
                     {"role": "system", "content": "Collect patient history using OLDCARTS format"},
                     {"role": "user", "content": context["patient_info"]}
@@ -450,7 +478,8 @@ def medical_workflow(patient_conversation):
             print("--------------------------------")
             print("Compiling structured medical history...")
             response = client.run(
-                agent=medical_history_agent,
+                agent=agents["medical_history_agent"],
+                stage="medical_history",
                 messages=[
                     {"role": "system", "content": "Compile a structured medical history"},
                     {"role": "user", "content": context["history"]}
@@ -468,7 +497,8 @@ def medical_workflow(patient_conversation):
             print("--------------------------------")
             print("Performing comprehensive medical assessment...")
             response = client.run(
-                agent=assessment_agent,
+                agent=agents["assessment_agent"],
+                stage="assessment",
                 messages=[
                     {"role": "system", "content": "Provide a comprehensive medical assessment"},
                     {"role": "user", "content": f"Patient History: {context['history']}\nMedical History: {context['medical_history']}"}
@@ -486,7 +516,8 @@ def medical_workflow(patient_conversation):
             print("--------------------------------")
             print("Developing evidence-based treatment plan...")
             response = client.run(
-                agent=treatment_agent,
+                agent=agents["treatment_agent"],
+                stage="treatment",
                 messages=[
                     {"role": "system", "content": "Provide evidence-based treatment recommendations"},
                     {"role": "user", "content": f"Assessment: {context['assessment']}\nMedical History: {context['medical_history']}"}
@@ -503,7 +534,8 @@ def medical_workflow(patient_conversation):
             print("--------------------------------")
             print("Generating detailed prescription...")
             response = client.run(
-                agent=prescription_agent,
+                agent=agents["prescription_agent"],
+                stage="prescription",
                 messages=[
                     {"role": "system", "content": "Generate a detailed prescription based on the treatment plan"},
                     {"role": "user", "content": f"Treatment Plan: {workflow_state['treatment_plan']}\nMedical History: {context['medical_history']}"}
@@ -520,7 +552,8 @@ def medical_workflow(patient_conversation):
             print("Formatting prescription for PDF...")
             
             response = client.run(
-                agent=summary_agent,
+                agent=agents["summary_agent"],
+                stage="summary",
                 messages=[
                     {
                         "role": "system",
@@ -552,18 +585,21 @@ def medical_workflow(patient_conversation):
             ]
             
             response = client.run(
-                agent=pdf_generation_agent,
+                agent=agents["pdf_generation_agent"],
+                stage="pdf",
                 messages=pdf_messages
             )
             
-            # Generate the PDF
-            pdf_path = generate_prescription_pdf(
-                prescription_text=formatted_prescription,
-                output_path=f"prescriptions/prescription_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            )
+            # Generate the PDF and file it in the archive
+            with local_stage("pdf_render", len(formatted_prescription)):
+                record = archive_prescription_pdf(
+                    prescription_text=formatted_prescription,
+                    patient_info=context["patient_info"]
+                )
+            pdf_path = record["path"]
             
             workflow_state["pdf_generated"] = True
-            print(f"\nPDF Generated: {pdf_path}")
+            print(f"\nPDF Generated: {pdf_path} (run {record['run_id']})")
             
     print("\n✅ Medical Workflow Complete")
     print("--------------------------------")
@@ -572,11 +608,13 @@ def medical_workflow(patient_conversation):
     return {
         "treatment_plan": workflow_state["treatment_plan"],
         "prescription": workflow_state["prescription"],
-        "pdf_path": pdf_path if workflow_state["pdf_generated"] else None
+        "pdf_path": pdf_path if workflow_state["pdf_generated"] else None,
+        "run_id": record["run_id"] if workflow_state["pdf_generated"] else None
     }
 
 # Example Usage
 def main():
+    start_metrics_server()
     patient_conversation = """
     Patient: I've been experiencing chest pain and shortness of breath for the past week.
     My father had a heart attack when he was 55, and I'm 52 now.
@@ -0,0 +1,21 @@
+import json
+
+from page_store import PageStore
+
+
+def test_catalog_line_appended_in_two_halves(tmp_path):
+    store = PageStore(str(tmp_path))
+    store.add_document("a", ["first page", "second page"])
+    line = json.dumps({"doc": "b", "stem": "x", "pages": 0, "bytes": 0}) + "\n"
+    half = len(line) // 2
+
+    # Another writer's append lands in two pieces; the reader sees the first alone
+    with open(store.catalog_path, "a", encoding="utf-8") as f:
+        f.write(line[:half])
+    assert store.documents() == ["a"]
+
+    with open(store.catalog_path, "a", encoding="utf-8") as f:
+        f.write(line[half:])
+    assert store.documents() == ["a", "b"]
+    assert store.get_text("a", 1) == "second page"
+    store.close()
@@ -0,0 +1,215 @@
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from booking_calendar import MINUTES_PER_DAY, Recurrence, rules_overlap
+
+MAX_SEARCH_STEPS = 20000
+# Deeper searches would approach Python's recursion limit; larger batches are placed greedily
+MAX_SEARCH_DEPTH = 500
+
+
+class ClassRequest(NamedTuple):
+    """One class to place: where and when it may go, and who teaches it."""
+
+    class_name: str
+    dates: Tuple[str, ...]
+    duration: int = 60
+    instructor: Optional[str] = None
+    size: int = 0
+    rooms: Tuple[str, ...] = ()
+    preferred_times: Tuple[str, ...] = ()
+    recurrence: Optional[str] = None
+    occurrences: Optional[int] = None
+
+
+def parse_request(data: Dict) -> ClassRequest:
+    """
+    Build a ClassRequest from a JSON-style dict
+
+    ``date`` or ``dates`` give the candidate days; ``room``/``rooms`` and
+    ``preferred_time``/``preferred_times`` accept a single value or a list.
+
+    Raises:
+        ValueError: If the class name or dates are missing, or a number is invalid
+    """
+    def as_tuple(value) -> Tuple[str, ...]:
+        if value is None:
+            return ()
+        return (value,) if isinstance(value, str) else tuple(value)
+
+    name = data.get("class_name") or data.get("name")
+    if not name:
+        raise ValueError("Each request needs a class_name")
+    dates = as_tuple(data.get("dates", data.get("date")))
+    if not dates:
+        raise ValueError(f"{name}: give a date or a list of dates")
+    occurrences = data.get("occurrences")
+    return ClassRequest(
+        class_name=name,
+        dates=dates,
+        duration=int(data.get("duration", 60)),
+        instructor=data.get("instructor") or None,
+        size=int(data.get("size", 0)),
+        rooms=as_tuple(data.get("rooms", data.get("room"))),
+        preferred_times=as_tuple(data.get("preferred_times", data.get("preferred_time"))),
+        recurrence=data.get("recurrence") or None,
+        occurrences=int(occurrences) if occurrences else None,
+    )
+
+
+class Candidate(NamedTuple):
+    """A possible placement; ``rule`` is set for recurring classes."""
+
+    room: str
+    start: int
+    end: int
+    rule: Optional[Recurrence] = None
+
+
+def candidates_overlap(a: Candidate, b: Candidate) -> bool:
+    """Whether two placements overlap in time (rooms and instructors aside)."""
+    if a.rule is None and b.rule is None:
+        return a.start < b.end and b.start < a.end
+    if a.rule is None:
+        return b.rule.overlaps(a.start, a.end)
+    if b.rule is None:
+        return a.rule.overlaps(b.start, b.end)
+    return rules_overlap(a.rule, b.rule)
+
+
+class TimetableSolver:
+    def __init__(self, instructors: Sequence[Optional[str]], candidates: Sequence[List[Candidate]],
+                 max_steps: int = MAX_SEARCH_STEPS):
+        """
+        Assign one candidate to each request without room or instructor overlaps
+
+        Candidates arrive already filtered against existing bookings and
+        static constraints (capacity, hours) and sorted best first, so the
+        solver only has to keep the new placements apart. It runs a
+        depth-first search with forward checking: placing a class prunes the
+        clashing candidates of every other class, found through a (room,
+        day) / (instructor, day) index rather than a scan, and the search
+        always branches on the class with the fewest candidates left
+        (minimum remaining values), trying them in preference order. If no
+        complete timetable is found within ``max_steps`` nodes (or the batch
+        is too large to search), the deepest partial assignment is extended
+        greedily and the remaining requests are left unplaced.
+
+        Args:
+            instructors: Instructor of each request (None if unconstrained)
+            candidates: Sorted placements for each request
+            max_steps (int): Search nodes to expand before falling back to greedy
+        """
+        self.instructors = list(instructors)
+        self.candidates = [list(c) for c in candidates]
+        self.max_steps = max_steps
+        self.steps = 0
+        self._alive = [[True] * len(c) for c in self.candidates]
+        self._remaining = [len(c) for c in self.candidates]
+        self._assignment: List[Optional[Candidate]] = [None] * len(self.candidates)
+        self._best: List[Optional[Candidate]] = list(self._assignment)
+        self._best_count = 0
+        self._placed = 0
+
+        # (owner, day) -> one-off candidates touching that day, where an
+        # owner is ("room", name) or ("instructor", name); recurring
+        # candidates are few and kept per owner.
+        self._by_day: Dict[Tuple[Tuple[str, str], int], List[Tuple[int, int]]] = {}
+        self._recurring: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        for index, options in enumerate(self.candidates):
+            for k, candidate in enumerate(options):
+                for owner in self._owners(index, candidate):
+                    if candidate.rule is None:
+                        for day in _days(candidate):
+                            self._by_day.setdefault((owner, day), []).append((index, k))
+                    else:
+                        self._recurring.setdefault(owner, []).append((index, k))
+
+    def _owners(self, index: int, candidate: Candidate) -> List[Tuple[str, str]]:
+        owners = [("room", candidate.room)]
+        if self.instructors[index]:
+            owners.append(("instructor", self.instructors[index]))
+        return owners
+
+    def _clashing(self, index: int, candidate: Candidate):
+        """Yield (request, candidate index) pairs that clash with placing candidate for index."""
+        for owner in self._owners(index, candidate):
+            if candidate.rule is None:
+                pools = [self._by_day.get((owner, day), ()) for day in _days(candidate)]
+            else:
+                pools = [entries for (o, _), entries in self._by_day.items() if o == owner]
+            pools.append(self._recurring.get(owner, ()))
+            for pool in pools:
+                for other, k in pool:
+                    if other != index and self._alive[other][k] and self._assignment[other] is None \
+                            and candidates_overlap(candidate, self.candidates[other][k]):
+                        yield other, k
+
+    def _place(self, index: int, candidate: Candidate) -> List[Tuple[int, int]]:
+        """Place a candidate and prune what it rules out; returns the pruned pairs for undo."""
+        pruned = list(dict.fromkeys(self._clashing(index, candidate)))
+        for other, k in pruned:
+            self._alive[other][k] = False
+            self._remaining[other] -= 1
+        self._assignment[index] = candidate
+        self._placed += 1
+        return pruned
+
+    def _unplace(self, index: int, pruned: List[Tuple[int, int]]):
+        for other, k in pruned:
+            self._alive[other][k] = True
+            self._remaining[other] += 1
+        self._assignment[index] = None
+        self._placed -= 1
+
+    def _options(self, index: int) -> List[Candidate]:
+        return [c for c, alive in zip(self.candidates[index], self._alive[index]) if alive]
+
+    def _most_constrained(self, pending: List[int]) -> int:
+        """Pick the pending request with the fewest candidates left (ties: first listed)."""
+        return min(pending, key=self._remaining.__getitem__)
+
+    def _search(self, pending: List[int]) -> bool:
+        if self._placed > self._best_count:
+            self._best_count, self._best = self._placed, list(self._assignment)
+        if not pending:
+            return True
+        self.steps += 1
+        if self.steps > self.max_steps:
+            return False
+        index = self._most_constrained(pending)
+        rest = [i for i in pending if i != index]
+        for candidate in self._options(index):
+            pruned = self._place(index, candidate)
+            if self._search(rest):
+                return True
+            self._unplace(index, pruned)
+            if self.steps > self.max_steps:
+                break
+        return False
+
+    def solve(self) -> List[Optional[Candidate]]:
+        """
+        Returns:
+            List[Optional[Candidate]]: Placement per request, None where it could not be placed
+        """
+        pending = [i for i, options in enumerate(self.candidates) if options]
+        if len(pending) <= MAX_SEARCH_DEPTH and self._search(pending):
+            return list(self._assignment)
+
+        # The search unwound; restart from the deepest partial timetable
+        # and place what still fits, most constrained first
+        for index, candidate in enumerate(self._best):
+            if candidate is not None:
+                self._place(index, candidate)
+        pending = [i for i in pending if self._assignment[i] is None]
+        while pending:
+            index = self._most_constrained(pending)
+            pending.remove(index)
+            options = self._options(index)
+            if options:
+                self._place(index, options[0])
+        return list(self._assignment)
+
+
+def _days(candidate: Candidate) -> range:
+    return range(candidate.start // MINUTES_PER_DAY, (candidate.end - 1) // MINUTES_PER_DAY + 1)
@@ -0,0 +1,197 @@
+import os
+import re
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from rate_limiter import count_tokens
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+# OpenAI accepts up to 2048 inputs and 300k tokens per embeddings request
+EMBEDDING_BATCH_INPUTS = int(os.getenv("EMBEDDING_BATCH_INPUTS", "256"))
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "131072"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+(?=[\"'(\[]?[A-Z0-9])")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# How oversized sentences are broken up, coarsest first
+_SPLIT_LEVELS = (re.compile(r"\n"), re.compile(r" +"))
+
+# Joining two pieces with a space can cost at most one extra token
+_JOIN_TOKENS = 1
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a paragraph into sentences on terminal punctuation, keeping line breaks."""
+    text = text.strip()
+    return [sentence for sentence in _SENTENCE_END.split(text) if sentence.strip()] if text else []
+
+
+def text_segments(text: str) -> List[Tuple[str, bool]]:
+    """
+    Turn plain text into (paragraph, is_heading) segments
+
+    Plain text carries no font information, so every blank-line separated
+    paragraph is a body segment.
+    """
+    return [(paragraph, False) for paragraph in _PARAGRAPH_BREAK.split(text) if paragraph.strip()]
+
+
+class TokenChunker:
+    def __init__(
+        self,
+        chunk_tokens: int = CHUNK_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        model: str = EMBEDDING_MODEL,
+    ):
+        """
+        Pack sentences into chunks measured in embedding tokens
+
+        Sentences are counted with one batched tiktoken call per document
+        (chars / 4 when tiktoken has no encoding available) and packed
+        greedily up to ``chunk_tokens``. A heading always starts a new chunk,
+        so sections are never glued onto the tail of the previous one.
+        Sentences longer than a chunk are split on lines, then words. Up to
+        ``overlap_tokens`` of trailing sentences are repeated at the start of
+        the next chunk within a section.
+
+        Args:
+            chunk_tokens (int): Maximum tokens per chunk
+            overlap_tokens (int): Tokens of trailing context carried over
+            model (str): Embedding model whose tokenizer is used
+        """
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        # Named like LangChain's splitters so chunker_config records them
+        self.chunk_size = chunk_tokens
+        self.chunk_overlap = overlap_tokens
+        self.model = model
+
+    def _units(self, segments: Iterable[Tuple[str, bool]]) -> Tuple[List[str], List[int], List[bool]]:
+        """Flatten segments into sentence-sized units with token counts and section starts."""
+        sentences, starts = [], []
+        for text, is_heading in segments:
+            for i, sentence in enumerate(split_sentences(text)):
+                sentences.append(sentence)
+                starts.append(is_heading and i == 0)
+
+        units, counts, unit_starts = [], [], []
+        for pieces, start in zip(self._fit(sentences), starts):
+            for j, (piece, count) in enumerate(pieces):
+                units.append(piece)
+                counts.append(count)
+                unit_starts.append(start and j == 0)
+        return units, counts, unit_starts
+
+    def _fit(self, pieces: List[str], level: int = 0) -> List[List[Tuple[str, int]]]:
+        """
+        Count pieces in one batch and break up any that exceed a chunk
+
+        Oversized pieces are split on line breaks, then on spaces, then cut by
+        characters, and the parts are packed back into chunk-sized units.
+        """
+        normalized = [" ".join(piece.split()) for piece in pieces]
+        counts = count_tokens(normalized, self.model) if pieces else []
+        fitted = [[(text, count)] for text, count in zip(normalized, counts)]
+        oversized = [i for i, count in enumerate(counts) if count > self.chunk_size]
+        if not oversized:
+            return fitted
+
+        if level < len(_SPLIT_LEVELS):
+            parts = [[part for part in _SPLIT_LEVELS[level].split(pieces[i]) if part.strip()] for i in oversized]
+            sub_units = iter(self._fit([part for group in parts for part in group], level + 1))
+            for i, group in zip(oversized, parts):
+                fitted[i] = self._pack([unit for _ in group for unit in next(sub_units)])
+        else:
+            # A single unbroken run (e.g. an encoded blob)
+            for i in oversized:
+                text = normalized[i]
+                step = max(1, len(text) * self.chunk_size // counts[i])
+                cuts = [text[k:k + step] for k in range(0, len(text), step)]
+                fitted[i] = list(zip(cuts, count_tokens(cuts, self.model)))
+        return fitted
+
+    def _pack(self, units: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """Greedily join units that each fit a chunk into as few chunk-sized units as possible."""
+        packed, current, tokens = [], [], 0
+        for text, count in units:
+            if current and tokens + _JOIN_TOKENS + count > self.chunk_size:
+                packed.append((" ".join(current), tokens))
+                current, tokens = [], 0
+            tokens += count + (_JOIN_TOKENS if current else 0)
+            current.append(text)
+        if current:
+            packed.append((" ".join(current), tokens))
+        return packed
+
+    def chunk_segments(self, segments: Iterable[Tuple[str, bool]]) -> List[Tuple[str, int]]:
+        """
+        Chunk (text, is_heading) segments, e.g. from PDFExtractor.iter_segments
+
+        Returns:
+            List[Tuple[str, int]]: Chunks with their exact token counts
+        """
+        units, counts, starts = self._units(segments)
+        chunks = []
+        current, tokens = [], 0
+        # Consecutive headings (e.g. a chapter and its first section) stay together
+        has_body = False
+
+        for i, (unit, count, start) in enumerate(zip(units, counts, starts)):
+            joined = tokens + (_JOIN_TOKENS if current else 0) + count
+            new_section = start and has_body
+            if current and (new_section or joined > self.chunk_size):
+                chunks.append(" ".join(units[k] for k in current))
+                if new_section:
+                    current, tokens, has_body = [], 0, False
+                else:
+                    current, tokens = self._overlap(current, counts, count)
+            tokens += (_JOIN_TOKENS if current else 0) + count
+            current.append(i)
+            has_body = has_body or not start
+        if current:
+            chunks.append(" ".join(units[k] for k in current))
+
+        # One more batched count gives exact sizes for embedding batching
+        return list(zip(chunks, count_tokens(chunks, self.model))) if chunks else []
+
+    def _overlap(self, current: List[int], counts: Sequence[int], incoming: int) -> Tuple[List[int], int]:
+        kept, tokens = [], 0
+        budget = min(self.chunk_overlap, self.chunk_size - incoming - _JOIN_TOKENS)
+        for k in reversed(current):
+            cost = counts[k] + (_JOIN_TOKENS if kept else 0)
+            if tokens + cost > budget:
+                break
+            kept.insert(0, k)
+            tokens += cost
+        return kept, tokens
+
+    def split_text(self, text: str) -> List[str]:
+        """Split plain text; drop-in for a LangChain splitter's split_text."""
+        return [chunk for chunk, _ in self.chunk_segments(text_segments(text))]
+
+
+def iter_embedding_batches(
+    chunks: Iterable[Tuple[str, int]],
+    max_tokens: int = EMBEDDING_BATCH_TOKENS,
+    max_inputs: int = EMBEDDING_BATCH_INPUTS,
+) -> Iterator[List[str]]:
+    """
+    Group counted chunks into embeddings requests that respect both limits
+
+    Args:
+        chunks: (text, token count) pairs, as returned by TokenChunker.chunk_segments
+        max_tokens (int): Token budget per request
+        max_inputs (int): Inputs per request
+
+    Yields:
+        List[str]: Texts for one embeddings request
+    """
+    batch, tokens = [], 0
+    for text, count in chunks:
+        if batch and (len(batch) >= max_inputs or tokens + count > max_tokens):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(text)
+        tokens += count
+    if batch:
+        yield batch
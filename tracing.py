@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import itertools
+import threading
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+from metrics import LLM_TOKENS
+
+# Span output; .json files get Chrome trace / Perfetto JSON, anything else JSON Lines
+TRACE_FILE = os.getenv("TRACE_FILE")
+# chrome | jsonl; overrides the extension
+TRACE_FORMAT = os.getenv("TRACE_FORMAT")
+# Finished spans kept in memory for the Chrome export; later spans are dropped
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200000"))
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("tracer", "id", "parent_id", "trace_id", "name", "category", "attributes",
+                 "start_ns", "end_ns", "thread_id", "thread_name", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, attributes: Dict):
+        """
+        One timed operation; use as a context manager
+
+        Spans nest through a contextvar, so a span opened inside another
+        (in the same thread, or in a pool thread started with a copied
+        context) records it as its parent.
+        """
+        parent = _current.get()
+        self.tracer = tracer
+        self.id = next(tracer.ids)
+        self.parent_id = parent.id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.id
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        thread = threading.current_thread()
+        self.thread_id = thread.native_id or thread.ident
+        self.thread_name = thread.name
+        self._token = None
+
+    def set(self, **attributes):
+        """Add attributes (token counts, cache hits, sizes...) to the span."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer.finish(self)
+        return False
+
+    def to_dict(self) -> Dict:
+        tracer = self.tracer
+        return {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "category": self.category,
+            "pid": tracer.pid,
+            # Wall-clock microseconds, so logs from several processes line up
+            "start_us": tracer.epoch_us + (self.start_ns - tracer.origin_ns) // 1000,
+            "duration_us": (self.end_ns - self.start_ns) // 1000,
+            "thread_id": self.thread_id,
+            "thread_name": self.thread_name,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is off; every operation is a no-op."""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    def __init__(self, path: Optional[str] = None, format: Optional[str] = None, max_spans: int = TRACE_MAX_SPANS):
+        """
+        Collect finished spans and export them
+
+        JSON Lines output is streamed, one span per line as it finishes, so a
+        long-running process (the Streamlit app) can be inspected while it
+        runs. Chrome trace output is written by flush() and at exit. Open it
+        in Perfetto (ui.perfetto.dev) or chrome://tracing to see each
+        consultation as a flame chart.
+
+        Args:
+            path (str): Output file, or None to only keep spans in memory
+            format (str): chrome or jsonl (default: chrome for .json files)
+            max_spans (int): Spans kept in memory for the Chrome export
+        """
+        if format is None:
+            format = "chrome" if path and path.endswith(".json") else "jsonl"
+        if format not in ("chrome", "jsonl"):
+            raise ValueError(f"Unknown trace format {format!r}; use chrome or jsonl")
+        self.path = path
+        self.format = format
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.ids = itertools.count(1)
+        self.origin_ns = time.perf_counter_ns()
+        self.epoch_us = time.time_ns() // 1000
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._file = None
+        if path and format == "jsonl":
+            self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def finish(self, span: Span):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+            if self._file is not None:
+                self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def chrome_trace(self) -> Dict:
+        """Finished spans as a Chrome trace event document."""
+        with self._lock:
+            spans = list(self.spans)
+        return chrome_trace(span.to_dict() for span in spans)
+
+    def flush(self):
+        """Write the Chrome trace (JSON Lines output is already on disk)."""
+        if self.path and self.format == "chrome":
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.chrome_trace(), f, default=str)
+        elif self._file is not None:
+            self._file.flush()
+
+
+def chrome_trace(spans: Iterable[Dict]) -> Dict:
+    """
+    Convert span dicts (Span.to_dict or JSON Lines records) to Chrome trace events
+
+    Spans become complete ("X") events on their process and thread track;
+    thread names are emitted as metadata so Perfetto labels the tracks.
+    """
+    events, threads = [], {}
+    for span in spans:
+        pid = span.get("pid", 0)
+        threads[(pid, span["thread_id"])] = span["thread_name"]
+        args = dict(span["attributes"], span_id=span["id"], parent_id=span["parent_id"])
+        events.append({
+            "name": span["name"], "cat": span["category"], "ph": "X",
+            "ts": span["start_us"], "dur": span["duration_us"],
+            "pid": pid, "tid": span["thread_id"], "args": args,
+        })
+    for (pid, tid), name in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(path: Optional[str] = None, format: Optional[str] = None) -> Tracer:
+    """Turn tracing on for this process (flushed at exit) and return the tracer."""
+    global _tracer
+    _tracer = Tracer(path, format)
+    atexit.register(_tracer.flush)
+    return _tracer
+
+
+def disable():
+    """Flush and stop tracing; span() goes back to returning the no-op span."""
+    global _tracer
+    if _tracer is not None:
+        atexit.unregister(_tracer.flush)
+        _tracer.flush()
+    _tracer = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, category: str = "app", **attributes):
+    """
+    Open a span: ``with span("retrieval", "rag", k=4) as s: ...; s.set(hits=3)``
+
+    Returns a shared no-op span when tracing is off, so instrumented code
+    pays one global lookup per span.
+    """
+    if _tracer is None:
+        return NOOP_SPAN
+    return Span(_tracer, name, category, attributes)
+
+
+def current_span():
+    """The innermost open span in this context (a no-op span if none)."""
+    return _current.get() or NOOP_SPAN
+
+
+def traced(name: Optional[str] = None, category: str = "app"):
+    """Decorator wrapping every call of a function in a span."""
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, span_name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument_swarm(client):
+    """
+    Add spans for model turns and tool calls inside Swarm.run
+
+    Wraps the client instance's ``get_chat_completion`` (one span per model
+    turn, with the agent, model and token usage, which also feeds the token
+    metrics) and ``handle_tool_calls`` (one span per tool call batch, with
+    the tool names). While tracing is off only the token metrics are kept.
+
+    Returns:
+        The same client, for ``client = instrument_swarm(Swarm(api))``
+    """
+    get_chat_completion = client.get_chat_completion
+    handle_tool_calls = client.handle_tool_calls
+
+    @functools.wraps(get_chat_completion)
+    def traced_completion(agent, *args, **kwargs):
+        with span("chat.completion", "llm", agent=agent.name, model=agent.model) as s:
+            completion = get_chat_completion(agent, *args, **kwargs)
+            usage = getattr(completion, "usage", None)
+            if usage is not None:
+                s.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+                LLM_TOKENS.observe(usage.prompt_tokens, direction="in", source="swarm")
+                LLM_TOKENS.observe(usage.completion_tokens, direction="out", source="swarm")
+            return completion
+
+    @functools.wraps(handle_tool_calls)
+    def traced_tool_calls(tool_calls, *args, **kwargs):
+        names = [call.function.name for call in tool_calls]
+        with span(", ".join(names) or "tools", "tool", tools=names):
+            return handle_tool_calls(tool_calls, *args, **kwargs)
+
+    client.get_chat_completion = traced_completion
+    client.handle_tool_calls = traced_tool_calls
+    return client
+
+
+if TRACE_FILE:
+    enable(TRACE_FILE, TRACE_FORMAT)
+
+
+if __name__ == "__main__":
+    # Convert a JSON Lines span log to a Chrome trace: python tracing.py spans.jsonl trace.json
+    if len(sys.argv) != 3:
+        sys.exit("usage: python tracing.py SPANS.jsonl OUTPUT.json")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    with open(sys.argv[2], "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(records), f)
+    print(f"Wrote {len(records)} spans to {sys.argv[2]}")